@@ -0,0 +1,73 @@
+"""Measures the agent loop running a step's tool calls concurrently.
+
+A stub model calls several tools in its first turn, each taking a fixed
+time, and answers with text once their results come back. The per-step
+timings of the answer show the wall time of the tool calls against the time
+they would have taken one after the other.
+
+By default the tools are the real `execute_sql` over a stub BigQuery client
+whose query jobs block their thread, as the real client does. With
+`--tool sleeping` they are stub tools that await `asyncio.sleep` instead.
+
+Usage:
+    python -m benchmarks.agent_steps --tools 3 --tool-ms 500
+    python -m benchmarks.agent_steps --tool sleeping
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+
+from benchmarks.stubs import FunctionCall, SleepingTool, Turn, make_agent, make_sql_tools
+from contract_ai_agent_modules.adk.agents.main_agent.agent_events import EVENT_DONE
+
+
+async def answer(agent, question):
+    async for event in agent.stream_query(question):
+        if event.kind == EVENT_DONE:
+            return event
+
+
+def run(num_tools, tool_ms, model_ms, tool_kind="sql"):
+    names = [f"lookup_{i}" for i in range(num_tools)]
+    if tool_kind == "sleeping":
+        tools = [SleepingTool(name, tool_ms / 1000) for name in names]
+    else:
+        tools = make_sql_tools(names, tool_ms / 1000)
+    query = "SELECT * FROM contracts LIMIT 10"
+    turns = [
+        Turn(function_calls=[FunctionCall(name, {"query": query}) for name in names], first_chunk_seconds=model_ms / 1000),
+        Turn(chunks=["All lookups are done."], first_chunk_seconds=model_ms / 1000),
+    ]
+    event = asyncio.run(answer(make_agent(turns, tools), "Compare the contracts."))
+    return {
+        "benchmark": "agent_steps",
+        "tool": tool_kind,
+        "answer": event.result.result,
+        "total_seconds": event.latency.total_seconds,
+        "steps": [
+            {
+                **dataclasses.asdict(step),
+                "sequential_seconds": step.sequential_seconds,
+                "saved_seconds": step.saved_seconds,
+            }
+            for step in event.latency.steps
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=3, help="Number of tool calls in the first turn.")
+    parser.add_argument("--tool-ms", type=int, default=500, help="Duration of each tool call.")
+    parser.add_argument("--model-ms", type=int, default=300, help="Duration of each model turn.")
+    parser.add_argument(
+        "--tool", choices=["sql", "sleeping"], default="sql", help="Blocking execute_sql tools or sleeping stub tools."
+    )
+    args = parser.parse_args()
+    print(json.dumps(run(args.tools, args.tool_ms, args.model_ms, args.tool), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Compares the dict-rows and Arrow result paths from execute_sql to the UI.
+
+Both paths start from the same synthetic result columns, and everything they
+do from there is timed. The rows path mirrors what the chat did with a result:
+one dict per row, a DataFrame built from them and a markdown table. The Arrow
+path builds record batches from the columns, as the Storage Read API delivers
+them, and serializes the table to Arrow IPC, which is what `st.dataframe`
+sends to the browser.
+
+Each path runs in a fresh subprocess so peak RSS is not shared between them.
+
+Usage:
+    python -m benchmarks.arrow_results --rows 100000
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+COLUMNS = [
+    "contract_id",
+    "contract_name",
+    "contract_type",
+    "provider",
+    "company",
+    "business_unit",
+    "start_date",
+    "end_date",
+    "price",
+]
+
+
+def make_columns(num_rows):
+    """Returns synthetic contract columns with `num_rows` values each."""
+    start = datetime.date(2020, 1, 1)
+    return {
+        "contract_id": [f"C{i:07d}" for i in range(num_rows)],
+        "contract_name": [f"Service agreement {i}" for i in range(num_rows)],
+        "contract_type": [("Service", "Supply", "Lease")[i % 3] for i in range(num_rows)],
+        "provider": [f"Provider {i % 500}" for i in range(num_rows)],
+        "company": [("Walmart Chile", "Lider", "Acuenta")[i % 3] for i in range(num_rows)],
+        "business_unit": [("IT", "Administration", "Logistics", "Retail")[i % 4] for i in range(num_rows)],
+        "start_date": [start + datetime.timedelta(days=i % 1500) for i in range(num_rows)],
+        "end_date": [start + datetime.timedelta(days=i % 1500 + 365) for i in range(num_rows)],
+        "price": [float(1000 + i % 100000) for i in range(num_rows)],
+    }
+
+
+def _peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_rows_path(num_rows):
+    """Dict per row, DataFrame and markdown, as format_agent_response did."""
+    import pandas as pd
+
+    columns = make_columns(num_rows)
+    baseline = _peak_rss_bytes()
+    started = time.perf_counter()
+    results = [dict(zip(COLUMNS, row)) for row in zip(*(columns[name] for name in COLUMNS))]
+    markdown = pd.DataFrame(results).to_markdown(index=False)
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "peak_rss_delta_bytes": _peak_rss_bytes() - baseline, "output_bytes": len(markdown)}
+
+
+def run_arrow_path(num_rows):
+    """Record batches to an Arrow table serialized as st.dataframe does."""
+    import pyarrow as pa
+
+    columns = make_columns(num_rows)
+    batch_size = 10000
+    baseline = _peak_rss_bytes()
+    allocated_before = pa.total_allocated_bytes()
+    started = time.perf_counter()
+    batches = [
+        pa.record_batch([pa.array(columns[name][offset:offset + batch_size]) for name in COLUMNS], names=COLUMNS)
+        for offset in range(0, num_rows, batch_size)
+    ]
+    table = pa.Table.from_batches(batches)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue()
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": elapsed,
+        "peak_rss_delta_bytes": _peak_rss_bytes() - baseline,
+        "arrow_allocated_bytes": pa.total_allocated_bytes() - allocated_before,
+        "output_bytes": payload.size,
+    }
+
+
+def _run_in_subprocess(target, num_rows):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(target, (num_rows,))
+
+
+def run(num_rows):
+    """Runs both paths and returns their measurements."""
+    return {
+        "benchmark": "arrow_results",
+        "rows": num_rows,
+        "paths": {
+            "rows": _run_in_subprocess(run_rows_path, num_rows),
+            "arrow": _run_in_subprocess(run_arrow_path, num_rows),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Number of result rows.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
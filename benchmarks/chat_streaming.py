@@ -0,0 +1,71 @@
+"""Measures time to first token and total latency of streamed chat answers.
+
+A stub model emits the answer as text chunks on a fixed schedule, the way
+Gemini streams a response, so no credentials or network access are needed.
+The blocking path waits for the whole response like `process_query`; the
+streaming path consumes `stream_query` and notes when the first chunk
+arrives.
+
+Usage:
+    python -m benchmarks.chat_streaming --chunks 20 --first-chunk-ms 400 --chunk-ms 80
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import time
+
+from benchmarks.stubs import Turn, make_agent
+from contract_ai_agent_modules.adk.agents.main_agent.agent_events import EVENT_DONE, EVENT_TEXT
+
+
+async def run_blocking(agent, question):
+    started = time.perf_counter()
+    result = await agent.process_query(question)
+    total = time.perf_counter() - started
+    return {"first_token_seconds": total, "total_seconds": total, "answer_chars": len(result.result["response"])}
+
+
+async def run_streaming(agent, question):
+    started = time.perf_counter()
+    first_chunk = None
+    async for event in agent.stream_query(question):
+        if event.kind == EVENT_TEXT and first_chunk is None:
+            first_chunk = time.perf_counter() - started
+        elif event.kind == EVENT_DONE:
+            return {
+                "first_token_seconds": first_chunk,
+                "total_seconds": time.perf_counter() - started,
+                "answer_chars": len(event.result.result["response"]),
+                "agent_latency": dataclasses.asdict(event.latency),
+            }
+
+
+def run(num_chunks, first_chunk_ms, chunk_ms):
+    turn = Turn(
+        chunks=[f"Contracts answer part {i}. " for i in range(num_chunks)],
+        first_chunk_seconds=first_chunk_ms / 1000,
+        chunk_seconds=chunk_ms / 1000,
+    )
+    agent = make_agent([turn])
+    question = "What can you do?"
+    return {
+        "benchmark": "chat_streaming",
+        "chunks": num_chunks,
+        "blocking": asyncio.run(run_blocking(agent, question)),
+        "streaming": asyncio.run(run_streaming(agent, question)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20, help="Number of chunks in the answer.")
+    parser.add_argument("--first-chunk-ms", type=int, default=400, help="Delay before the first chunk.")
+    parser.add_argument("--chunk-ms", type=int, default=80, help="Delay between chunks.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.chunks, args.first_chunk_ms, args.chunk_ms), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Reports what the contracts list reads, before and after column projection.
+
+Bytes processed come from BigQuery dry runs, which are free and read no data,
+of the old `SELECT *` queries and of the projected list and details queries.
+They need credentials and a project with the contract_data dataset, and are
+skipped without `--project`.
+
+DataFrame memory is measured on synthetic contracts, with long text columns of
+a typical size, for the whole table and for the summary columns only.
+
+Usage:
+    python -m benchmarks.contract_projection --rows 50000 --project my-project
+"""
+
+import argparse
+import datetime
+import json
+
+import pandas as pd
+
+import contract_ai_agent_modules.queries as queries
+
+OLD_LIST_QUERY = "SELECT * FROM `contract_data.contracts`"
+OLD_DETAILS_QUERY = "SELECT * FROM `contract_data.contracts` WHERE contract_id = @contract_id"
+
+
+def make_contracts(num_rows):
+    """Returns synthetic contracts with every column of the contracts table."""
+    start = datetime.date(2020, 1, 1)
+    clause = "The provider shall deliver the services described herein. " * 40
+    return pd.DataFrame(
+        {
+            "contract_id": [f"C{i:07d}" for i in range(num_rows)],
+            "contract_name": [f"Service agreement {i}" for i in range(num_rows)],
+            "contract_type": ["Service", "Supply", "Lease"] * (num_rows // 3) + ["Service"] * (num_rows % 3),
+            "provider": [f"Provider {i % 500}" for i in range(num_rows)],
+            "company": ["Walmart Chile", "Lider"] * (num_rows // 2) + ["Lider"] * (num_rows % 2),
+            "business_unit": ["IT", "Retail", "Logistics", "Finance"] * (num_rows // 4) + ["IT"] * (num_rows % 4),
+            "start_date": [start + datetime.timedelta(days=i % 1500) for i in range(num_rows)],
+            "end_date": [start + datetime.timedelta(days=365 + i % 1500) for i in range(num_rows)],
+            "price": [float(i % 100000) for i in range(num_rows)],
+            "service_detail": ["Maintenance and support of point of sale systems."] * num_rows,
+            "contract_date": [start + datetime.timedelta(days=i % 1500) for i in range(num_rows)],
+            "rut_brand": ["76.123.456-7"] * num_rows,
+            "legal_representatives": ["John Doe, Jane Smith"] * num_rows,
+            "contract_manager": ["Jane Smith"] * num_rows,
+            "financials": [json.dumps({"currency": "CLP", "payment_terms": "Net 30", "amount": i}) for i in range(num_rows)],
+            "exit_clause": [clause[:600]] * num_rows,
+            "general_conditions": [clause + str(i) for i in range(num_rows)],
+            "ocr_text_ref": [f"gs://contract_pdfs/C{i:07d}.pdf" for i in range(num_rows)],
+        }
+    )
+
+
+def measure_memory(num_rows):
+    contracts_df = make_contracts(num_rows)
+    return {
+        "rows": num_rows,
+        "select_star_dataframe_bytes": int(contracts_df.memory_usage(deep=True).sum()),
+        "summary_dataframe_bytes": int(contracts_df[queries.CONTRACT_SUMMARY_COLUMNS].memory_usage(deep=True).sum()),
+    }
+
+
+def measure_bytes_processed(project_id):
+    from google.cloud import bigquery
+
+    from contract_ai_agent_modules.bigquery_client import BigQueryClient
+
+    client = BigQueryClient(project_id=project_id, dataset_id="contract_data")
+    contract_id = [bigquery.ScalarQueryParameter("contract_id", "STRING", "C001")]
+    contract_ids = [bigquery.ArrayQueryParameter("contract_ids", "STRING", ["C001"])]
+    page = [bigquery.ScalarQueryParameter("page_size", "INT64", 51)]
+    return {
+        "list_before": client.dry_run_bytes(OLD_LIST_QUERY),
+        "list_after": client.dry_run_bytes(queries.get_contracts_page_query(), page),
+        "details_before": client.dry_run_bytes(OLD_DETAILS_QUERY, contract_id),
+        "details_after": client.dry_run_bytes(queries.CONTRACT_DETAILS_QUERY, contract_ids),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="Number of synthetic contracts.")
+    parser.add_argument("--project", help="Project to dry-run the queries in.")
+    args = parser.parse_args()
+    results = {"benchmark": "contract_projection", "memory": measure_memory(args.rows)}
+    if args.project:
+        results["bytes_processed"] = measure_bytes_processed(args.project)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Checks what each question transmits with and without a cached prompt prefix.
+
+The agent answers the same questions four ways with a stub model: with a
+context cache whose stub provider accepts the prefix, with one whose provider
+refuses it as too small, with one that skips the prefix because it is below
+the minimum cacheable size, and without a context cache. The messages the stub
+model receives show whether only the question suffix was sent per call, and
+the characters and estimated tokens sent per question are compared. A refused
+or too small prefix should be offered to the provider at most once.
+
+Usage:
+    python -m benchmarks.prompt_cache --questions 10
+"""
+
+import argparse
+import asyncio
+import json
+
+from benchmarks.stubs import ScriptedModel, Turn, make_agent
+from contract_ai_agent_modules.adk.agents.main_agent.prompt_cache import DEFAULT_MIN_PREFIX_TOKENS, ContextCache, PromptTemplate
+
+CHARS_PER_TOKEN = 4
+
+
+class StubProvider:
+    """Registers cached contents, or refuses them like a too-short prefix."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.registered = []
+        self.attempts = 0
+        self.model = ScriptedModel([Turn(chunks=["Cached answer."])])
+
+    def create(self, model_name, system_instruction, tools, ttl_seconds):
+        self.attempts += 1
+        if not self.accept:
+            raise ValueError("The cached content is below the minimum token count")
+        self.registered.append(system_instruction)
+        return {"name": f"cachedContents/{len(self.registered)}"}
+
+    def model_from_cached_content(self, cached_content):
+        return self.model
+
+
+async def ask(agent, questions):
+    for question in questions:
+        await agent.process_query(question)
+
+
+def run_case(questions, provider, min_prefix_tokens=0):
+    context_cache = None
+    if provider is not None:
+        context_cache = ContextCache(
+            "stub-model",
+            min_prefix_tokens=min_prefix_tokens,
+            create_fn=provider.create,
+            model_factory=provider.model_from_cached_content,
+        )
+    agent = make_agent([Turn(chunks=["Uncached answer."])], context_cache=context_cache)
+    asyncio.run(ask(agent, questions))
+    messages = agent._model.messages
+    if provider is not None and provider.registered:
+        messages = provider.model.messages
+    template = PromptTemplate()
+    sent_chars = sum(len(message) for message in messages)
+    return {
+        "registrations": len(provider.registered) if provider is not None else 0,
+        "registration_attempts": provider.attempts if provider is not None else 0,
+        "only_question_sent": messages == [template.render_question(question) for question in questions],
+        "chars_per_question": sent_chars / len(questions),
+        "estimated_tokens_per_question": sent_chars / len(questions) / CHARS_PER_TOKEN,
+    }
+
+
+def run(num_questions):
+    questions = [f"How many contracts does provider {i} have?" for i in range(num_questions)]
+    return {
+        "benchmark": "prompt_cache",
+        "questions": num_questions,
+        "cached": run_case(questions, StubProvider(accept=True)),
+        "caching_refused": run_case(questions, StubProvider(accept=False)),
+        "below_minimum": run_case(questions, StubProvider(accept=True), min_prefix_tokens=DEFAULT_MIN_PREFIX_TOKENS),
+        "no_context_cache": run_case(questions, None),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=10, help="Number of questions asked.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.questions), indent=2))
+
+
+if __name__ == "__main__":
+    main()
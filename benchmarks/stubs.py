@@ -0,0 +1,433 @@
+"""Offline stand-ins for Gemini, BigQuery, Cloud Storage, the schema catalog and agent tools.
+
+The benchmarks drive the real agent code with these, so they need no
+credentials or network access and their timings are reproducible. Stand-ins
+for remote services take an injected latency.
+"""
+
+import asyncio
+import dataclasses
+import datetime
+import json
+import time
+import types
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import requests
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import storage
+from google.cloud.bigquery.table import Row
+from requests.structures import CaseInsensitiveDict
+
+import contract_ai_agent_modules.queries as queries
+from contract_ai_agent_modules.adk.agents.main_agent.main_agent import ContractAgent
+from contract_ai_agent_modules.adk.agents.main_agent.semantic_cache import SemanticQuestionCache, hashing_embedding_function
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_tool import BigQueryTool
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.client_pool import get_client_pool
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.query_tool import get_execute_sql
+from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
+from contract_ai_agent_modules.adk.tools.tool_registry import ToolRegistry
+from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
+
+
+@dataclasses.dataclass
+class FunctionCall:
+    name: str
+    args: dict = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class StubPart:
+    text: str = ""
+    function_call: object = None
+
+
+@dataclasses.dataclass
+class _Content:
+    parts: list
+
+
+@dataclasses.dataclass
+class _Candidate:
+    content: _Content
+
+
+@dataclasses.dataclass
+class StubResponse:
+    candidates: list
+
+
+def make_response(parts):
+    return StubResponse(candidates=[_Candidate(content=_Content(parts=list(parts)))])
+
+
+@dataclasses.dataclass
+class Turn:
+    """One model turn: text chunks or function calls, emitted on a schedule.
+
+    Attributes:
+        chunks: The text chunks of the turn.
+        function_calls: The function calls of the turn, emitted in one chunk.
+        first_chunk_seconds: The delay before the first chunk.
+        chunk_seconds: The delay between chunks.
+    """
+
+    chunks: list = dataclasses.field(default_factory=list)
+    function_calls: list = dataclasses.field(default_factory=list)
+    first_chunk_seconds: float = 0.0
+    chunk_seconds: float = 0.0
+
+    @property
+    def total_seconds(self):
+        return self.first_chunk_seconds + self.chunk_seconds * max(len(self._responses()) - 1, 0)
+
+    def _responses(self):
+        if self.function_calls:
+            return [make_response(StubPart(function_call=call) for call in self.function_calls)]
+        return [make_response([StubPart(text=chunk)]) for chunk in self.chunks]
+
+
+class ScriptedChat:
+    """A chat session playing its model's turns in order, one per message."""
+
+    def __init__(self, turns):
+        self._turns = list(turns)
+        self.messages = []
+
+    def _next_turn(self, message):
+        self.messages.append(message)
+        return self._turns[min(len(self.messages), len(self._turns)) - 1]
+
+    def send_message(self, message, tools=None):
+        turn = self._next_turn(message)
+        time.sleep(turn.total_seconds)
+        return _merge(turn._responses())
+
+    async def send_message_async(self, message, tools=None, stream=False):
+        turn = self._next_turn(message)
+        if not stream:
+            await asyncio.sleep(turn.total_seconds)
+            return _merge(turn._responses())
+
+        async def stream_responses():
+            for i, response in enumerate(turn._responses()):
+                await asyncio.sleep(turn.first_chunk_seconds if i == 0 else turn.chunk_seconds)
+                yield response
+
+        return stream_responses()
+
+
+def _merge(responses):
+    parts = [part for response in responses for part in response.candidates[0].content.parts]
+    if parts and all(not part.function_call for part in parts):
+        parts = [StubPart(text="".join(part.text for part in parts))]
+    return make_response(parts)
+
+
+class ScriptedModel:
+    """A stub model whose chats play a fixed script of turns."""
+
+    def __init__(self, turns):
+        self._turns = list(turns)
+        self.chats = []
+
+    def start_chat(self):
+        chat = ScriptedChat(self._turns)
+        self.chats.append(chat)
+        return chat
+
+    @property
+    def messages(self):
+        """Every message sent to the model, in order."""
+        return [message for chat in self.chats for message in chat.messages]
+
+
+class StaticSchemaCatalog:
+    """A schema catalog with a fixed contracts schema."""
+
+    @dataclasses.dataclass
+    class Entry:
+        schema: str = "contract_id STRING, provider STRING, price NUMERIC"
+        fingerprint: str = "bench"
+
+    def get_schema(self, client_factory, dataset_id, table_id, ttl_seconds=None):
+        return self.Entry()
+
+
+class SleepingTool(BaseTool):
+    """A tool that takes a fixed time and returns a fixed result."""
+
+    def __init__(self, name, seconds, result=None):
+        async def func(query: str = ""):
+            await asyncio.sleep(seconds)
+            return result or {"rows": [{"tool": name}]}
+
+        func.__name__ = name
+        func.__doc__ = f"Stub tool {name}."
+        super().__init__(func)
+
+    async def _call(self, readonly_context, **kwargs):
+        return ToolResult.success(await self._func(**kwargs))
+
+
+def make_sql_tools(names, job_seconds, num_rows=10):
+    """Returns `execute_sql` tools, one per name, over a blocking stub client.
+
+    Every query job blocks its thread for `job_seconds`, like the real client
+    does while it waits for a job, and the result cache is disabled.
+    """
+    install_bigquery_client(StubBigQueryClient(make_contract_summaries(num_rows), job_seconds=job_seconds))
+    config = BigQueryToolConfig(default_dataset_id="contract_data", result_cache_enabled=False)
+    tools = []
+    for name in names:
+        func = get_execute_sql(config)
+        func.__name__ = name
+        tools.append(BigQueryTool(func, bigquery_tool_config=config))
+    return tools
+
+
+class StaticToolset:
+    """A toolset returning a fixed registry."""
+
+    def __init__(self, tools):
+        self._registry = ToolRegistry(tools)
+        self._tool_config = BigQueryToolConfig(default_dataset_id="contract_data")
+        self._credentials_config = None
+
+    def get_tool_registry(self, readonly_context=None):
+        return self._registry
+
+    async def close(self):
+        pass
+
+
+def make_agent(turns, tools=None, **kwargs):
+    """Returns a ContractAgent answering with a scripted model and stub tools."""
+    kwargs.setdefault("bigquery_tool_config", BigQueryToolConfig(default_dataset_id="contract_data"))
+    agent = ContractAgent(
+        schema_catalog=StaticSchemaCatalog(),
+        semantic_cache=SemanticQuestionCache(hashing_embedding_function()),
+        model=ScriptedModel(turns),
+        **kwargs,
+    )
+    if tools is not None:
+        agent._bigquery_toolset = StaticToolset(tools)
+    return agent
+
+
+def make_contract_summaries(num_rows, seed=0):
+    """Returns synthetic contracts with the summary columns of the contracts list."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(num_rows)
+    start = np.datetime64("2020-01-01") + rng.integers(0, 1500, num_rows).astype("timedelta64[D]")
+    contracts_df = pd.DataFrame(
+        {
+            "contract_id": [f"C{i:07d}" for i in ids],
+            "contract_name": [f"Service agreement {i}" for i in ids],
+            "contract_type": np.array(["Service", "Supply", "Lease"], dtype=object)[ids % 3],
+            "provider": [f"Provider {i}" for i in rng.integers(0, 500, num_rows)],
+            "rut_brand": [f"76.{i % 1000:03d}.456-7" for i in ids],
+            "company": np.array(["Walmart Chile", "Lider"], dtype=object)[ids % 2],
+            "business_unit": np.array(["IT", "Retail", "Logistics", "Finance"], dtype=object)[ids % 4],
+            "start_date": start,
+            "end_date": start + np.timedelta64(365, "D"),
+            "contract_date": start,
+            "price": rng.integers(0, 100000, num_rows).astype(float),
+            "contract_manager": np.array(["Jane Smith", "John Doe"], dtype=object)[ids % 2],
+            "legal_representatives": "John Doe, Jane Smith",
+            "ocr_text_ref": [f"gs://contract_pdfs/C{i:07d}.pdf" for i in ids],
+        }
+    )
+    for column in ("start_date", "end_date", "contract_date"):
+        contracts_df[column] = contracts_df[column].dt.date
+    return contracts_df[queries.CONTRACT_SUMMARY_COLUMNS]
+
+
+class StubBigQueryClient:
+    """A BigQuery client whose every query returns rows of one table.
+
+    The SQL is not run: a query returns the table's rows, up to the row limit
+    of the request and, for parameterized queries, up to the "page_size"
+    parameter. Rows are built as `bigquery.table.Row` objects once, so timings
+    include what callers do with them but not wire decoding.
+
+    Attributes:
+        queries: The SQL of every query, in order.
+    """
+
+    project = "bench"
+
+    def __init__(self, contracts_df, job_seconds=0.0, page_seconds=0.0, insert_seconds=0.0):
+        """Initializes the client.
+
+        Args:
+            contracts_df: The rows returned by every query.
+            job_seconds: The injected latency of running a query job.
+            page_seconds: The injected latency of fetching each page of rows.
+            insert_seconds: The injected latency of each streaming insert.
+        """
+        self.frame = contracts_df
+        self.arrow_table = pa.Table.from_pandas(contracts_df, preserve_index=False)
+        self.job_seconds = job_seconds
+        self.page_seconds = page_seconds
+        self.insert_seconds = insert_seconds
+        self.queries = []
+        self.inserted_rows = 0
+        self._rows = None
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            field_to_index = {column: i for i, column in enumerate(self.frame.columns)}
+            columns = [self.frame[column].tolist() for column in self.frame.columns]
+            self._rows = [Row(values, field_to_index) for values in zip(*columns)]
+        return self._rows
+
+    def query(self, query, job_config=None, **kwargs):
+        self.queries.append(query)
+        time.sleep(self.job_seconds)
+        limit = None
+        for parameter in getattr(job_config, "query_parameters", None) or []:
+            if parameter.name == "page_size":
+                limit = parameter.value
+        return StubQueryJob(self, limit)
+
+    def get_table(self, table):
+        return types.SimpleNamespace(modified=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+
+    def dataset(self, dataset_id):
+        return types.SimpleNamespace(table=lambda table_id: f"{dataset_id}.{table_id}")
+
+    def insert_rows_json(self, table, rows):
+        time.sleep(self.insert_seconds)
+        self.inserted_rows += len(rows)
+        return []
+
+    def close(self):
+        pass
+
+
+class StubQueryJob:
+    """A finished query job over the rows of a `StubBigQueryClient`."""
+
+    cache_hit = False
+
+    def __init__(self, client, limit=None):
+        self._client = client
+        self._limit = limit
+        self.total_bytes_processed = client.arrow_table.nbytes
+        # BigQuery bills at least 10 MB per query.
+        self.total_bytes_billed = max(self.total_bytes_processed, 10 * 1024 * 1024)
+
+    def result(self, max_results=None, page_size=None):
+        limits = [limit for limit in (self._limit, max_results) if limit is not None]
+        return StubRowIterator(self._client, min(limits) if limits else None, page_size)
+
+    def to_dataframe(self):
+        return self.result().to_dataframe()
+
+    def to_arrow(self, create_bqstorage_client=True):
+        return self.result().to_arrow()
+
+
+class StubRowIterator:
+    """The rows of a stub query job, iterated row by row or page by page."""
+
+    def __init__(self, client, max_results=None, page_size=None):
+        self._client = client
+        self.total_rows = len(client.frame) if max_results is None else min(max_results, len(client.frame))
+        self._page_size = page_size or 10000
+
+    @property
+    def pages(self):
+        rows = self._client.rows
+        for start in range(0, self.total_rows, self._page_size):
+            time.sleep(self._client.page_seconds)
+            yield rows[start:min(start + self._page_size, self.total_rows)]
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+    def to_dataframe(self):
+        return self._client.frame.iloc[:self.total_rows].reset_index(drop=True)
+
+    def to_arrow(self, create_bqstorage_client=True):
+        return self._client.arrow_table.slice(0, self.total_rows)
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        return self.to_arrow().to_batches(max_chunksize=self._page_size)
+
+
+def install_bigquery_client(client, project_id=None, location=None):
+    """Makes the shared client pool hand out a stub client for a project and location."""
+    pool = get_client_pool()
+    with pool._lock:
+        pool._clients[(project_id, location)] = client
+
+
+class StubExtractionModel:
+    """A stub Gemini model returning one extraction for every document."""
+
+    def __init__(self, extraction, seconds=0.0, prompt_tokens=2000):
+        self._text = json.dumps(extraction)
+        self._seconds = seconds
+        self._prompt_tokens = prompt_tokens
+        self.calls = 0
+
+    async def generate_content_async(self, contents):
+        self.calls += 1
+        await asyncio.sleep(self._seconds)
+        return types.SimpleNamespace(
+            text=self._text,
+            usage_metadata=types.SimpleNamespace(
+                prompt_token_count=self._prompt_tokens,
+                candidates_token_count=len(self._text) // 4,
+            ),
+        )
+
+
+class FakeUploadSession(requests.Session):
+    """Answers Cloud Storage upload requests without sending them anywhere."""
+
+    is_mtls = False
+
+    def __init__(self, request_seconds=0.0):
+        super().__init__()
+        self.request_seconds = request_seconds
+
+    def request(self, method, url, data=None, headers=None, **kwargs):
+        time.sleep(self.request_seconds)
+        headers = CaseInsensitiveDict(headers or {})
+        body = data.read() if hasattr(data, "read") else data
+        if "uploadType=resumable" in url and method == "POST":
+            return _response(200, {}, {"location": "https://fake-upload/session"})
+        if url.startswith("https://fake-upload/"):
+            # "bytes first-last/total", where the total is "*" until the last
+            # chunk and the range is "*" for an empty last chunk.
+            byte_range, total = headers["content-range"].split(" ")[1].split("/")
+            last = None if byte_range == "*" else int(byte_range.split("-")[1])
+            if total != "*" and (last is None or last + 1 == int(total)):
+                return _response(200, {"name": "contract.pdf", "bucket": "bench", "size": total})
+            return _response(308, {}, {"range": f"bytes=0-{last}"})
+        # Multipart uploads carry the whole file in one request.
+        del body
+        return _response(200, {"name": "contract.pdf", "bucket": "bench"})
+
+
+def _response(status_code, payload, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload).encode("utf-8")
+    response.headers = CaseInsensitiveDict({"content-type": "application/json", **(headers or {})})
+    return response
+
+
+def make_storage_client(request_seconds=0.0):
+    """Returns a real Cloud Storage client answered by `FakeUploadSession`."""
+    return storage.Client(
+        project="bench", credentials=AnonymousCredentials(), _http=FakeUploadSession(request_seconds)
+    )
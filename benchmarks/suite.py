@@ -0,0 +1,299 @@
+"""Runs every stage and end-to-end flow offline at several data sizes.
+
+BigQuery, Gemini and Cloud Storage are replaced by the deterministic stand-ins
+of `benchmarks.stubs`, with configurable injected latency, so the numbers
+measure this code and can be compared between runs. With the default zero
+latency, they are pure processing cost.
+
+Stages, run at every size:
+    execute_sql.rows, execute_sql.arrow   execute_sql returning N rows.
+    contracts_index.build                 Building the in-memory search index.
+    contracts_index.search                A search not seen before.
+    contracts_index.search_cached         The same search again.
+    contracts_index.company               A company and business unit filter.
+    contracts_page.server                 One server-side page of the list.
+    validate_and_coerce_data              Coercing N extractions.
+
+Flows:
+    chat.process_query                    A question answered with N rows.
+    contract.add                          Upload, extraction and insert of one contract.
+
+Each result holds the min and median seconds of the repeats and, where the
+code is instrumented, the median seconds of each of its spans. With
+`--baseline`, the min of every result is compared with the same stage and
+size of an earlier run saved with `--output`; the exit status is 1 if any
+stage got slower than the tolerance allows.
+
+Usage:
+    python -m benchmarks.suite --sizes 100 10000 1000000 --output results.json
+    python -m benchmarks.suite --baseline results.json --bigquery-ms 200 --model-ms 800
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.stubs import (
+    FunctionCall,
+    StubBigQueryClient,
+    StubExtractionModel,
+    Turn,
+    install_bigquery_client,
+    make_agent,
+    make_contract_summaries,
+    make_storage_client,
+)
+from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContext
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.query_tool import execute_sql
+from contract_ai_agent_modules.adk.agents.toolsets.document_processing.document_processing_tool import (
+    DocumentProcessingTool,
+    process_document,
+    validate_and_coerce_data,
+)
+from contract_ai_agent_modules.adk.utils import tracing
+from contract_ai_agent_modules.bigquery_client import BigQueryClient
+from contract_ai_agent_modules.contracts_index import ContractsSearchIndex
+from contract_ai_agent_modules.gcs_uploads import upload_contract
+
+DEFAULT_SIZES = [100, 10000, 1000000]
+# Differences below this are timer and scheduler noise, not regressions.
+NOISE_SECONDS = 0.001
+SQL = "SELECT * FROM contracts"
+EXTRACTION = {
+    "contract_id": "C0000001",
+    "contract_name": "Service agreement 1",
+    "contract_type": "Service",
+    "service_detail": "Maintenance and support of point of sale systems.",
+    "start_date": "2024-01-01",
+    "end_date": "2025-01-01",
+    "contract_date": "2023-12-15",
+    "rut_brand": "76.123.456-7",
+    "provider": "Provider 1",
+    "legal_representatives": ["John Doe", "Jane Smith"],
+    "contract_manager": "Jane Smith",
+    "financials": {"currency": "CLP", "payment_terms": "Net 30", "amount": 1000},
+    "exit_clause": "Either party may terminate with 30 days notice.",
+    "general_conditions": "The provider shall deliver the services described herein. " * 40,
+    "company": "Walmart Chile",
+    "business_unit": "IT",
+    "price": "125000.50",
+}
+
+
+class Latency:
+    """The injected latency of each stubbed service, in seconds."""
+
+    def __init__(self, bigquery_ms=0, model_ms=0, storage_ms=0):
+        self.bigquery = bigquery_ms / 1000
+        self.model = model_ms / 1000
+        self.storage = storage_ms / 1000
+
+    def to_dict(self):
+        return {"bigquery_ms": self.bigquery * 1000, "model_ms": self.model * 1000, "storage_ms": self.storage * 1000}
+
+
+def measure(function, repeat):
+    """Runs a function `repeat` times, tracing each run.
+
+    Returns:
+        The min and median seconds, and the median seconds of each span name.
+    """
+    seconds = []
+    spans = {}
+    for _ in range(repeat):
+        with tracing.trace("benchmark") as run_trace:
+            started = time.perf_counter()
+            function()
+            seconds.append(time.perf_counter() - started)
+        for name, span_seconds in run_trace.totals().items():
+            spans.setdefault(name, []).append(span_seconds)
+    return {
+        "min_seconds": min(seconds),
+        "median_seconds": statistics.median(seconds),
+        "spans": {name: statistics.median(values) for name, values in sorted(spans.items())},
+    }
+
+
+def run_size(size, repeat, latency, stages):
+    """Runs the stages and the chat flow on `size` contract rows."""
+    contracts_df = make_contract_summaries(size)
+    client = StubBigQueryClient(contracts_df, job_seconds=latency.bigquery)
+    # Rows are built once, before anything is timed.
+    client.rows
+    install_bigquery_client(client)
+    results = []
+
+    def add(stage, function, **extra):
+        if stages and stage not in stages:
+            return
+        results.append({"stage": stage, "rows": size, **measure(function, repeat), **extra})
+
+    for result_format in ("rows", "arrow"):
+        config = BigQueryToolConfig(
+            default_dataset_id="contract_data",
+            max_rows=size,
+            result_cache_enabled=False,
+            arrow_results=result_format == "arrow",
+        )
+        add(
+            f"execute_sql.{result_format}",
+            lambda config=config: asyncio.run(execute_sql(client, ReadonlyContext(), SQL, config)),
+        )
+
+    index = ContractsSearchIndex(contracts_df)
+    add("contracts_index.build", lambda: ContractsSearchIndex(contracts_df))
+    searches = iter(range(repeat))
+    # A new term every repeat, so none is served from the index's LRU.
+    add("contracts_index.search", lambda: index.filter(f"agreement {next(searches)}"))
+    add("contracts_index.search_cached", lambda: index.filter("agreement 1"))
+    add("contracts_index.company", lambda: index.filter(company="Lider", business_unit="IT"))
+
+    install_bigquery_client(client, "bench")
+    bigquery_client = BigQueryClient(project_id="bench", dataset_id="contract_data")
+    add("contracts_page.server", lambda: bigquery_client.list_contracts(search_term="agreement", page_size=50))
+
+    extractions = [dict(EXTRACTION, contract_id=f"C{i:07d}", price=str(i)) for i in range(min(size, 1000))]
+    schema = DocumentProcessingTool.BIGQUERY_SCHEMA
+    add(
+        "validate_and_coerce_data",
+        lambda: [validate_and_coerce_data(extractions[i % len(extractions)], schema) for i in range(size)],
+    )
+
+    turns = [Turn(function_calls=[FunctionCall("execute_sql", {"query": SQL})], first_chunk_seconds=latency.model)]
+    agent = make_agent(
+        turns,
+        bigquery_tool_config=BigQueryToolConfig(
+            default_dataset_id="contract_data", max_rows=size, result_cache_enabled=False
+        ),
+    )
+    questions = iter(range(repeat))
+    # A new question every repeat, so none is answered from the semantic cache.
+    add("chat.process_query", lambda: _check(asyncio.run(agent.process_query(f"List contracts {next(questions)}"))))
+    return results
+
+
+def run_add_contract(repeat, latency, pdf_bytes):
+    """Runs the add-contract flow: upload, extraction and insert."""
+    storage_client = make_storage_client(latency.storage)
+    tool = DocumentProcessingTool(
+        func=process_document,
+        model=StubExtractionModel(EXTRACTION, seconds=latency.model),
+        windowed_min_pages=None,
+        text_layer_min_coverage=None,
+    )
+    client = StubBigQueryClient(make_contract_summaries(1), insert_seconds=latency.bigquery)
+    install_bigquery_client(client, "bench")
+    bigquery_client = BigQueryClient(project_id="bench", dataset_id="contract_data")
+    pdf_content = memoryview(os.urandom(pdf_bytes))
+
+    def add_contract():
+        with tracing.span("storage.upload", bytes=len(pdf_content)):
+            gcs_uri = upload_contract(pdf_content, "contract.pdf", bucket_name="bench", client=storage_client)
+        result = _check(asyncio.run(tool._call(ReadonlyContext(), gcs_uri=gcs_uri)))
+        with tracing.span("bigquery.insert"):
+            bigquery_client.insert_row("contracts", result.result)
+
+    return {"stage": "contract.add", "rows": 1, "pdf_bytes": pdf_bytes, **measure(add_contract, repeat)}
+
+
+def _check(result):
+    if not result.is_successful:
+        raise RuntimeError(result.error)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Adds each result's ratio to the same stage and size of a baseline run.
+
+    Returns:
+        The stages whose min seconds exceed the baseline's by more than the
+        tolerance ratio and the noise floor.
+    """
+    baseline_seconds = {(result["stage"], result["rows"]): result["min_seconds"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline_seconds.get((result["stage"], result["rows"]))
+        if previous is None:
+            continue
+        result["baseline_min_seconds"] = previous
+        result["ratio"] = result["min_seconds"] / previous if previous else None
+        if (
+            result["ratio"] is not None
+            and result["ratio"] > tolerance
+            and result["min_seconds"] - previous > NOISE_SECONDS
+        ):
+            regressions.append(f"{result['stage']} ({result['rows']} rows)")
+    return regressions
+
+
+def run_info(args, latency):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sizes": args.sizes,
+        "repeat": args.repeat,
+        "latency": latency.to_dict(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Numbers of contract rows.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each stage.")
+    parser.add_argument("--stages", nargs="+", help="Only run these stages.")
+    parser.add_argument("--bigquery-ms", type=int, default=0, help="Injected latency of each BigQuery job and insert.")
+    parser.add_argument("--model-ms", type=int, default=0, help="Injected latency of each Gemini call.")
+    parser.add_argument("--storage-ms", type=int, default=0, help="Injected latency of each Cloud Storage request.")
+    parser.add_argument("--pdf-kb", type=int, default=512, help="Size of the contract of the add-contract flow.")
+    parser.add_argument("--output", help="Also write the results to this file.")
+    parser.add_argument("--baseline", help="Compare with the results of an earlier run.")
+    parser.add_argument(
+        "--tolerance", type=float, default=1.2, help="Ratio to the baseline above which a stage regressed."
+    )
+    args = parser.parse_args()
+    # The agent and the tools log every query, which would dominate the timings.
+    logging.disable(logging.INFO)
+
+    latency = Latency(args.bigquery_ms, args.model_ms, args.storage_ms)
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args.repeat, latency, args.stages))
+    if not args.stages or "contract.add" in args.stages:
+        results.append(run_add_contract(args.repeat, latency, args.pdf_kb * 1024))
+
+    report = {"benchmark": "suite", "run": run_info(args, latency), "results": results}
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        report["baseline"] = baseline["run"]
+        report["regressions"] = regressions
+    output = json.dumps(report, indent=2, default=str)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Measures peak memory per contract upload, before and after the zero-copy path.
+
+The "before" path is what the Analyze page used to do: `getvalue()` on the
+upload, a non-resumable upload with a new storage client, a temporary file
+written and read back, and the PDF bytes sent inline to Gemini. The "after"
+path uploads a view of the upload's bytes in resumable chunks with the shared
+client and hands Gemini the gs:// URI.
+
+Both paths run the real Cloud Storage client against an in-process HTTP
+transport, so no network access or credentials are needed. Peak memory is the
+tracemalloc peak above the memory held before the upload.
+
+Usage:
+    python -m benchmarks.upload_memory --megabytes 5 20
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+
+from vertexai.generative_models import Part
+
+from benchmarks.stubs import make_storage_client
+from contract_ai_agent_modules.gcs_uploads import upload_contract
+
+
+def run_before(uploaded_file):
+    """getvalue(), a new client, a temp file round trip and inline bytes."""
+    client = make_storage_client()
+    blob = client.bucket("bench").blob("contract.pdf")
+    blob.upload_from_file(uploaded_file)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+        temp_file.write(uploaded_file.getvalue())
+        temp_file_path = temp_file.name
+    try:
+        with open(temp_file_path, "rb") as f:
+            pdf_content = f.read()
+        hashlib.sha256(pdf_content).hexdigest()
+        return Part.from_data(data=pdf_content, mime_type="application/pdf")
+    finally:
+        os.remove(temp_file_path)
+
+
+def run_after(uploaded_file, client):
+    """A view of the upload's bytes, chunked resumable upload and a gs:// URI."""
+    pdf_content = memoryview(uploaded_file.getvalue())
+    gcs_uri = upload_contract(pdf_content, "contract.pdf", bucket_name="bench", client=client)
+    hashlib.sha256(pdf_content).hexdigest()
+    return Part.from_uri(gcs_uri, mime_type="application/pdf")
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def run(megabytes_list):
+    """Runs both paths for each file size and returns peak memory in bytes."""
+    results = []
+    shared_client = make_storage_client()
+    for megabytes in megabytes_list:
+        data = os.urandom(megabytes * 1024 * 1024)
+        before = measure(run_before, io.BytesIO(data))
+        after = measure(run_after, io.BytesIO(data), shared_client)
+        results.append(
+            {
+                "file_bytes": len(data),
+                "before_peak_bytes": before,
+                "after_peak_bytes": after,
+                "before_copies": round(before / len(data), 2),
+                "after_copies": round(after / len(data), 2),
+            }
+        )
+    return {"benchmark": "upload_memory", "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=int, nargs="+", default=[5, 20], help="Sizes of the uploaded PDFs.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.megabytes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import threading
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
+from contract_ai_agent_modules.adk.utils import tracing
+
+EVENT_TEXT = "text"
+EVENT_TOOL_CALL = "tool_call"
+EVENT_TOOL_RESULT = "tool_result"
+EVENT_DONE = "done"
+
+DEFAULT_LATENCY_MAX_ENTRIES = 1000
+
+
+@dataclasses.dataclass(frozen=True)
+class StepTiming:
+  """How long a step of an answer took.
+
+  Attributes:
+    step: The number of the step, starting at 1.
+    model_seconds: The time spent waiting for the model's turn.
+    tool_seconds: The name and duration of each tool call of the step.
+    tools_seconds: The wall time of the step's tool calls, which run
+      concurrently.
+  """
+
+  step: int
+  model_seconds: float
+  tool_seconds: Tuple[Tuple[str, float], ...] = ()
+  tools_seconds: float = 0.0
+
+  @property
+  def sequential_seconds(self) -> float:
+    """The time the tool calls would have taken one after the other."""
+    return sum(seconds for _, seconds in self.tool_seconds)
+
+  @property
+  def saved_seconds(self) -> float:
+    """The time saved by running the tool calls concurrently."""
+    return max(self.sequential_seconds - self.tools_seconds, 0.0)
+
+
+@dataclasses.dataclass(frozen=True)
+class ChatLatency:
+  """How long a streamed answer took.
+
+  Attributes:
+    first_token_seconds: The time until the model's first text chunk or tool
+      call, or None if the model was not called, e.g. on a semantic cache hit.
+    total_seconds: The time until the answer was complete.
+    chunks: The number of chunks received from the model.
+    steps: The timing of each step of the answer.
+  """
+
+  first_token_seconds: Optional[float]
+  total_seconds: float
+  chunks: int
+  steps: Tuple[StepTiming, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class AgentEvent:
+  """An event of a streamed answer.
+
+  Attributes:
+    kind: "text" for a chunk of model text, "tool_call" when the model calls a
+      tool, "tool_result" when a tool call sent back to the model finishes,
+      and "done" once, last, with the result.
+    text: The text chunk of a "text" event.
+    tool_name: The tool of a "tool_call" or "tool_result" event.
+    tool_args: The arguments of a "tool_call" event.
+    result: The tool result of a "tool_result" event, or the result of a
+      "done" event, as `process_query` returns it.
+    latency: The latency of a "done" event.
+    trace: The trace of the answer, on a "done" event. It is still open when
+      the result holds a `row_stream`, so the query's spans are part of it;
+      the caller finishes it once the rows are consumed.
+  """
+
+  kind: str
+  text: Optional[str] = None
+  tool_name: Optional[str] = None
+  tool_args: Optional[Dict[str, Any]] = None
+  result: Optional[ToolResult] = None
+  latency: Optional[ChatLatency] = None
+  trace: Optional[tracing.Trace] = None
+
+
+class ChatLatencyMetrics:
+  """Keeps the latency of the most recent streamed answers."""
+
+  def __init__(self, max_entries: int = DEFAULT_LATENCY_MAX_ENTRIES):
+    self._entries: Deque[ChatLatency] = collections.deque(maxlen=max_entries)
+    self._lock = threading.Lock()
+
+  def record(self, latency: ChatLatency):
+    with self._lock:
+      self._entries.append(latency)
+
+  def recent(self) -> List[ChatLatency]:
+    """Returns the kept latencies, oldest first."""
+    with self._lock:
+      return list(self._entries)
+
+
+_chat_latency_metrics: Optional[ChatLatencyMetrics] = None
+_chat_latency_metrics_lock = threading.Lock()
+
+
+def get_chat_latency_metrics() -> ChatLatencyMetrics:
+  """Returns the process-wide chat latency metrics."""
+  global _chat_latency_metrics
+  with _chat_latency_metrics_lock:
+    if _chat_latency_metrics is None:
+      _chat_latency_metrics = ChatLatencyMetrics()
+    return _chat_latency_metrics
@@ -14,29 +14,53 @@
 
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Any, AsyncIterator, Callable, List, NamedTuple, Optional, Tuple, Union
 
+import asyncio
+import json
+import logging
 import os # Import os for environment variables
 import subprocess
+import time
 from dotenv import load_dotenv # Import load_dotenv
 import vertexai
 from google.api_core.client_options import ClientOptions
-from vertexai.generative_models import GenerativeModel, Tool # Import GenerativeModel and Tool from vertexai
+from vertexai.generative_models import GenerativeModel, Part, Tool # Import GenerativeModel and Tool from vertexai
 
 load_dotenv() # Load environment variables from .env file
 
 from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContext
 from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
 from contract_ai_agent_modules.adk.tools.base_toolset import BaseToolset
+from contract_ai_agent_modules.adk.tools.tool_registry import ToolRegistry
 from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
+from contract_ai_agent_modules.adk.utils import tracing
 from contract_ai_agent_modules.adk.utils.feature_decorator import experimental
+from contract_ai_agent_modules.adk.agents.main_agent.agent_events import (
+    EVENT_DONE,
+    EVENT_TEXT,
+    EVENT_TOOL_CALL,
+    EVENT_TOOL_RESULT,
+    AgentEvent,
+    ChatLatency,
+    ChatLatencyMetrics,
+    StepTiming,
+    get_chat_latency_metrics,
+)
+from contract_ai_agent_modules.adk.agents.main_agent.prompt_cache import ContextCache, PromptTemplate
+from contract_ai_agent_modules.adk.agents.main_agent.semantic_cache import SemanticQuestionCache, vertex_embedding_function
 
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_toolset import BigQueryToolset
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_credentials import BigQueryCredentialsConfig
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.client_pool import get_client_pool
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.query_tool import stream_sql
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.schema_catalog import SchemaCatalog, get_schema_catalog
 from contract_ai_agent_modules.adk.agents.toolsets.general_insights.general_insights_toolset import GeneralInsightsToolset
 from contract_ai_agent_modules.adk.agents.toolsets.document_processing.document_processing_toolset import DocumentProcessingToolset
 
+DEFAULT_MAX_STEPS = 5
+
 
 @experimental
 class ContractAgent:
@@ -47,6 +71,13 @@ class ContractAgent:
       bigquery_credentials_config: Optional[BigQueryCredentialsConfig] = None,
       bigquery_tool_config: Optional[BigQueryToolConfig] = None,
       model_name: str = "gemini-2.5-flash", # Default model name
+      schema_catalog: Optional[SchemaCatalog] = None,
+      semantic_cache: Optional[SemanticQuestionCache] = None,
+      model: Optional[GenerativeModel] = None,
+      latency_metrics: Optional[ChatLatencyMetrics] = None,
+      max_steps: int = DEFAULT_MAX_STEPS,
+      prompt_template: Optional[PromptTemplate] = None,
+      context_cache: Optional[ContextCache] = None,
   ):
     self._bigquery_toolset = BigQueryToolset(
         credentials_config=bigquery_credentials_config,
@@ -55,151 +86,484 @@ class ContractAgent:
     )
     self._general_insights_toolset = GeneralInsightsToolset()
     self._document_processing_toolset = DocumentProcessingToolset()
+    # Table schemas are shared by every agent in the process so the metadata
+    # round trip is paid once, not once per question.
+    self._schema_catalog = schema_catalog or get_schema_catalog()
+    # Paraphrases of an already answered question reuse its SQL instead of
+    # paying for another model round trip.
+    # An empty cache is falsy, so test for None rather than truthiness.
+    if semantic_cache is None:
+      semantic_cache = SemanticQuestionCache(vertex_embedding_function())
+    self._semantic_cache = semantic_cache
 
-    # Initialize Vertex AI
-    project_id = os.environ.get("PROJECT_ID")
-    location = os.environ.get("VERTEX_AI_LOCATION")
-    vertexai.init(project=project_id, location=location)
+    self._latency_metrics = latency_metrics or get_chat_latency_metrics()
+    # The number of model turns an answer may take, each of them possibly
+    # calling tools whose results are sent back to the model.
+    self._max_steps = max_steps
 
-    # Get the model
-    self._model = GenerativeModel(model_name)
+    # Get the model. Anything with the same start_chat() interface, such as a
+    # stub emitting scheduled chunks, can be passed instead.
+    if model is None:
+      # Initialize Vertex AI
+      project_id = os.environ.get("PROJECT_ID")
+      location = os.environ.get("VERTEX_AI_LOCATION")
+      vertexai.init(project=project_id, location=location)
+      model = GenerativeModel(model_name)
+      # The static instructions and schema are registered once as cached
+      # content when CONTEXT_CACHE_TTL_SECONDS is set. The default prompt is
+      # below Vertex AI's minimum cacheable size, so caching is off by default.
+      ttl_seconds = float(os.environ.get("CONTEXT_CACHE_TTL_SECONDS", 0))
+      if context_cache is None and ttl_seconds > 0:
+        context_cache = ContextCache(model_name, ttl_seconds=ttl_seconds)
+    self._model = model
+    self._prompt_template = prompt_template or PromptTemplate()
+    self._context_cache = context_cache
 
-  async def process_query(self, query: str) -> ToolResult:
+  async def process_query(
+      self, query: str, stream_results: bool = False
+  ) -> ToolResult:
     """Processes a natural language query related to contracts.
 
+    The model may call tools over several steps; see `stream_query`.
+
     Args:
       query: The natural language query from the user.
+      stream_results: If set, SQL answers are not executed eagerly. The result
+        holds a `row_stream` that fetches the rows page by page as it is
+        iterated. The answer's trace is exported before the rows are read.
 
     Returns:
       A ToolResult containing the response from the relevant tool.
     """
+    result = None
+    async for event in self._answer(query, stream_results, stream=False):
+      if event.kind == EVENT_DONE:
+        result = event.result
+        event.trace.finish()
+        for timing in event.latency.steps:
+          logging.info(
+              "Agent step %d: model %.3fs, %d tool calls in %.3fs (%.3fs saved by running them concurrently)",
+              timing.step,
+              timing.model_seconds,
+              len(timing.tool_seconds),
+              timing.tools_seconds,
+              timing.saved_seconds,
+          )
+    return result
+
+  async def stream_query(
+      self, query: str, stream_results: bool = True
+  ) -> AsyncIterator[AgentEvent]:
+    """Processes a query, yielding the model's output as it is generated.
+
+    The model answers in steps. In each step, text chunks and tool calls are
+    yielded as the model streams them. The tool calls of a step run
+    concurrently, their results are yielded and sent back to the model, and
+    the next step starts, up to the agent's step budget. A step that only
+    calls `execute_sql` ends the answer with the rows of the query, and a
+    step without tool calls ends it with its text, handled like in
+    `process_query`. A last "done" event carries the result and the latency,
+    with per-step timings, which is also recorded in the agent's latency
+    metrics. The timing spans of every stage, including those of the tools,
+    are in the result's "trace" metadata, and the "done" event carries the
+    trace. When the result holds a `row_stream`, the trace is left open so the
+    spans of its query are recorded in it; finish it once the rows are read.
+
+    Args:
+      query: The natural language query from the user.
+      stream_results: If set, SQL answers are not executed eagerly; see
+        `process_query`.
+
+    Yields:
+      The events of the answer, the last one of kind "done".
+    """
+    async for event in self._answer(query, stream_results, stream=True):
+      yield event
+
+  async def _answer(
+      self, query: str, stream_results: bool, stream: bool
+  ) -> AsyncIterator[AgentEvent]:
+    """Runs the agent loop of `stream_query`, streaming the model or not."""
+    started = time.perf_counter()
+    first_token_seconds = None
+    chunks = 0
+    steps = []
     readonly_context = ReadonlyContext()
-    schema_toolset = BigQueryToolset(
-        credentials_config=self._bigquery_toolset._credentials_config,
-        bigquery_tool_config=self._bigquery_toolset._tool_config,
-        tool_name="get_table_schema",
+    # The trace is only made the active one around blocks that do not yield:
+    # each step of this generator may run in a different context.
+    answer_trace = tracing.Trace("agent.answer", parent=tracing.current_trace())
+    with tracing.activate(answer_trace):
+      prepared = await self._prepare_query(readonly_context, query, stream_results)
+    if isinstance(prepared, ToolResult):
+      result = prepared
+    else:
+      tool_registry, schema_version, model_input = prepared
+      genai_tools = model_input.tools
+      chat_session = model_input.model.start_chat()
+      message = model_input.message
+      result = None
+      for step in range(1, self._max_steps + 1):
+        model_started = time.perf_counter()
+        model_span = tracing.Span("agent.model_turn", started=model_started)
+        model_span.set(step=step)
+        if stream:
+          responses = await chat_session.send_message_async(message, tools=genai_tools, stream=True)
+        else:
+          responses = _single_response(await chat_session.send_message_async(message, tools=genai_tools))
+        # Consecutive text chunks form one text part of the full response.
+        parts = []
+        async for response in responses:
+          chunks += 1
+          # Streamed responses carry the token counts of the turn so far.
+          model_span.set(**_usage_tokens(response))
+          for part in _response_parts(response):
+            function_call = _part_function_call(part)
+            text = None if function_call else _part_text(part)
+            if not function_call and not text:
+              continue
+            if first_token_seconds is None:
+              first_token_seconds = time.perf_counter() - started
+            if function_call:
+              parts.append(part)
+              if stream:
+                yield AgentEvent(
+                    kind=EVENT_TOOL_CALL,
+                    tool_name=function_call.name,
+                    tool_args={k: v for k, v in function_call.args.items()},
+                )
+            else:
+              if parts and isinstance(parts[-1], _TextPart):
+                parts[-1].text += text
+              else:
+                parts.append(_TextPart(text))
+              if stream:
+                yield AgentEvent(kind=EVENT_TEXT, text=text)
+        model_seconds = time.perf_counter() - model_started
+        model_span.seconds = model_seconds
+        answer_trace.record(model_span)
+
+        function_calls = [part.function_call for part in parts if _part_function_call(part)]
+        if not function_calls or (
+            len(function_calls) == 1 and function_calls[0].name == "execute_sql"
+        ):
+          steps.append(StepTiming(step=step, model_seconds=model_seconds))
+          with tracing.activate(answer_trace):
+            for part in parts:
+              result = await self._respond_to_part(
+                  readonly_context, tool_registry, query, schema_version, part, stream_results
+              )
+              if result is not None:
+                break
+          if result is None:
+            result = ToolResult.from_error(error="No valid response from agent.")
+          break
+
+        # Every tool call of the step runs concurrently, and their results
+        # go back to the model together.
+        tools_started = time.perf_counter()
+        with tracing.activate(answer_trace), tracing.span(
+            "agent.tool_calls", step=step, calls=len(function_calls)
+        ):
+          timed_results = await asyncio.gather(*(
+              self._timed_tool_call(readonly_context, tool_registry, function_call)
+              for function_call in function_calls
+          ))
+        steps.append(StepTiming(
+            step=step,
+            model_seconds=model_seconds,
+            tool_seconds=tuple(
+                (function_call.name, seconds)
+                for function_call, (_, seconds) in zip(function_calls, timed_results)
+            ),
+            tools_seconds=time.perf_counter() - tools_started,
+        ))
+        message = []
+        for function_call, (tool_result, _) in zip(function_calls, timed_results):
+          if stream:
+            yield AgentEvent(kind=EVENT_TOOL_RESULT, tool_name=function_call.name, result=tool_result)
+          message.append(_function_response(
+              function_call.name, tool_result, self._bigquery_toolset._tool_config.max_rows
+          ))
+      else:
+        result = ToolResult.from_error(
+            f"The agent did not finish answering within {self._max_steps} steps."
+        )
+
+    latency = ChatLatency(
+        first_token_seconds=first_token_seconds,
+        total_seconds=time.perf_counter() - started,
+        chunks=chunks,
+        steps=tuple(steps),
     )
-    schema_tools = await schema_toolset.get_tools(readonly_context)
-    schema_tool = schema_tools[0]
-    schema_result = await schema_tool._call(
-        readonly_context, table_id="contracts"
+    if stream:
+      self._latency_metrics.record(latency)
+    # A row stream runs its query as it is consumed, so the trace stays open
+    # for the caller to finish once it has read the rows.
+    streams_rows = (
+        result is not None
+        and result.is_successful
+        and isinstance(result.result, dict)
+        and "row_stream" in result.result
     )
+    if not streams_rows:
+      answer_trace.finish()
+    if result is not None:
+      result = result.with_metadata(trace=answer_trace.to_dict())
+    yield AgentEvent(kind=EVENT_DONE, result=result, latency=latency, trace=answer_trace)
+
+  async def _timed_tool_call(
+      self, readonly_context: ReadonlyContext, tool_registry: ToolRegistry, function_call
+  ) -> Tuple[ToolResult, float]:
+    """Calls a tool, returning its result and how long it took."""
+    started = time.perf_counter()
+    tool_args = {k: v for k, v in function_call.args.items()}
+    result = await self._call_tool(readonly_context, tool_registry, function_call.name, tool_args)
+    return result, time.perf_counter() - started
+
+  async def _call_tool(
+      self,
+      readonly_context: ReadonlyContext,
+      tool_registry: ToolRegistry,
+      tool_name: str,
+      tool_args: dict,
+  ) -> ToolResult:
+    """Calls a tool by name, turning failures into error results."""
+    tool = tool_registry.get(tool_name)
+    if tool is None:
+        return ToolResult.from_error(f"Tool '{tool_name}' not found.")
+    try:
+        tool_result = await tool._call(readonly_context, **tool_args)
+    except Exception as e:
+        return ToolResult.from_error(f"Error executing tool '{tool_name}': {e}")
+    if tool_result.is_successful:
+        return tool_result
+    return ToolResult.from_error(f"Tool execution failed: {tool_result.error}")
+
+  async def _prepare_query(
+      self, readonly_context: ReadonlyContext, query: str, stream_results: bool
+  ) -> Union[ToolResult, Tuple[ToolRegistry, str, _ModelTurnInput]]:
+    """Gets what answering a query with the model needs.
+
+    Returns:
+      The tool registry, schema version and the model to ask with its first
+      message, or a ToolResult if the query is already answered: an error, or
+      a semantic cache hit.
+    """
+    with tracing.span("agent.schema"):
+      schema_result = self._get_contracts_schema()
     if not schema_result.is_successful:
         return schema_result
     schema = schema_result.result["schema"]
+    schema_version = schema_result.result["schema_version"]
+
+    tool_registry = self._bigquery_toolset.get_tool_registry(readonly_context)
+
+    cached_result = await self._answer_from_semantic_cache(
+        readonly_context, tool_registry, query, schema_version, stream_results
+    )
+    if cached_result is not None:
+        return cached_result
+
+    # The registry builds the vertexai.generative_models.Tool declarations
+    # once and reuses them for every question.
+    genai_tools = tool_registry.function_declarations()
+    if self._context_cache is not None:
+      key = "-".join([self._prompt_template.prefix_key(schema_version), *tool_registry.names])
+      # Registering the prefix is a network call, so keep it off the event loop.
+      with tracing.span("agent.context_cache") as cache_span:
+        cached_model = await asyncio.to_thread(
+            self._context_cache.get_model,
+            key,
+            self._prompt_template.render_prefix(schema),
+            genai_tools,
+        )
+        cache_span.set(hit=cached_model is not None)
+      if cached_model is not None:
+        # The instructions, schema and tools are referenced by the cached
+        # content's handle, so only the question is sent.
+        return (
+            tool_registry,
+            schema_version,
+            _ModelTurnInput(cached_model, self._prompt_template.render_question(query), None),
+        )
+    return (
+        tool_registry,
+        schema_version,
+        _ModelTurnInput(self._model, self._prompt_template.render(schema, query), genai_tools),
+    )
+
+  async def _respond_to_part(
+      self,
+      readonly_context: ReadonlyContext,
+      tool_registry: ToolRegistry,
+      query: str,
+      schema_version: str,
+      part,
+      stream_results: bool,
+  ) -> Optional[ToolResult]:
+    """Acts on a part of the model's response.
+
+    Returns:
+      The answer, or None if the part holds neither a function call nor text.
+    """
+    # The google-generativeai library's Part object might have different attributes
+    # for function calls and text. We need to adapt to its structure.
+    # The error indicates a problem with 'data' oneof fields, suggesting
+    # a single Part might be trying to hold multiple types of content.
+    # We check for function_call or text.
+    if _part_function_call(part):
+        # Execute the tool call
+        tool_call = part.function_call
+        tool_name = tool_call.name
+        # Convert tool_call.args to a dictionary if it's not already
+        tool_args = {k: v for k, v in tool_call.args.items()}
+
+        if stream_results and tool_name == "execute_sql" and tool_args.get("query"):
+            return self._stream_sql(
+                tool_args["query"],
+                on_success=lambda: self._semantic_cache.store(query, tool_args["query"], schema_version),
+            )
+
+        # Find the tool and execute it
+        tool_result = await self._call_tool(readonly_context, tool_registry, tool_name, tool_args)
+        if tool_result.is_successful and tool_name == "execute_sql" and tool_args.get("query"):
+            self._semantic_cache.store(query, tool_args["query"], schema_version)
+        return tool_result
+    elif _part_text(part):
+        # If the model returns text, check if it's a valid SQL query
+        sql_query = part.text.strip()
+        # A simple check to see if the response is likely a SQL query
+        if sql_query.upper().startswith('SELECT') or '```sql' in sql_query:
+            # Extract SQL from markdown code block if present
+            if '```sql' in sql_query:
+                sql_query = sql_query.split('```sql')[1].split('```')[0].strip()
+            
+            if stream_results:
+                return self._stream_sql(
+                    sql_query,
+                    on_success=lambda: self._semantic_cache.store(query, sql_query, schema_version),
+                )
+
+            # Find the execute_sql tool and execute it
+            tool = tool_registry.get("execute_sql")
+            if tool is None:
+                return ToolResult.from_error("SQL execution tool not found.")
+            try:
+                tool_result = await tool._call(readonly_context, query=sql_query)
+                if tool_result.is_successful:
+                    self._semantic_cache.store(query, sql_query, schema_version)
+                    return tool_result
+                else:
+                    return ToolResult.from_error(f"SQL execution failed: {tool_result.error}")
+            except Exception as e:
+                return ToolResult.from_error(f"Error executing SQL query: {e}")
+        else:
+            # The model returned text that is not a SQL query, so we treat it as a successful natural language response.
+            return ToolResult(result={"response": sql_query})
+    return None
+
+  async def _answer_from_semantic_cache(
+      self,
+      readonly_context: ReadonlyContext,
+      tool_registry: ToolRegistry,
+      query: str,
+      schema_version: str,
+      stream_results: bool = False,
+  ) -> Optional[ToolResult]:
+    """Answers a query with the SQL of a similar, previously answered one.
+
+    Returns:
+      The result of running the cached SQL, or None if there is no similar
+      question or the cached SQL failed. Cached SQL that fails is dropped from
+      the cache; streamed results are not run here, so theirs is dropped when
+      the stream fails.
+    """
+    # Embedding may be a network call, so keep it off the event loop.
+    with tracing.span("agent.semantic_cache") as cache_span:
+      hit = await asyncio.to_thread(
+          self._semantic_cache.lookup, query, schema_version
+      )
+      cache_span.set(hit=hit is not None)
+    tool = tool_registry.get("execute_sql")
+    if hit is None or tool is None:
+      return None
+    logging.info(
+        "Semantic cache hit (similarity %.3f) for question: %s",
+        hit.similarity,
+        query,
+    )
+    if stream_results:
+      return self._stream_sql(
+          hit.sql, on_error=lambda e: self._semantic_cache.discard(hit.question)
+      )
+    tool_result = await tool._call(readonly_context, query=hit.sql)
+    if not tool_result.is_successful:
+      self._semantic_cache.discard(hit.question)
+      return None
+    return tool_result
+
+  def _stream_sql(
+      self,
+      sql_query: str,
+      on_success: Optional[Callable[[], None]] = None,
+      on_error: Optional[Callable[[Exception], None]] = None,
+  ) -> ToolResult:
+    """Wraps a SQL query in a row stream without running it."""
+    return ToolResult.success({
+        "row_stream": stream_sql(
+            self._get_bigquery_client(),
+            sql_query,
+            self._bigquery_toolset._tool_config,
+            on_success=on_success,
+            on_error=on_error,
+        )
+    })
+
+  def _get_bigquery_client(self):
+    """Gets the pooled BigQuery client of the agent's credentials."""
+    credentials_config = self._bigquery_toolset._credentials_config
+    return get_client_pool().get_client(
+        credentials_config.project_id if credentials_config else None,
+        credentials_config.location if credentials_config else None,
+    )
 
-    all_tools = await self._bigquery_toolset.get_tools(readonly_context)
-    
-    # Convert BaseTool objects to vertexai.generative_models.Tool objects
-    # Convert BaseTool objects to google.generativeai.types.Tool objects
-    # The google.generativeai library expects a list of FunctionDeclaration objects directly
-    # within the tools parameter, not wrapped in a Tool object.
-    # So, we extract the function_declarations from our BaseTool objects.
-    genai_tools = [tool.to_function_declaration() for tool in all_tools]
-
-    # Send the query to the model
-    chat_session = self._model.start_chat()
-    prompt = f"""You are a BigQuery expert and a helpful assistant. Your primary goal is to provide accurate answers about contracts.
-
-**Instructions:**
-1.  **If the user asks for data (e.g., "list all contracts"), generate a SQL query.**
-2.  **If the user asks to "explain the schema", you MUST return a JSON object with a single key, "schema_explanation", containing a list of objects. Each object must have "name", "type", and "description" keys.**
-    **Example JSON Output:**
-    ```json
-    {{
-      "schema_explanation": [
-        {{
-          "name": "contract_id",
-          "type": "STRING",
-          "description": "Unique identifier for the contract."
-        }},
-        {{
-          "name": "contract_name",
-          "type": "STRING",
-          "description": "Name of the contract."
-        }}
-      ]
-    }}
-    ```
-3.  **For any other general question (e.g., "what can you do?"), provide a clear, user-friendly response in standard text.**
-
-**Schema for `contracts` table:**
-{schema}
-
-**SQL Generation Rules:**
-- When a query requires the status of a contract, derive it using a `CASE` statement with the following logic:
-  - **Active**: `CURRENT_DATE() BETWEEN start_date AND end_date`
-  - **Expired**: `CURRENT_DATE() > end_date`
-  - **Pending**: `CURRENT_DATE() < start_date`
-- For upcoming expirations, consider contracts expiring in the next 90 days.
-- For total penalty amount, sum the `penalty_amount` column.
-- For average contract value, calculate the average of the `price` column.
-
-**User Request:**
-{query}
-"""
-    response = chat_session.send_message(prompt, tools=genai_tools)
-
-    # Process the model's response
-    if response.candidates:
-        candidate = response.candidates[0]
-        # The google-generativeai library's Part object might have different attributes
-        # for function calls and text. We need to adapt to its structure.
-        # The error indicates a problem with 'data' oneof fields, suggesting
-        # a single Part might be trying to hold multiple types of content.
-        # We'll iterate through parts and check for function_call or text.
-        if candidate.content and candidate.content.parts:
-            for part in candidate.content.parts:
-                if hasattr(part, 'function_call') and part.function_call:
-                    # Execute the tool call
-                    tool_call = part.function_call
-                    tool_name = tool_call.name
-                    # Convert tool_call.args to a dictionary if it's not already
-                    tool_args = {k: v for k, v in tool_call.args.items()}
-
-                    # Find the tool and execute it
-                    for tool in all_tools:
-                        if tool.name == tool_name:
-                            try:
-                                tool_result = await tool._call(readonly_context, **tool_args)
-                                if tool_result.is_successful:
-                                    return tool_result
-                                else:
-                                    return ToolResult.from_error(f"Tool execution failed: {tool_result.error}")
-                            except Exception as e:
-                                return ToolResult.from_error(f"Error executing tool '{tool_name}': {e}")
-                    return ToolResult.from_error(f"Tool '{tool_name}' not found.")
-                elif hasattr(part, 'text') and part.text:
-                    # If the model returns text, check if it's a valid SQL query
-                    sql_query = part.text.strip()
-                    # A simple check to see if the response is likely a SQL query
-                    if sql_query.upper().startswith('SELECT') or '```sql' in sql_query:
-                        # Extract SQL from markdown code block if present
-                        if '```sql' in sql_query:
-                            sql_query = sql_query.split('```sql')[1].split('```')[0].strip()
-                        
-                        # Find the execute_sql tool and execute it
-                        for tool in all_tools:
-                            if tool.name == "execute_sql":
-                                try:
-                                    tool_result = await tool._call(readonly_context, query=sql_query)
-                                    if tool_result.is_successful:
-                                        return tool_result
-                                    else:
-                                        return ToolResult.from_error(f"SQL execution failed: {tool_result.error}")
-                                except Exception as e:
-                                    return ToolResult.from_error(f"Error executing SQL query: {e}")
-                        return ToolResult.from_error("SQL execution tool not found.")
-                    else:
-                        # The model returned text that is not a SQL query, so we treat it as a successful natural language response.
-                        return ToolResult(result={"response": sql_query})
-    return ToolResult.from_error(error="No valid response from agent.")
-
-  async def add_new_contract(self, file_path: str) -> ToolResult:
+  def _get_contracts_schema(self) -> ToolResult:
+    """Gets the `contracts` table schema from the schema catalog."""
+    tool_config = self._bigquery_toolset._tool_config
+    dataset_id = tool_config.default_dataset_id if tool_config else None
+    if not dataset_id:
+      return ToolResult.from_error("Dataset ID must be provided or set in config.")
+
+    try:
+      entry = self._schema_catalog.get_schema(
+          self._get_bigquery_client,
+          dataset_id,
+          "contracts",
+          ttl_seconds=tool_config.schema_cache_ttl_seconds,
+      )
+    except Exception as e:
+      return ToolResult.from_error(f"Error getting table schema: {e}")
+    return ToolResult.success(
+        {"schema": entry.schema, "schema_version": entry.fingerprint}
+    )
+
+  async def add_new_contract(
+      self,
+      file_path: Optional[str] = None,
+      force_reextract: bool = False,
+      pdf_content: Optional[Union[bytes, memoryview]] = None,
+      gcs_uri: Optional[str] = None,
+  ) -> ToolResult:
       """Adds a new contract by processing a file.
 
       Args:
           file_path: The absolute path to the contract PDF file.
+          force_reextract: Extract the contract again even if the same file was
+            processed before.
+          pdf_content: The contents of the contract PDF, used instead of reading
+            `file_path`. A memoryview is used without copying it.
+          gcs_uri: The gs:// URI of the uploaded contract, which the model reads
+            instead of receiving the PDF inline.
 
       Returns:
           A ToolResult indicating the success or failure of the operation.
@@ -208,10 +572,101 @@ class ContractAgent:
       tools = await self._document_processing_toolset.get_tools(readonly_context)
       process_document_tool = tools[0]
 
-      return await process_document_tool._call(readonly_context, file_path=file_path)
+      return await process_document_tool._call(
+          readonly_context,
+          file_path=file_path,
+          force_reextract=force_reextract,
+          pdf_content=pdf_content,
+          gcs_uri=gcs_uri,
+      )
 
   async def close(self):
     """Closes the agent and its underlying toolsets."""
+    if self._context_cache is not None:
+      await asyncio.to_thread(self._context_cache.close)
     await self._bigquery_toolset.close()
     await self._general_insights_toolset.close()
-    await self._document_processing_toolset.close()
\ No newline at end of file
+    await self._document_processing_toolset.close()
+
+
+class _ModelTurnInput(NamedTuple):
+  """The model asked for an answer and its first message.
+
+  Attributes:
+    model: The model, possibly built from cached content.
+    message: The first message: the whole prompt, or only the question when
+      the prefix is cached.
+    tools: The tool declarations to send, or None when they are cached.
+  """
+
+  model: Any
+  message: str
+  tools: Optional[List[Tool]]
+
+
+class _TextPart:
+  """The text of consecutive streamed chunks, as one response part."""
+
+  function_call = None
+
+  def __init__(self, text: str):
+    self.text = text
+
+
+def _response_parts(response) -> list:
+  """Returns the parts of the first candidate of a model response."""
+  if not response.candidates:
+    return []
+  candidate = response.candidates[0]
+  if not candidate.content or not candidate.content.parts:
+    return []
+  return list(candidate.content.parts)
+
+
+def _part_function_call(part):
+  return part.function_call if hasattr(part, 'function_call') and part.function_call else None
+
+
+def _part_text(part) -> Optional[str]:
+  return part.text if hasattr(part, 'text') and part.text else None
+
+
+def _usage_tokens(response) -> dict:
+  """Returns the token counts of a model response, if it has any."""
+  usage_metadata = getattr(response, "usage_metadata", None)
+  if usage_metadata is None:
+    return {}
+  return {
+      "prompt_tokens": getattr(usage_metadata, "prompt_token_count", None) or None,
+      "output_tokens": getattr(usage_metadata, "candidates_token_count", None) or None,
+      "cached_tokens": getattr(usage_metadata, "cached_content_token_count", None) or None,
+  }
+
+
+async def _single_response(response):
+  """Wraps a complete response as a stream of one chunk."""
+  yield response
+
+
+def _function_response(
+    tool_name: str, tool_result: ToolResult, max_rows: Optional[int] = None
+) -> Part:
+  """Returns the part sending a tool result back to the model.
+
+  Arrow query results are sent as rows, at most `max_rows` of them.
+  """
+  if tool_result.is_successful:
+    result = tool_result.result
+    if isinstance(result, dict) and "arrow_table" in result:
+      result = dict(result)
+      table = result.pop("arrow_table")
+      if max_rows is not None:
+        table = table.slice(0, max_rows)
+      result["results"] = table.to_pylist()
+    content = {"result": result}
+  else:
+    content = {"error": tool_result.error}
+  # Tool results may hold dates, decimals and other values JSON has no type for.
+  return Part.from_function_response(
+      name=tool_name, response=json.loads(json.dumps(content, default=str))
+  )
@@ -0,0 +1,308 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TTL_SECONDS = 3600
+# A cached content this close to expiring is replaced rather than used, so a
+# request never references an expired handle.
+DEFAULT_REFRESH_MARGIN_SECONDS = 120
+# After registering a prefix fails, it is not offered again for this long.
+DEFAULT_FAILURE_BACKOFF_SECONDS = 600
+# Vertex AI refuses to cache content shorter than this many tokens.
+DEFAULT_MIN_PREFIX_TOKENS = 2048
+# Text is about this many characters per token.
+CHARS_PER_TOKEN = 4
+
+# How the provider words a refusal to cache content below its minimum size.
+_TOO_SMALL_RE = re.compile(r"minimum|too (?:small|short)|min_total_token_count", re.IGNORECASE)
+
+# Bump when the wording of the instructions changes, so cached prefixes of the
+# old wording are not reused.
+PROMPT_TEMPLATE_VERSION = "contracts-sql-v1"
+
+CONTRACTS_INSTRUCTIONS = """You are a BigQuery expert and a helpful assistant. Your primary goal is to provide accurate answers about contracts.
+
+**Instructions:**
+1.  **If the user asks for data (e.g., "list all contracts"), generate a SQL query.**
+2.  **If the user asks to "explain the schema", you MUST return a JSON object with a single key, "schema_explanation", containing a list of objects. Each object must have "name", "type", and "description" keys.**
+    **Example JSON Output:**
+    ```json
+    {{
+      "schema_explanation": [
+        {{
+          "name": "contract_id",
+          "type": "STRING",
+          "description": "Unique identifier for the contract."
+        }},
+        {{
+          "name": "contract_name",
+          "type": "STRING",
+          "description": "Name of the contract."
+        }}
+      ]
+    }}
+    ```
+3.  **For any other general question (e.g., "what can you do?"), provide a clear, user-friendly response in standard text.**
+
+**Schema for `contracts` table:**
+{schema}
+
+**SQL Generation Rules:**
+- When a query requires the status of a contract, derive it using a `CASE` statement with the following logic:
+  - **Active**: `CURRENT_DATE() BETWEEN start_date AND end_date`
+  - **Expired**: `CURRENT_DATE() > end_date`
+  - **Pending**: `CURRENT_DATE() < start_date`
+- For upcoming expirations, consider contracts expiring in the next 90 days.
+- For total penalty amount, sum the `penalty_amount` column.
+- For average contract value, calculate the average of the `price` column.
+"""
+
+CONTRACTS_QUESTION = """
+**User Request:**
+{query}
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class PromptTemplate:
+  """A prompt split into a static prefix and a per-question suffix.
+
+  Attributes:
+    instructions: The static prefix, formatted with the table schema.
+    question: The suffix, formatted with the user's question.
+    version: The version of the wording.
+  """
+
+  instructions: str = CONTRACTS_INSTRUCTIONS
+  question: str = CONTRACTS_QUESTION
+  version: str = PROMPT_TEMPLATE_VERSION
+
+  def render_prefix(self, schema: str) -> str:
+    return self.instructions.format(schema=schema)
+
+  def render_question(self, query: str) -> str:
+    return self.question.format(query=query)
+
+  def render(self, schema: str, query: str) -> str:
+    """Returns the whole prompt, for models without a cached prefix."""
+    return self.render_prefix(schema) + self.render_question(query)
+
+  def prefix_key(self, schema_version: str) -> str:
+    """Identifies the prefix of a schema version.
+
+    The key changes with the version and with any edit of the instructions,
+    even one that forgot to bump the version.
+    """
+    digest = hashlib.sha256(self.instructions.encode("utf-8")).hexdigest()[:12]
+    return f"{self.version}-{digest}-{schema_version}"
+
+
+def _create_vertex_cached_content(
+    model_name: str, system_instruction: str, tools: List[Any], ttl_seconds: float
+):
+  from vertexai.preview import caching
+
+  return caching.CachedContent.create(
+      model_name=model_name,
+      system_instruction=system_instruction,
+      tools=tools or None,
+      ttl=datetime.timedelta(seconds=ttl_seconds),
+  )
+
+
+def _vertex_model_from_cached_content(cached_content):
+  from vertexai.preview.generative_models import GenerativeModel
+
+  return GenerativeModel.from_cached_content(cached_content=cached_content)
+
+
+@dataclasses.dataclass
+class _Entry:
+  key: str
+  cached_content: Any
+  model: Any
+  expires_at: float
+
+
+class ContextCache:
+  """Registers static prompt prefixes as cached content with the provider.
+
+  A prefix, with the tool declarations, is registered once per key and
+  referenced by handle afterwards: requests then carry only the question. The
+  model built from the cached content is returned to the caller. A prefix
+  below the provider's minimum size is never offered, and neither is one the
+  provider refused as too small. When registration fails otherwise, the caller
+  falls back to sending the whole prompt, and the prefix is not offered again
+  for a while. A prefix is registered by one
+  request at a time; concurrent requests keep using the entry being refreshed,
+  or send the whole prompt. Registering a new key deletes the cached content
+  of the previous one, while a refreshed entry is left to expire.
+  """
+
+  def __init__(
+      self,
+      model_name: str,
+      ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS,
+      refresh_margin_seconds: float = DEFAULT_REFRESH_MARGIN_SECONDS,
+      failure_backoff_seconds: float = DEFAULT_FAILURE_BACKOFF_SECONDS,
+      min_prefix_tokens: int = DEFAULT_MIN_PREFIX_TOKENS,
+      count_tokens_fn: Optional[Callable[[str], int]] = None,
+      create_fn: Optional[Callable[[str, str, List[Any], float], Any]] = None,
+      model_factory: Optional[Callable[[Any], Any]] = None,
+  ):
+    """Initializes the cache.
+
+    Args:
+      model_name: The model the cached content is created for.
+      ttl_seconds: The lifetime of each cached content.
+      refresh_margin_seconds: How long before expiry a cached content is
+        replaced.
+      failure_backoff_seconds: How long a prefix that could not be registered
+        is not offered again.
+      min_prefix_tokens: Prefixes with fewer tokens are not registered.
+      count_tokens_fn: Counts the tokens of a prefix. Defaults to an estimate
+        from its length.
+      create_fn: Creates a cached content from a model name, system
+        instruction, tools and TTL. Defaults to Vertex AI.
+      model_factory: Builds a model from a cached content. Defaults to Vertex
+        AI.
+    """
+    self._model_name = model_name
+    self._ttl_seconds = ttl_seconds
+    self._refresh_margin_seconds = refresh_margin_seconds
+    self._failure_backoff_seconds = failure_backoff_seconds
+    self._min_prefix_tokens = min_prefix_tokens
+    self._count_tokens_fn = count_tokens_fn or _estimate_tokens
+    self._create_fn = create_fn or _create_vertex_cached_content
+    self._model_factory = model_factory or _vertex_model_from_cached_content
+    self._entry: Optional[_Entry] = None
+    self._failures: Dict[str, float] = {}
+    # Keys whose prefix is too small to cache, which never changes.
+    self._too_small: Set[str] = set()
+    # Keys being registered, so concurrent requests do not register them too.
+    self._creating: Set[str] = set()
+    self._lock = threading.Lock()
+    self.registrations = 0
+
+  def get_model(self, key: str, prefix: str, tools: List[Any]):
+    """Returns a model whose requests start with the cached prefix.
+
+    Args:
+      key: Identifies the prefix and tools, see `PromptTemplate.prefix_key`.
+      prefix: The static prefix, used as the system instruction.
+      tools: The tool declarations, which are cached with the prefix.
+
+    Returns:
+      The model, or None if the prefix could not be cached.
+    """
+    now = time.monotonic()
+    with self._lock:
+      entry = self._entry
+      current = entry is not None and entry.key == key
+      if current and entry.expires_at - self._refresh_margin_seconds > now:
+        return entry.model
+      if key in self._creating:
+        # Another request is registering the prefix. The entry being refreshed
+        # is still usable until it expires.
+        return entry.model if current and entry.expires_at > now else None
+      if key in self._too_small or self._failures.get(key, 0.0) > now:
+        return None
+      self._creating.add(key)
+
+    try:
+      prefix_tokens = self._count_tokens_fn(prefix)
+    except Exception as e:
+      _LOGGER.warning("Could not count the tokens of prompt prefix %s: %s", key, e)
+      prefix_tokens = None
+    if prefix_tokens is not None and prefix_tokens < self._min_prefix_tokens:
+      _LOGGER.info(
+          "Prompt prefix %s has %d tokens, below the %d needed to cache it,"
+          " sending it with every request.",
+          key,
+          prefix_tokens,
+          self._min_prefix_tokens,
+      )
+      with self._lock:
+        self._creating.discard(key)
+        self._too_small.add(key)
+      return None
+
+    # Registration is a network call, so it runs without the lock.
+    try:
+      cached_content = self._create_fn(
+          self._model_name, prefix, tools, self._ttl_seconds
+      )
+      model = self._model_factory(cached_content)
+    except Exception as e:
+      _LOGGER.warning(
+          "Could not cache the prompt prefix %s, sending it with every request: %s",
+          key,
+          e,
+      )
+      with self._lock:
+        self._creating.discard(key)
+        if _TOO_SMALL_RE.search(str(e)):
+          self._too_small.add(key)
+        else:
+          self._failures[key] = now + self._failure_backoff_seconds
+      return None
+
+    with self._lock:
+      self._creating.discard(key)
+      stale = self._entry
+      self._entry = _Entry(
+          key=key,
+          cached_content=cached_content,
+          model=model,
+          expires_at=now + self._ttl_seconds,
+      )
+      self.registrations += 1
+    # A refreshed entry may still be referenced by requests in flight, so it
+    # is left to expire. The entry of another key is for an old prefix.
+    if stale is not None and stale.key != key:
+      _delete(stale.cached_content)
+    return model
+
+  def close(self):
+    """Deletes the cached content, which is billed while it exists."""
+    with self._lock:
+      entry, self._entry = self._entry, None
+    if entry is not None:
+      _delete(entry.cached_content)
+
+
+def _estimate_tokens(text: str) -> int:
+  return len(text) // CHARS_PER_TOKEN
+
+
+def _delete(cached_content):
+  delete = getattr(cached_content, "delete", None)
+  if delete is None:
+    return
+  try:
+    delete()
+  except Exception as e:
+    _LOGGER.warning("Could not delete cached content: %s", e)
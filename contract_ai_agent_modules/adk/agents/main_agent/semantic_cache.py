@@ -0,0 +1,351 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import hashlib
+import logging
+import math
+import re
+import threading
+import unicodedata
+from typing import Callable, List, Optional, Sequence, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+EmbeddingFunction = Callable[[str], Sequence[float]]
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_MAX_ENTRIES = 256
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+# Function words, and the words that phrase a request rather than say what it
+# asks for, in English and Spanish. Every other word of a question can change
+# its SQL: a company or provider name, a status, a business unit or a number.
+_STOPWORDS = frozenset("""
+a about all an and any are as at be by can could did do does for from give
+have how i in is it list me my of on or please show tell that the their them
+there these this those to us was we were what which who whose with would you
+al algo como con cual cuales cuantos cuantas de del dime el en es esta estan
+este esto hay la las lo los me mi mis muestra muestrame mostrar o para por
+que quien sobre su sus todos todas un una unos unas y cuál cuáles cuántos
+cuántas está están muéstrame qué quién
+""".split())
+
+
+def normalize_question(question: str) -> str:
+  """Normalizes a question so trivially different phrasings compare equal.
+
+  Args:
+    question: The natural language question.
+
+  Returns:
+    The question in lower case, without punctuation and with collapsed
+    whitespace.
+  """
+  text = unicodedata.normalize("NFKC", question).lower()
+  text = _PUNCTUATION_RE.sub(" ", text)
+  return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def question_terms(question: str) -> Tuple[str, ...]:
+  """Returns the words of a question that its SQL depends on.
+
+  These are the words of the normalized question other than stopwords.
+  "Contracts with acme" and "contracts with beta", or "active contracts" and
+  "expired contracts", embed almost identically, but their terms differ.
+
+  Args:
+    question: The normalized question.
+
+  Returns:
+    The sorted, distinct terms.
+  """
+  return tuple(sorted(set(question.split()) - _STOPWORDS))
+
+
+def hashing_embedding_function(dimensions: int = 256) -> EmbeddingFunction:
+  """Returns a deterministic, offline embedding function.
+
+  Words and character trigrams are hashed into a fixed number of buckets. It
+  needs no model or network access, which makes it suitable for tests and as a
+  fallback.
+
+  Args:
+    dimensions: The number of buckets in the embedding.
+
+  Returns:
+    An embedding function.
+  """
+
+  def embed(text: str) -> List[float]:
+    vector = [0.0] * dimensions
+    features = text.split()
+    padded = f" {text} "
+    features.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    for feature in features:
+      digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+      value = int.from_bytes(digest, "big")
+      sign = 1.0 if value & 1 else -1.0
+      vector[(value >> 1) % dimensions] += sign
+    return vector
+
+  return embed
+
+
+def vertex_embedding_function(
+    model_name: str = "text-embedding-004",
+) -> EmbeddingFunction:
+  """Returns an embedding function backed by a Vertex AI embedding model.
+
+  The model is loaded on first use.
+
+  Args:
+    model_name: The name of the Vertex AI text embedding model.
+
+  Returns:
+    An embedding function.
+  """
+  model = None
+
+  def embed(text: str) -> Sequence[float]:
+    nonlocal model
+    if model is None:
+      from vertexai.language_models import TextEmbeddingModel
+
+      model = TextEmbeddingModel.from_pretrained(model_name)
+    return model.get_embeddings([text])[0].values
+
+  return embed
+
+
+@dataclasses.dataclass(frozen=True)
+class SemanticCacheHit:
+  """A previously answered question similar to the one being asked.
+
+  Attributes:
+    question: The cached question, normalized.
+    sql: The SQL generated for the cached question.
+    similarity: The cosine similarity between the two questions.
+  """
+
+  question: str
+  sql: str
+  similarity: float
+
+
+@dataclasses.dataclass(frozen=True)
+class SemanticCacheStats:
+  """Counters describing how the semantic cache has been used.
+
+  Attributes:
+    hits: Lookups that reused previously generated SQL.
+    misses: Lookups that found no similar question.
+    evictions: Entries dropped to respect the size bound.
+    invalidations: Times the cache was cleared because the schema changed.
+  """
+
+  hits: int = 0
+  misses: int = 0
+  evictions: int = 0
+  invalidations: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class _Entry:
+  vector: Tuple[float, ...]
+  terms: Tuple[str, ...]
+  sql: str
+
+
+class SemanticQuestionCache:
+  """Reuses SQL generated for previously answered, similar questions.
+
+  Questions are normalized and embedded, and a lookup returns the most similar
+  cached question above the similarity threshold. Only questions with the same
+  words, apart from stopwords, can match, so "expiring in 30 days" does not
+  reuse the SQL of "expiring in 90 days", "contracts with acme" that of
+  "contracts with beta", or "active contracts" that of "expired contracts".
+  The index holds at most `max_entries` entries and evicts the least
+  recently used one. Every entry belongs to a schema version; a lookup or
+  store with a different version clears the cache.
+  """
+
+  def __init__(
+      self,
+      embedding_fn: EmbeddingFunction,
+      similarity_threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+      max_entries: int = DEFAULT_MAX_ENTRIES,
+  ):
+    """Initializes the cache.
+
+    Args:
+      embedding_fn: Maps a normalized question to its embedding vector.
+      similarity_threshold: The minimum cosine similarity for a hit.
+      max_entries: The maximum number of cached questions.
+    """
+    self._embedding_fn = embedding_fn
+    self._similarity_threshold = similarity_threshold
+    self._max_entries = max_entries
+    self._entries: collections.OrderedDict[str, _Entry] = (
+        collections.OrderedDict()
+    )
+    # Embeddings computed by lookups that missed, so storing the answer does
+    # not embed the same question twice.
+    self._pending: collections.OrderedDict[str, Tuple[float, ...]] = (
+        collections.OrderedDict()
+    )
+    self._schema_version: Optional[str] = None
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+    self._invalidations = 0
+
+  @property
+  def stats(self) -> SemanticCacheStats:
+    with self._lock:
+      return SemanticCacheStats(
+          hits=self._hits,
+          misses=self._misses,
+          evictions=self._evictions,
+          invalidations=self._invalidations,
+      )
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def lookup(
+      self, question: str, schema_version: Optional[str] = None
+  ) -> Optional[SemanticCacheHit]:
+    """Finds a cached question similar to the given one.
+
+    Args:
+      question: The natural language question.
+      schema_version: The version of the schema the SQL must be valid for.
+
+    Returns:
+      The best match above the similarity threshold, or None.
+    """
+    normalized = normalize_question(question)
+    with self._lock:
+      self._check_schema_version(schema_version)
+      entry = self._entries.get(normalized)
+      if entry is not None:
+        self._entries.move_to_end(normalized)
+        self._hits += 1
+        return SemanticCacheHit(normalized, entry.sql, 1.0)
+      if not self._entries:
+        self._misses += 1
+        return None
+
+    vector = self._embed(normalized)
+    if vector is None:
+      with self._lock:
+        self._misses += 1
+      return None
+
+    terms = question_terms(normalized)
+    with self._lock:
+      self._remember_pending(normalized, vector)
+      best_key, best_similarity = None, -1.0
+      for key, entry in self._entries.items():
+        if entry.terms != terms:
+          continue
+        similarity = _dot(vector, entry.vector)
+        if similarity > best_similarity:
+          best_key, best_similarity = key, similarity
+      if best_key is None or best_similarity < self._similarity_threshold:
+        self._misses += 1
+        return None
+      self._entries.move_to_end(best_key)
+      self._hits += 1
+      return SemanticCacheHit(
+          best_key, self._entries[best_key].sql, best_similarity
+      )
+
+  def store(
+      self, question: str, sql: str, schema_version: Optional[str] = None
+  ):
+    """Caches the SQL generated for a question.
+
+    Args:
+      question: The natural language question.
+      sql: The SQL that answered it.
+      schema_version: The version of the schema the SQL was generated for.
+    """
+    normalized = normalize_question(question)
+    with self._lock:
+      vector = self._pending.pop(normalized, None)
+    if vector is None:
+      vector = self._embed(normalized)
+      if vector is None:
+        return
+
+    with self._lock:
+      self._check_schema_version(schema_version)
+      self._entries[normalized] = _Entry(
+          vector=vector,
+          terms=question_terms(normalized),
+          sql=sql,
+      )
+      self._entries.move_to_end(normalized)
+      while len(self._entries) > self._max_entries:
+        self._entries.popitem(last=False)
+        self._evictions += 1
+
+  def discard(self, question: str):
+    """Drops the cached SQL of a question, e.g. after it failed to run."""
+    with self._lock:
+      self._entries.pop(normalize_question(question), None)
+
+  def invalidate(self):
+    """Drops every cached question."""
+    with self._lock:
+      self._entries.clear()
+      self._pending.clear()
+      self._invalidations += 1
+
+  def _check_schema_version(self, schema_version: Optional[str]):
+    if schema_version == self._schema_version:
+      return
+    if self._entries:
+      _LOGGER.info("Schema changed, invalidating the semantic question cache.")
+      self._invalidations += 1
+    self._entries.clear()
+    self._pending.clear()
+    self._schema_version = schema_version
+
+  def _remember_pending(self, normalized: str, vector: Tuple[float, ...]):
+    self._pending[normalized] = vector
+    while len(self._pending) > 32:
+      self._pending.popitem(last=False)
+
+  def _embed(self, normalized: str) -> Optional[Tuple[float, ...]]:
+    try:
+      vector = self._embedding_fn(normalized)
+    except Exception as e:
+      _LOGGER.warning("Embedding failed, bypassing semantic cache: %s", e)
+      return None
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+      return None
+    return tuple(value / norm for value in vector)
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+  return math.fsum(x * y for x, y in zip(a, b))
@@ -25,9 +25,11 @@ from google.api_core import exceptions as api_exceptions # Import for general AP
 from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContext
 from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
 from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
+from contract_ai_agent_modules.adk.utils import tracing
 from contract_ai_agent_modules.adk.utils.feature_decorator import experimental
 
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_credentials import BigQueryCredentialsConfig
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.client_pool import get_client_pool
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
 
 
@@ -55,8 +57,16 @@ class BigQueryTool(BaseTool):
       **kwargs: The keyword arguments to pass to the tool.
 
     Returns:
-      The tool result.
+      The tool result, with the timing spans of the call as its "trace"
+      metadata.
     """
+    with tracing.trace(f"tool.{self.name}") as tool_trace:
+      result = await self._traced_call(readonly_context, **kwargs)
+    return result.with_metadata(trace=tool_trace.to_dict())
+
+  async def _traced_call(
+      self, readonly_context: ReadonlyContext, **kwargs
+  ) -> ToolResult:
     project_id = (
         self._credentials_config.project_id
         if self._credentials_config
@@ -65,7 +75,8 @@ class BigQueryTool(BaseTool):
     location = (
         self._credentials_config.location if self._credentials_config else None
     )
-    client = bigquery.Client(project=project_id, location=location)
+    with tracing.span("bigquery.client"):
+      client = get_client_pool().get_client(project_id, location)
     try:
       return await self._call_with_client(client, readonly_context, **kwargs)
     except Exception as e:
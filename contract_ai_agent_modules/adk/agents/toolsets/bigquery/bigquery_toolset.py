@@ -14,6 +14,7 @@
 
 from __future__ import annotations
 
+import functools
 from typing import List
 from typing import Optional
 from typing import Union
@@ -26,12 +27,40 @@ from contract_ai_agent_modules.adk.agents.toolsets.bigquery import query_tool
 from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
 from contract_ai_agent_modules.adk.tools.base_toolset import BaseToolset
 from contract_ai_agent_modules.adk.tools.base_toolset import ToolPredicate
+from contract_ai_agent_modules.adk.tools.tool_registry import ToolRegistry
 from contract_ai_agent_modules.adk.utils.feature_decorator import experimental
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_credentials import BigQueryCredentialsConfig
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_tool import BigQueryTool
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
 
 
+@functools.lru_cache(maxsize=16)
+def _build_tool_registry(
+    credentials_config: Optional[BigQueryCredentialsConfig],
+    bigquery_tool_config: Optional[BigQueryToolConfig],
+) -> ToolRegistry:
+  """Builds the registry of every BigQuery tool for a configuration.
+
+  Both configs are frozen dataclasses, so toolsets sharing a configuration
+  share one registry and the tools are only instantiated once.
+  """
+  return ToolRegistry(
+      BigQueryTool(
+          func=func,
+          credentials_config=credentials_config,
+          bigquery_tool_config=bigquery_tool_config,
+      )
+      for func in [
+          metadata_tool.get_dataset_info,
+          metadata_tool.get_table_info,
+          metadata_tool.list_dataset_ids,
+          metadata_tool.list_table_ids,
+          query_tool.get_execute_sql(bigquery_tool_config),
+          metadata_tool.get_table_schema,
+      ]
+  )
+
+
 @experimental
 class BigQueryToolset(BaseToolset):
   """BigQuery Toolset contains tools for interacting with BigQuery data and metadata."""
@@ -48,6 +77,7 @@ class BigQueryToolset(BaseToolset):
     self._credentials_config = credentials_config
     self._tool_config = bigquery_tool_config
     self.tool_name = tool_name
+    self._static_registry: Optional[ToolRegistry] = None
 
   def _is_tool_selected(
       self, tool: BaseTool, readonly_context: ReadonlyContext
@@ -63,40 +93,52 @@ class BigQueryToolset(BaseToolset):
 
     return False
 
+  def get_tool_registry(
+      self, readonly_context: Optional[ReadonlyContext] = None
+  ) -> ToolRegistry:
+    """Gets the registry of the tools selected by this toolset.
+
+    Selections by tool name or name list are computed once per toolset. A
+    predicate filter may depend on the context, so it is applied per call.
+
+    Args:
+      readonly_context: The readonly context.
+
+    Returns:
+      The registry of selected tools.
+    """
+    if self._static_registry is not None:
+      return self._static_registry
+
+    registry = _build_tool_registry(
+        self._credentials_config, self._tool_config
+    )
+    if self.tool_name:
+      self._static_registry = registry.select(
+          lambda tool: tool.name == self.tool_name
+      )
+      return self._static_registry
+    if self.tool_filter is None or isinstance(self.tool_filter, list):
+      self._static_registry = registry.select(
+          lambda tool: self._is_tool_selected(tool, readonly_context)
+      )
+      return self._static_registry
+    return registry.select(
+        lambda tool: self._is_tool_selected(tool, readonly_context)
+    )
+
   @override
   async def get_tools(
       self, readonly_context: Optional[ReadonlyContext] = None
   ) -> List[BaseTool]:
     """Get tools from the toolset."""
-    all_tools = [
-        BigQueryTool(
-            func=func,
-            credentials_config=self._credentials_config,
-            bigquery_tool_config=self._tool_config,
-        )
-        for func in [
-            metadata_tool.get_dataset_info,
-            metadata_tool.get_table_info,
-            metadata_tool.list_dataset_ids,
-            metadata_tool.list_table_ids,
-            query_tool.get_execute_sql(self._tool_config),
-            metadata_tool.get_table_schema,
-        ]
-    ]
-
-    if self.tool_name:
-        return [
-            tool
-            for tool in all_tools
-            if tool.name == self.tool_name
-        ]
-    else:
-        return [
-            tool
-            for tool in all_tools
-            if self._is_tool_selected(tool, readonly_context)
-        ]
+    return list(self.get_tool_registry(readonly_context).tools)
 
   @override
   async def close(self):
-    pass
\ No newline at end of file
+    """Releases the toolset's resources.
+
+    The pooled BigQuery clients are shared with every other toolset and with
+    the app's own clients, so they are left open. The pool closes them at
+    process exit.
+    """
@@ -0,0 +1,210 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud import bigquery
+from requests.adapters import HTTPAdapter
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 10
+BIGQUERY_BACKEND = "bigquery"
+LOCAL_BACKEND = "local"
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+
+_PoolKey = Tuple[Optional[str], Optional[str]]
+
+
+class BigQueryClientPool:
+  """Shares BigQuery clients keyed by (project, location).
+
+  Every client is backed by an authorized HTTP session with a bounded pool of
+  keep-alive connections, so credentials are resolved once and TLS connections
+  are reused across tool calls.
+
+  With the local backend, clients are `LocalBigQueryClient`s instead, which
+  answer from an embedded database loaded from Parquet snapshots, without
+  credentials or network calls. Every key shares the one database.
+  """
+
+  def __init__(
+      self,
+      max_connections: int = DEFAULT_MAX_CONNECTIONS,
+      backend: str = BIGQUERY_BACKEND,
+      snapshot_dir: str = DEFAULT_SNAPSHOT_DIR,
+      database_path: Optional[str] = None,
+  ):
+    """Initializes the pool.
+
+    Args:
+      max_connections: The maximum number of HTTP connections each client keeps
+        open. Requests beyond the limit wait for a free connection.
+      backend: "bigquery", or "local" to query Parquet snapshots locally.
+      snapshot_dir: The directory of the snapshots of the local backend.
+      database_path: A database file in which the local backend keeps inserted
+        rows. If not set, they are lost when the process exits.
+    """
+    if backend not in (BIGQUERY_BACKEND, LOCAL_BACKEND):
+      raise ValueError(
+          f"Unknown BigQuery backend {backend!r}, expected"
+          f" {BIGQUERY_BACKEND!r} or {LOCAL_BACKEND!r}"
+      )
+    self._max_connections = max_connections
+    self._backend = backend
+    self._snapshot_dir = snapshot_dir
+    self._database_path = database_path
+    self._local_database = None
+    self._clients: Dict[_PoolKey, bigquery.Client] = {}
+    self._credentials = None
+    self._default_project: Optional[str] = None
+    self._lock = threading.Lock()
+
+  @property
+  def max_connections(self) -> int:
+    return self._max_connections
+
+  @property
+  def backend(self) -> str:
+    return self._backend
+
+  def get_client(
+      self, project_id: Optional[str] = None, location: Optional[str] = None
+  ) -> bigquery.Client:
+    """Gets the pooled client for a project and location, creating it if needed.
+
+    Args:
+      project_id: The project to bill queries to. If not set, the project is
+        inferred from the environment.
+      location: The default location for jobs. If not set, BigQuery infers it.
+
+    Returns:
+      A BigQuery client shared by all callers using the same key.
+    """
+    key = (project_id, location)
+    with self._lock:
+      client = self._clients.get(key)
+      if client is None:
+        client = self._create_client(project_id, location)
+        self._clients[key] = client
+      return client
+
+  def close(
+      self, project_id: Optional[str] = None, location: Optional[str] = None
+  ):
+    """Closes the client for a project and location, if one is pooled.
+
+    A later `get_client` call with the same key creates a new client.
+    """
+    with self._lock:
+      client = self._clients.pop((project_id, location), None)
+    if client is not None:
+      client.close()
+
+  def close_all(self):
+    """Closes every pooled client, and the local database."""
+    with self._lock:
+      clients = list(self._clients.values())
+      self._clients.clear()
+      local_database, self._local_database = self._local_database, None
+    for client in clients:
+      client.close()
+    if local_database is not None:
+      local_database.close()
+
+  def _create_client(
+      self, project_id: Optional[str], location: Optional[str]
+  ) -> bigquery.Client:
+    if self._backend == LOCAL_BACKEND:
+      return self._create_local_client(project_id, location)
+    if self._credentials is None:
+      self._credentials, self._default_project = google.auth.default(
+          scopes=bigquery.Client.SCOPE
+      )
+    session = AuthorizedSession(self._credentials)
+    adapter = HTTPAdapter(
+        pool_connections=self._max_connections,
+        pool_maxsize=self._max_connections,
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    _LOGGER.info(
+        "Creating pooled BigQuery client for project=%s location=%s",
+        project_id,
+        location,
+    )
+    return bigquery.Client(
+        project=project_id or self._default_project,
+        credentials=self._credentials,
+        _http=session,
+        location=location,
+    )
+
+  def _create_local_client(
+      self, project_id: Optional[str], location: Optional[str]
+  ) -> bigquery.Client:
+    # Imported here so the BigQuery backend does not need duckdb.
+    from contract_ai_agent_modules.adk.agents.toolsets.bigquery import local_client
+
+    if self._local_database is None:
+      _LOGGER.info(
+          "Loading local BigQuery backend from snapshots in %s",
+          self._snapshot_dir,
+      )
+      self._local_database = local_client.LocalDatabase(
+          self._snapshot_dir, database_path=self._database_path
+      )
+    return local_client.LocalBigQueryClient(
+        self._local_database, project=project_id, location=location
+    )
+
+
+_client_pool: Optional[BigQueryClientPool] = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> BigQueryClientPool:
+  """Returns the process-wide BigQuery client pool.
+
+  The connection limit is read from the BIGQUERY_MAX_CONNECTIONS environment
+  variable when the pool is first created. BIGQUERY_BACKEND=local selects the
+  local backend, loaded from the snapshots in LOCAL_SNAPSHOT_DIR and keeping
+  inserted rows in LOCAL_DATABASE_PATH, if set. Every client is closed at
+  process exit.
+  """
+  global _client_pool
+  with _client_pool_lock:
+    if _client_pool is None:
+      _client_pool = BigQueryClientPool(
+          max_connections=int(
+              os.environ.get(
+                  "BIGQUERY_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS
+              )
+          ),
+          backend=os.environ.get("BIGQUERY_BACKEND", BIGQUERY_BACKEND),
+          snapshot_dir=os.environ.get(
+              "LOCAL_SNAPSHOT_DIR", DEFAULT_SNAPSHOT_DIR
+          ),
+          database_path=os.environ.get("LOCAL_DATABASE_PATH") or None,
+      )
+      atexit.register(_client_pool.close_all)
+    return _client_pool
@@ -28,8 +28,25 @@ class BigQueryToolConfig:
     default_table_id: The ID of the default table to use for BigQuery
       operations.
     max_rows: The maximum number of rows to return from a BigQuery query.
+    schema_cache_ttl_seconds: How long a cached table schema is served before
+      it is revalidated against the table's modified timestamp. If not set,
+      the schema catalog default is used.
+    result_cache_enabled: Whether `execute_sql` serves repeated read-only
+      queries from the process-wide result cache while the tables they read
+      are unchanged.
+    page_size: The number of rows fetched per page when results are read,
+      including by streamed queries. If not set, BigQuery picks the page size.
+    arrow_results: Whether `execute_sql` returns results as a `pyarrow.Table`
+      under "arrow_table" instead of a list of dicts under "results". The
+      BigQuery Storage Read API is used when it is installed, so `max_rows`
+      is applied by reading batches until it is reached instead of on the
+      results request.
   """
 
   default_dataset_id: Optional[str] = None
   default_table_id: Optional[str] = None
-  max_rows: Optional[int] = None
\ No newline at end of file
+  max_rows: Optional[int] = None
+  schema_cache_ttl_seconds: Optional[float] = None
+  result_cache_enabled: bool = True
+  page_size: Optional[int] = None
+  arrow_results: bool = False
\ No newline at end of file
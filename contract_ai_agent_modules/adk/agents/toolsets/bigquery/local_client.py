@@ -0,0 +1,572 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local stand-in for the BigQuery client, over Parquet snapshots.
+
+`LocalBigQueryClient` answers the calls the app makes on `bigquery.Client`
+with an embedded DuckDB database. It covers queries, including parameterized
+ones, table metadata and inserts. The database is loaded from Parquet
+snapshots of the dataset's tables, which `export_snapshots` writes. Queries
+are written for BigQuery, by hand or by the model, and `translate_sql`
+rewrites the few constructs DuckDB spells differently.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import io
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from google.cloud import bigquery
+from google.cloud.bigquery.table import Row
+
+_LOGGER = logging.getLogger(__name__)
+
+# The tables of the contract_data dataset.
+SNAPSHOT_TABLES = ("contracts", "slas", "penalties", "alerts")
+MANIFEST_FILE = "manifest.json"
+DEFAULT_PAGE_SIZE = 10000
+
+# DuckDB column types, by prefix, and the BigQuery types they report as.
+_FIELD_TYPES = (
+    ("VARCHAR", "STRING"),
+    ("JSON", "JSON"),
+    ("BIGINT", "INTEGER"),
+    ("INTEGER", "INTEGER"),
+    ("SMALLINT", "INTEGER"),
+    ("TINYINT", "INTEGER"),
+    ("HUGEINT", "INTEGER"),
+    ("DOUBLE", "FLOAT"),
+    ("FLOAT", "FLOAT"),
+    ("DECIMAL", "NUMERIC"),
+    ("BOOLEAN", "BOOLEAN"),
+    ("TIMESTAMP WITH TIME ZONE", "TIMESTAMP"),
+    ("TIMESTAMP", "DATETIME"),
+    ("DATE", "DATE"),
+    ("TIME", "TIME"),
+    ("BLOB", "BYTES"),
+    ("STRUCT", "RECORD"),
+)
+
+# String literals, double-quoted strings and backtick identifiers, which are
+# set aside while the rest of the SQL is rewritten.
+_QUOTED_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`")
+_PLACEHOLDER_RE = re.compile(r"\x00(\d+)\x00")
+_PARAMETER_RE = re.compile(r"@(\w+)")
+_FUNCTION_RE = re.compile(
+    r"\b(DATE_ADD|DATE_SUB|DATE_DIFF|CONTAINS_SUBSTR|SAFE_DIVIDE|FORMAT_DATE)\s*\(",
+    re.IGNORECASE,
+)
+_SIMPLE_REWRITES = (
+    (re.compile(r"\b(CURRENT_DATE|CURRENT_TIMESTAMP|CURRENT_DATETIME)\s*\(\s*\)", re.IGNORECASE), r"\1"),
+    (re.compile(r"\bIN\s+UNNEST\s*\(\s*(\$\w+)\s*\)", re.IGNORECASE), r"IN (SELECT UNNEST(\1))"),
+    (re.compile(r"\bSAFE_CAST\s*\(", re.IGNORECASE), "TRY_CAST("),
+    (re.compile(r"\bFLOAT64\b", re.IGNORECASE), "DOUBLE"),
+    (re.compile(r"\bBIGNUMERIC\b", re.IGNORECASE), "DECIMAL(38, 9)"),
+)
+
+
+def translate_sql(sql: str) -> str:
+  """Rewrites BigQuery SQL into the DuckDB dialect.
+
+  Backtick identifiers become double-quoted ones, without their project, and
+  double-quoted strings become single-quoted ones. Query parameters go from
+  @name to $name. `CURRENT_DATE()`, `DATE_ADD`, `DATE_SUB`, `DATE_DIFF`,
+  `IN UNNEST(@array)`, `CONTAINS_SUBSTR`, `SAFE_CAST`, `SAFE_DIVIDE` and
+  `FORMAT_DATE` are rewritten to their DuckDB equivalents. Everything else is
+  passed through, since both dialects share most of standard SQL.
+
+  Args:
+    sql: The BigQuery SQL.
+
+  Returns:
+    The DuckDB SQL.
+  """
+  quoted: List[str] = []
+
+  def set_aside(match: re.Match) -> str:
+    quoted.append(_translate_quoted(match.group(0)))
+    return f"\x00{len(quoted) - 1}\x00"
+
+  code = _QUOTED_RE.sub(set_aside, sql)
+  code = _PARAMETER_RE.sub(r"$\1", code)
+  for pattern, replacement in _SIMPLE_REWRITES:
+    code = pattern.sub(replacement, code)
+  code = _rewrite_functions(code)
+  # The rewrites may have copied placeholders around, so restore them all.
+  return _PLACEHOLDER_RE.sub(lambda match: quoted[int(match.group(1))], code)
+
+
+def _translate_quoted(text: str) -> str:
+  body = text[1:-1]
+  if text[0] == "`":
+    parts = body.split(".")
+    # DuckDB reads a three-part name as catalog.schema.table; the project
+    # has no counterpart locally.
+    if len(parts) == 3:
+      parts = parts[1:]
+    return ".".join('"' + part.replace('"', '""') + '"' for part in parts)
+  # BigQuery escapes quotes with a backslash, DuckDB by doubling them.
+  body = re.sub(r"\\(.)", r"\1", body)
+  return "'" + body.replace("'", "''") + "'"
+
+
+def _rewrite_functions(code: str) -> str:
+  """Rewrites the calls of `_FUNCTION_RE`, innermost arguments first."""
+  output = []
+  position = 0
+  for match in _FUNCTION_RE.finditer(code):
+    if match.start() < position:
+      continue
+    arguments, end = _split_arguments(code, match.end())
+    if arguments is None:
+      continue
+    arguments = [_rewrite_functions(argument).strip() for argument in arguments]
+    output.append(code[position:match.start()])
+    output.append(_rewrite_call(match.group(1).upper(), arguments))
+    position = end
+  output.append(code[position:])
+  return "".join(output)
+
+
+def _split_arguments(code: str, start: int):
+  """Splits the arguments of a call whose opening parenthesis ends at `start`.
+
+  Returns:
+    The arguments and the position after the closing parenthesis, or None and
+    `start` if the parentheses are unbalanced.
+  """
+  depth = 0
+  arguments = []
+  argument_start = start
+  for i in range(start, len(code)):
+    char = code[i]
+    if char == "(":
+      depth += 1
+    elif char == ")":
+      if depth == 0:
+        arguments.append(code[argument_start:i])
+        return arguments, i + 1
+      depth -= 1
+    elif char == "," and depth == 0:
+      arguments.append(code[argument_start:i])
+      argument_start = i + 1
+  return None, start
+
+
+def _rewrite_call(name: str, arguments: List[str]) -> str:
+  if name in ("DATE_ADD", "DATE_SUB") and len(arguments) == 2:
+    operator = "+" if name == "DATE_ADD" else "-"
+    return f"CAST(({arguments[0]}) {operator} {arguments[1]} AS DATE)"
+  if name == "DATE_DIFF" and len(arguments) == 3:
+    # BigQuery subtracts the second date from the first.
+    return f"date_diff('{arguments[2].lower()}', {arguments[1]}, {arguments[0]})"
+  if name == "CONTAINS_SUBSTR" and len(arguments) == 2:
+    values = [arguments[0]]
+    if arguments[0].startswith("(") and arguments[0].endswith(")"):
+      inner, _ = _split_arguments(arguments[0], 1)
+      if inner is not None:
+        values = [value.strip() for value in inner]
+    # Like BigQuery, each value is matched on its own, as text.
+    text = " || chr(31) || ".join(f"coalesce(CAST({value} AS VARCHAR), '')" for value in values)
+    return f"contains(lower({text}), lower({arguments[1]}))"
+  if name == "SAFE_DIVIDE" and len(arguments) == 2:
+    return f"(({arguments[0]}) / NULLIF({arguments[1]}, 0))"
+  if name == "FORMAT_DATE" and len(arguments) == 2:
+    return f"strftime({arguments[1]}, {arguments[0]})"
+  return f"{name}({', '.join(arguments)})"
+
+
+def _fetch_arrow(result):
+  """Returns a DuckDB result as a pyarrow.Table."""
+  to_arrow_table = getattr(result, "to_arrow_table", None)
+  return to_arrow_table() if to_arrow_table is not None else result.fetch_arrow_table()
+
+
+@dataclasses.dataclass
+class LocalTable:
+  """The metadata of a local table, with the attributes of `bigquery.Table`."""
+
+  project: str
+  dataset_id: str
+  table_id: str
+  schema: List[bigquery.SchemaField]
+  created: datetime.datetime
+  modified: datetime.datetime
+  num_rows: int
+  num_bytes: Optional[int] = None
+  location: str = "local"
+  description: Optional[str] = None
+  labels: Dict[str, str] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class LocalDataset:
+  """The metadata of a local dataset, with the attributes of `bigquery.Dataset`."""
+
+  project: str
+  dataset_id: str
+  created: datetime.datetime
+  modified: datetime.datetime
+  location: str = "local"
+  description: Optional[str] = None
+  labels: Dict[str, str] = dataclasses.field(default_factory=dict)
+  default_table_expiration_ms: Optional[int] = None
+  default_partition_expiration_ms: Optional[int] = None
+
+
+class LocalDatabase:
+  """An embedded DuckDB database loaded from Parquet snapshots.
+
+  Each `<table>.parquet` file of the snapshot directory becomes a table of
+  the dataset schema. Tables are loaded once: with a database file, inserted
+  rows persist across restarts and snapshots are only loaded into tables that
+  do not exist yet. Queries run on their own cursors, so they may come from
+  several threads.
+  """
+
+  def __init__(
+      self,
+      snapshot_dir: str,
+      dataset_id: str = "contract_data",
+      database_path: Optional[str] = None,
+  ):
+    """Opens the database and loads the snapshots.
+
+    Args:
+      snapshot_dir: The directory of the Parquet snapshots.
+      dataset_id: The dataset the tables belong to.
+      database_path: A DuckDB database file that keeps inserted rows. If not
+        set, the database is in memory.
+    """
+    try:
+      import duckdb
+    except ImportError as e:
+      raise ImportError(
+          "The local BigQuery backend needs the duckdb package: pip install duckdb"
+      ) from e
+
+    self.snapshot_dir = snapshot_dir
+    self.dataset_id = dataset_id
+    self._connection = duckdb.connect(database_path or ":memory:")
+    self._lock = threading.Lock()
+    loaded_at = datetime.datetime.now(datetime.timezone.utc)
+    self._created = loaded_at
+    self._modified: Dict[str, datetime.datetime] = {}
+    self._connection.execute(f'CREATE SCHEMA IF NOT EXISTS "{dataset_id}"')
+    existing = {
+        name for (name,) in self._connection.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = ?",
+            [dataset_id],
+        ).fetchall()
+    }
+    for file_name in sorted(os.listdir(snapshot_dir)) if os.path.isdir(snapshot_dir) else []:
+      table_id, extension = os.path.splitext(file_name)
+      if extension != ".parquet" or table_id in existing:
+        continue
+      path = os.path.join(snapshot_dir, file_name)
+      self._connection.execute(
+          f'CREATE TABLE "{dataset_id}"."{table_id}" AS SELECT * FROM read_parquet(?)', [path]
+      )
+      existing.add(table_id)
+      _LOGGER.info("Loaded snapshot %s into %s.%s", path, dataset_id, table_id)
+    if not existing:
+      _LOGGER.warning("No table snapshots found in %s", snapshot_dir)
+    for table_id in existing:
+      self._modified[table_id] = loaded_at
+
+  def cursor(self):
+    return self._connection.cursor()
+
+  def table_ids(self) -> List[str]:
+    with self._lock:
+      return sorted(self._modified)
+
+  def modified(self, table_id: str) -> datetime.datetime:
+    with self._lock:
+      if table_id not in self._modified:
+        raise KeyError(f"Table {self.dataset_id}.{table_id} not found in {self.snapshot_dir}")
+      return self._modified[table_id]
+
+  def touch(self, table_id: str):
+    """Records that a table changed, so result and schema caches reload it."""
+    with self._lock:
+      self._modified[table_id] = datetime.datetime.now(datetime.timezone.utc)
+
+  @property
+  def created(self) -> datetime.datetime:
+    return self._created
+
+  def close(self):
+    self._connection.close()
+
+
+class LocalBigQueryClient:
+  """Answers the app's `bigquery.Client` calls from a `LocalDatabase`.
+
+  Query jobs run synchronously when created, so `result()` never waits. The
+  bytes a job reports are those of its results, since nothing is billed.
+  """
+
+  def __init__(self, database: LocalDatabase, project: Optional[str] = None, location: Optional[str] = None):
+    self._database = database
+    self.project = project or "local"
+    self.location = location
+
+  def query(self, query: str, job_config: Optional[bigquery.QueryJobConfig] = None, **kwargs) -> LocalQueryJob:
+    """Runs a BigQuery SQL query on the local database."""
+    sql = translate_sql(query)
+    parameters = {}
+    for parameter in getattr(job_config, "query_parameters", None) or []:
+      value = parameter.values if isinstance(parameter, bigquery.ArrayQueryParameter) else parameter.value
+      # DuckDB rejects parameters the statement does not use.
+      if re.search(rf"\${re.escape(parameter.name)}\b", sql):
+        parameters[parameter.name] = value
+    cursor = self._database.cursor()
+    try:
+      if job_config is not None and job_config.dry_run:
+        cursor.execute(f"EXPLAIN {sql}", parameters)
+        return LocalQueryJob(query, None)
+      return LocalQueryJob(query, _fetch_arrow(cursor.execute(sql, parameters)))
+    finally:
+      cursor.close()
+
+  def dataset(self, dataset_id: str, project: Optional[str] = None) -> bigquery.DatasetReference:
+    return bigquery.DatasetReference(project or self.project, dataset_id)
+
+  def get_dataset(self, dataset_ref) -> LocalDataset:
+    dataset_id = getattr(dataset_ref, "dataset_id", None) or str(dataset_ref).split(".")[-1]
+    if dataset_id != self._database.dataset_id:
+      raise KeyError(f"Dataset {dataset_id} not found")
+    return LocalDataset(
+        project=self.project,
+        dataset_id=dataset_id,
+        created=self._database.created,
+        modified=max([self._database.created, *(self._database.modified(t) for t in self._database.table_ids())]),
+    )
+
+  def list_datasets(self, project: Optional[str] = None) -> List[LocalDataset]:
+    return [self.get_dataset(self._database.dataset_id)]
+
+  def list_tables(self, dataset) -> List[bigquery.TableReference]:
+    dataset_id = getattr(dataset, "dataset_id", None) or str(dataset).split(".")[-1]
+    return [
+        bigquery.TableReference(self.dataset(dataset_id), table_id)
+        for table_id in self._database.table_ids()
+        if dataset_id == self._database.dataset_id
+    ]
+
+  def get_table(self, table) -> LocalTable:
+    """Returns the schema and metadata of a local table."""
+    reference = self._table_reference(table)
+    modified = self._database.modified(reference.table_id)
+    cursor = self._database.cursor()
+    try:
+      columns = cursor.execute(
+          "SELECT column_name, data_type, is_nullable FROM information_schema.columns "
+          "WHERE table_schema = ? AND table_name = ? ORDER BY ordinal_position",
+          [reference.dataset_id, reference.table_id],
+      ).fetchall()
+      (num_rows,) = cursor.execute(
+          f'SELECT COUNT(*) FROM "{reference.dataset_id}"."{reference.table_id}"'
+      ).fetchone()
+    finally:
+      cursor.close()
+    return LocalTable(
+        project=self.project,
+        dataset_id=reference.dataset_id,
+        table_id=reference.table_id,
+        schema=[
+            bigquery.SchemaField(
+                name, _field_type(data_type), mode="NULLABLE" if nullable == "YES" else "REQUIRED"
+            )
+            for name, data_type, nullable in columns
+        ],
+        created=self._database.created,
+        modified=modified,
+        num_rows=num_rows,
+    )
+
+  def insert_rows_json(self, table, json_rows: Sequence[Dict[str, Any]], row_ids=None, **kwargs) -> List[Dict[str, Any]]:
+    """Inserts rows, returning the errors of the rows that failed like BigQuery."""
+    reference = self._table_reference(table)
+    target = f'"{reference.dataset_id}"."{reference.table_id}"'
+    errors = []
+    cursor = self._database.cursor()
+    try:
+      for index, row in enumerate(json_rows):
+        columns = list(row)
+        values = [json.dumps(value) if isinstance(value, (dict, list)) else value for value in row.values()]
+        try:
+          cursor.execute(
+              f"INSERT INTO {target} ({', '.join(_quote(column) for column in columns)}) "
+              f"VALUES ({', '.join('?' for _ in columns)})",
+              values,
+          )
+        except Exception as e:
+          errors.append({"index": index, "errors": [{"reason": "invalid", "message": str(e)}]})
+    finally:
+      cursor.close()
+    self._database.touch(reference.table_id)
+    return errors
+
+  def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs) -> LocalLoadJob:
+    """Loads newline-delimited JSON rows, as a load job would."""
+    rows = [json.loads(line) for line in io.TextIOWrapper(file_obj, encoding="utf-8") if line.strip()]
+    errors = self.insert_rows_json(destination, rows)
+    return LocalLoadJob(len(rows) - len(errors), errors)
+
+  def close(self):
+    # The database is shared by every client of the pool, which closes it.
+    pass
+
+  def _table_reference(self, table) -> bigquery.TableReference:
+    if isinstance(table, str):
+      return bigquery.TableReference.from_string(table, default_project=self.project)
+    if isinstance(table, LocalTable):
+      return bigquery.TableReference(self.dataset(table.dataset_id), table.table_id)
+    return table
+
+
+class LocalQueryJob:
+  """A finished local query job."""
+
+  cache_hit = False
+
+  def __init__(self, query: str, arrow_table):
+    self.query = query
+    self._arrow_table = arrow_table
+    self.total_bytes_processed = arrow_table.nbytes if arrow_table is not None else 0
+    self.total_bytes_billed = 0
+
+  def result(self, max_results: Optional[int] = None, page_size: Optional[int] = None, **kwargs) -> LocalRowIterator:
+    table = self._arrow_table
+    if max_results is not None:
+      table = table.slice(0, max_results)
+    return LocalRowIterator(table, page_size)
+
+  def to_dataframe(self, **kwargs):
+    return self.result().to_dataframe()
+
+  def to_arrow(self, **kwargs):
+    return self.result().to_arrow()
+
+
+class LocalRowIterator:
+  """The rows of a local query, as `bigquery.table.Row` objects or Arrow."""
+
+  def __init__(self, arrow_table, page_size: Optional[int] = None):
+    self._arrow_table = arrow_table
+    self._page_size = page_size or DEFAULT_PAGE_SIZE
+    self.total_rows = arrow_table.num_rows
+    self._field_to_index = {name: i for i, name in enumerate(arrow_table.column_names)}
+
+  @property
+  def pages(self) -> Iterator[List[Row]]:
+    for batch in self._arrow_table.to_batches(max_chunksize=self._page_size):
+      columns = [column.to_pylist() for column in batch.columns]
+      yield [Row(values, self._field_to_index) for values in zip(*columns)]
+
+  def __iter__(self) -> Iterator[Row]:
+    for page in self.pages:
+      yield from page
+
+  def to_arrow(self, **kwargs):
+    return self._arrow_table
+
+  def to_arrow_iterable(self, **kwargs):
+    return iter(self._arrow_table.to_batches(max_chunksize=self._page_size))
+
+  def to_dataframe(self, **kwargs):
+    return self._arrow_table.to_pandas()
+
+
+@dataclasses.dataclass
+class LocalLoadJob:
+  """A finished local load job."""
+
+  output_rows: int
+  errors: List[Dict[str, Any]]
+
+  def result(self, **kwargs) -> LocalLoadJob:
+    if self.errors:
+      raise RuntimeError(f"{len(self.errors)} rows could not be loaded: {self.errors[0]['errors']}")
+    return self
+
+
+def _field_type(data_type: str) -> str:
+  for prefix, field_type in _FIELD_TYPES:
+    if data_type.upper().startswith(prefix):
+      return field_type
+  return "STRING"
+
+
+def _quote(identifier: str) -> str:
+  return '"' + identifier.replace('"', '""') + '"'
+
+
+def export_snapshots(
+    client: bigquery.Client,
+    dataset_id: str,
+    output_dir: str,
+    tables: Sequence[str] = SNAPSHOT_TABLES,
+    on_table: Optional[Callable[[str, int], None]] = None,
+) -> Dict[str, Any]:
+  """Writes a Parquet snapshot of each table of a BigQuery dataset.
+
+  Tables are read whole with the BigQuery Storage Read API when it is
+  installed, without running queries. Each file is written under a temporary
+  name and renamed, so an interrupted export never leaves a partial snapshot.
+  A manifest records when and where the snapshots were taken.
+
+  Args:
+    client: The BigQuery client.
+    dataset_id: The dataset to export.
+    output_dir: The directory of the snapshots.
+    tables: The tables to export.
+    on_table: Called with each exported table and its number of rows.
+
+  Returns:
+    The manifest.
+  """
+  import pyarrow.parquet as pq
+
+  os.makedirs(output_dir, exist_ok=True)
+  manifest = {
+      "project": client.project,
+      "dataset_id": dataset_id,
+      "exported_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+      "tables": {},
+  }
+  for table_id in tables:
+    table = client.get_table(f"{client.project}.{dataset_id}.{table_id}")
+    arrow_table = client.list_rows(table).to_arrow(create_bqstorage_client=True)
+    path = os.path.join(output_dir, f"{table_id}.parquet")
+    pq.write_table(arrow_table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    manifest["tables"][table_id] = {
+        "rows": arrow_table.num_rows,
+        "modified": table.modified.isoformat() if table.modified else None,
+    }
+    if on_table is not None:
+      on_table(table_id, arrow_table.num_rows)
+  with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+    json.dump(manifest, f, indent=2)
+  return manifest
@@ -14,6 +14,7 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any, Dict, List, Optional
 
 from google.cloud import bigquery
@@ -22,6 +23,7 @@ from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContex
 from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
 
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.schema_catalog import get_schema_catalog
 
 
 async def get_dataset_info(
@@ -48,7 +50,7 @@ async def get_dataset_info(
     return ToolResult.from_error("Dataset ID must be provided or set in config.")
 
   try:
-    dataset = client.get_dataset(dataset_id)
+    dataset = await asyncio.to_thread(client.get_dataset, dataset_id)
     info = {
         "dataset_id": dataset.dataset_id,
         "project_id": dataset.project,
@@ -100,7 +102,7 @@ async def get_table_info(
 
   try:
     table_ref = client.dataset(dataset_id).table(table_id)
-    table = client.get_table(table_ref)
+    table = await asyncio.to_thread(client.get_table, table_ref)
     info = {
         "table_id": table.table_id,
         "dataset_id": table.dataset_id,
@@ -141,7 +143,9 @@ async def list_dataset_ids(
     A ToolResult containing a list of dataset IDs.
   """
   try:
-    datasets = list(client.list_datasets(project=project_id))
+    datasets = await asyncio.to_thread(
+        list, client.list_datasets(project=project_id)
+    )
     dataset_ids = [dataset.dataset_id for dataset in datasets]
     return ToolResult.success({"dataset_ids": dataset_ids})
   except Exception as e:
@@ -172,7 +176,7 @@ async def list_table_ids(
     return ToolResult.from_error("Dataset ID must be provided or set in config.")
 
   try:
-    tables = list(client.list_tables(dataset_id))
+    tables = await asyncio.to_thread(list, client.list_tables(dataset_id))
     table_ids = [table.table_id for table in tables]
     return ToolResult.success({"table_ids": table_ids})
   except Exception as e:
@@ -211,12 +215,17 @@ async def get_table_schema(
     )
 
   try:
-    table_ref = client.dataset(dataset_id).table(table_id)
-    table = client.get_table(table_ref)
-    schema = [
-        {"name": field.name, "field_type": field.field_type, "mode": field.mode}
-        for field in table.schema
-    ]
-    return ToolResult.success({"schema": schema})
+    entry = await asyncio.to_thread(
+        get_schema_catalog().get_schema,
+        lambda: client,
+        dataset_id,
+        table_id,
+        ttl_seconds=(
+            bigquery_tool_config.schema_cache_ttl_seconds
+            if bigquery_tool_config
+            else None
+        ),
+    )
+    return ToolResult.success({"schema": entry.schema})
   except Exception as e:
     return ToolResult.from_error(f"Error getting table schema: {e}")
\ No newline at end of file
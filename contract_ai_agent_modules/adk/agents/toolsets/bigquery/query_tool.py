@@ -14,16 +14,19 @@ from __future__ import annotations
 # limitations under the License.
 
 
+import asyncio
 import functools
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Union
 import logging
 
 from google.cloud import bigquery
 
 from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContext
 from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
+from contract_ai_agent_modules.adk.utils import tracing
 
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery import result_cache
 
 
 def get_execute_sql(
@@ -67,36 +70,328 @@ async def execute_sql(
     bigquery_tool_config: The BigQuery tool config.
 
   Returns:
-    A ToolResult containing the query results.
+    A ToolResult containing the query results and whether they were served
+    from the result cache.
   """
-  if bigquery_tool_config and bigquery_tool_config.default_dataset_id:
-      import re
-      # Add the dataset prefix to all tables in the query
-      query = re.sub(
-          r"FROM\s+`?([a-zA-Z_][a-zA-Z0-9_]*)`?",
-          rf"FROM `{bigquery_tool_config.default_dataset_id}.\g<1>`",
-          query,
-      )
-      query = re.sub(
-          r"JOIN\s+`?([a-zA-Z_][a-zA-Z0-9_]*)`?",
-          rf"JOIN `{bigquery_tool_config.default_dataset_id}.\g<1>`",
+  default_dataset_id = (
+      bigquery_tool_config.default_dataset_id if bigquery_tool_config else None
+  )
+  if default_dataset_id:
+      with tracing.span("sql.qualify_tables", query_chars=len(query)):
+        query = _qualify_table_names(query, default_dataset_id)
+  max_rows = (
+      bigquery_tool_config.max_rows if bigquery_tool_config else None
+  )
+  arrow_results = bool(
+      bigquery_tool_config and bigquery_tool_config.arrow_results
+  )
+  results_key = "arrow_table" if arrow_results else "results"
+  try:
+    cache = None
+    cache_key = None
+    if bigquery_tool_config is None or bigquery_tool_config.result_cache_enabled:
+      cache = result_cache.get_result_cache()
+      # Building the key may read table versions from BigQuery.
+      cache_key = await asyncio.to_thread(
+          cache.make_key,
+          client,
           query,
+          default_dataset_id,
+          max_rows,
+          result_format="arrow" if arrow_results else "rows",
       )
-  try:
-    logging.info("Executing query: %s", query)
-    query_job = client.query(query)
-    rows = query_job.result()
+      if cache_key is not None:
+        with tracing.span("sql.result_cache") as cache_span:
+          cached_results = cache.get(cache_key)
+          cache_span.set(hit=cached_results is not None)
+        if cached_results is not None:
+          logging.info("Serving query from result cache: %s", query)
+          return ToolResult.success({
+              results_key: cached_results,
+              "cache_status": result_cache.CACHE_HIT,
+          })
 
-    results: List[Dict[str, Any]] = []
-    max_rows = (
-        bigquery_tool_config.max_rows if bigquery_tool_config else None
+    logging.info("Executing query: %s", query)
+    # The client blocks until the job is done, so it runs in a worker thread
+    # and concurrent tool calls overlap.
+    results = await asyncio.to_thread(
+        _run_query,
+        client,
+        query,
+        max_rows,
+        bigquery_tool_config.page_size if bigquery_tool_config else None,
+        arrow_results,
     )
-    for i, row in enumerate(rows):
-      if max_rows and i >= max_rows:
-        break
-      results.append(dict(row))
-    logging.info("Query results: %s", results)
-    return ToolResult.success({"results": results})
+    if cache_key is not None:
+      cache.put(cache_key, results)
+    return ToolResult.success({
+        results_key: results,
+        "cache_status": (
+            result_cache.CACHE_MISS
+            if cache_key is not None
+            else result_cache.CACHE_BYPASS
+        ),
+    })
   except Exception as e:
     logging.error("Error executing SQL query: %s", e, exc_info=True)
-    return ToolResult.from_error(f"Error executing SQL query: {e}")
\ No newline at end of file
+    return ToolResult.from_error(f"Error executing SQL query: {e}")
+
+
+def _run_query(
+    client: bigquery.Client,
+    query: str,
+    max_rows: Optional[int],
+    page_size: Optional[int],
+    arrow_results: bool,
+) -> Union[List[Dict[str, Any]], "pyarrow.Table"]:
+  """Runs a query and fetches its results, blocking until they are read."""
+  with tracing.span("bigquery.job") as job_span:
+    query_job = client.query(query)
+    rows = query_job.result(
+        max_results=None if arrow_results else max_rows,
+        page_size=page_size,
+    )
+    job_span.set(
+        bytes_processed=query_job.total_bytes_processed,
+        bytes_billed=query_job.total_bytes_billed,
+        bigquery_cache_hit=query_job.cache_hit,
+    )
+
+  with tracing.span("bigquery.fetch", format="arrow" if arrow_results else "rows") as fetch_span:
+    if arrow_results:
+      # Builds columnar record batches directly, using the Storage Read API
+      # when it is available, without a Python dict per row.
+      if max_rows is None:
+        results = rows.to_arrow(create_bqstorage_client=True)
+      else:
+        import pyarrow
+
+        batches = list(_limit_batches(
+            rows.to_arrow_iterable(bqstorage_client=_bqstorage_client(client)),
+            max_rows,
+        ))
+        # Results without any batch are empty, so reading them is free.
+        results = (
+            pyarrow.Table.from_batches(batches)
+            if batches
+            else rows.to_arrow(create_bqstorage_client=False)
+        )
+      logging.info("Query returned %d rows.", results.num_rows)
+      fetch_span.set(rows=results.num_rows, bytes=results.nbytes)
+    else:
+      results = [dict(row) for row in rows]
+      _log_results_summary(results)
+      fetch_span.set(rows=len(results))
+  return results
+
+
+class SqlRowStream:
+  """Async iterator over the rows of a query, fetched one page at a time.
+
+  Only the current page is held in memory, and blocking BigQuery calls run in
+  worker threads so the event loop stays responsive. Iterate it once, either
+  row by row, with `pages()` or with `record_batches()`. The query and fetch
+  spans go to the trace that was active when the stream was created, wherever
+  it is iterated.
+  """
+
+  def __init__(
+      self,
+      client: bigquery.Client,
+      query: str,
+      max_rows: Optional[int] = None,
+      page_size: Optional[int] = None,
+      on_success: Optional[Callable[[], None]] = None,
+      on_error: Optional[Callable[[Exception], None]] = None,
+  ):
+    """Initializes the stream. The query is not started until iterated.
+
+    Args:
+      client: The BigQuery client.
+      query: The SQL query, already qualified with the default dataset.
+      max_rows: The maximum number of rows to fetch.
+      page_size: The number of rows fetched per request.
+      on_success: Called once every row has been read.
+      on_error: Called with the exception if the query fails.
+    """
+    self._client = client
+    self._query = query
+    self._max_rows = max_rows
+    self._page_size = page_size
+    self._on_success = on_success
+    self._on_error = on_error
+    self._trace = tracing.current_trace()
+    self.row_count = 0
+
+  @property
+  def query(self) -> str:
+    return self._query
+
+  async def _start(self, arrow_results: bool = False):
+    """Runs the query job and returns its first results request."""
+    with tracing.activate(self._trace), tracing.span(
+        "bigquery.job", streamed=True
+    ) as job_span:
+      query_job = await asyncio.to_thread(self._client.query, self._query)
+      rows = await asyncio.to_thread(
+          query_job.result,
+          max_results=None if arrow_results else self._max_rows,
+          page_size=self._page_size,
+      )
+      job_span.set(
+          bytes_processed=query_job.total_bytes_processed,
+          bytes_billed=query_job.total_bytes_billed,
+      )
+    return rows
+
+  async def pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yields the rows of the query, one page at a time."""
+    try:
+      logging.info("Streaming query: %s", self._query)
+      rows = await self._start()
+      page_iterator = iter(rows.pages)
+      while True:
+        with tracing.activate(self._trace), tracing.span(
+            "bigquery.fetch", format="rows", streamed=True
+        ) as fetch_span:
+          page = await asyncio.to_thread(next, page_iterator, None)
+          page_rows = [dict(row) for row in page] if page is not None else None
+          fetch_span.set(rows=len(page_rows or ()))
+        if page_rows is None:
+          break
+        self.row_count += len(page_rows)
+        yield page_rows
+    except Exception as e:
+      logging.error("Error streaming SQL query: %s", e, exc_info=True)
+      if self._on_error:
+        self._on_error(e)
+      raise
+    logging.info("Streamed %d rows.", self.row_count)
+    if self._on_success:
+      self._on_success()
+
+  async def record_batches(self) -> AsyncIterator["pyarrow.RecordBatch"]:
+    """Yields the results of the query as Arrow record batches.
+
+    Rows are converted to columns page by page, without a Python dict per row.
+    """
+    try:
+      logging.info("Streaming query as Arrow: %s", self._query)
+      rows = await self._start(arrow_results=True)
+      batch_iterator = _limit_batches(
+          rows.to_arrow_iterable(
+              bqstorage_client=_bqstorage_client(self._client)
+          ),
+          self._max_rows,
+      )
+      while True:
+        with tracing.activate(self._trace), tracing.span(
+            "bigquery.fetch", format="arrow", streamed=True
+        ) as fetch_span:
+          batch = await asyncio.to_thread(next, batch_iterator, None)
+          fetch_span.set(rows=batch.num_rows if batch is not None else 0)
+        if batch is None:
+          break
+        self.row_count += batch.num_rows
+        yield batch
+    except Exception as e:
+      logging.error("Error streaming SQL query: %s", e, exc_info=True)
+      if self._on_error:
+        self._on_error(e)
+      raise
+    logging.info("Streamed %d rows.", self.row_count)
+    if self._on_success:
+      self._on_success()
+
+  async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+    async for page in self.pages():
+      for row in page:
+        yield row
+
+
+def stream_sql(
+    client: bigquery.Client,
+    query: str,
+    bigquery_tool_config: Optional[BigQueryToolConfig] = None,
+    on_success: Optional[Callable[[], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+) -> SqlRowStream:
+  """Returns a stream over the rows of a BigQuery SQL query.
+
+  Tables are qualified with the default dataset and the row limit is pushed
+  to the server, as in `execute_sql`. Streamed results bypass the result
+  cache.
+
+  Args:
+    client: The BigQuery client.
+    query: The SQL query to execute.
+    bigquery_tool_config: The BigQuery tool config.
+    on_success: Called once every row has been read.
+    on_error: Called with the exception if the query fails.
+
+  Returns:
+    An async iterator over the result rows.
+  """
+  if bigquery_tool_config and bigquery_tool_config.default_dataset_id:
+    query = _qualify_table_names(query, bigquery_tool_config.default_dataset_id)
+  return SqlRowStream(
+      client,
+      query,
+      max_rows=bigquery_tool_config.max_rows if bigquery_tool_config else None,
+      page_size=bigquery_tool_config.page_size if bigquery_tool_config else None,
+      on_success=on_success,
+      on_error=on_error,
+  )
+
+
+def _bqstorage_client(client: bigquery.Client):
+  """Returns a Storage Read API client, or None to read with the REST API."""
+  ensure_bqstorage_client = getattr(client, "_ensure_bqstorage_client", None)
+  if ensure_bqstorage_client is None:
+    return None
+  try:
+    return ensure_bqstorage_client()
+  except Exception as e:
+    logging.warning("Storage Read API unavailable, using the REST API: %s", e)
+    return None
+
+
+def _limit_batches(
+    batches: Iterable["pyarrow.RecordBatch"], max_rows: Optional[int]
+) -> Iterator["pyarrow.RecordBatch"]:
+  """Yields record batches until `max_rows` rows were yielded.
+
+  A row limit on the results request keeps the client from using the Storage
+  Read API, and a LIMIT clause around the query would drop its ORDER BY, so
+  Arrow results are truncated here instead.
+  """
+  remaining = max_rows
+  for batch in batches:
+    if remaining is not None and batch.num_rows >= remaining:
+      # Even an empty slice carries the schema of the results.
+      yield batch.slice(0, remaining)
+      return
+    if remaining is not None:
+      remaining -= batch.num_rows
+    yield batch
+
+
+def _log_results_summary(results: List[Dict[str, Any]], preview_rows: int = 3):
+  """Logs the size of a result set, and a short preview at debug level."""
+  logging.info("Query returned %d rows.", len(results))
+  if results and logging.getLogger().isEnabledFor(logging.DEBUG):
+    logging.debug("First rows: %.1000s", results[:preview_rows])
+
+
+def _qualify_table_names(query: str, dataset_id: str) -> str:
+  """Adds the dataset prefix to every unqualified table read with FROM or JOIN."""
+  pieces = []
+  position = 0
+  for reference in result_cache.table_references(query):
+    if "." in reference.group(2):
+      continue
+    pieces.append(query[position:reference.start(1)])
+    pieces.append(f"`{dataset_id}.{reference.group(2)}`")
+    position = reference.end(1)
+  pieces.append(query[position:])
+  return "".join(pieces)
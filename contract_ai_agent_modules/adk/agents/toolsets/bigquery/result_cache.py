@@ -0,0 +1,368 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import collections
+import dataclasses
+import datetime
+import logging
+import os
+import re
+import sys
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Union
+
+from google.cloud import bigquery
+
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.schema_catalog import SchemaCatalog
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.schema_catalog import get_schema_catalog
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_BYPASS = "bypass"
+
+_STRING_LITERAL_RE = re.compile(r"('(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\")")
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WHITESPACE_RE = re.compile(r"\s+")
+_TABLE_REFERENCE_RE = re.compile(
+    r"\b(?:from|join)\s+(`?([a-zA-Z_][\w-]*(?:\.[a-zA-Z_][\w-]*){0,2})`?)",
+    re.IGNORECASE,
+)
+_CTE_NAME_RE = re.compile(
+    r"(?:\bwith(?:\s+recursive)?|,)\s*`?([a-zA-Z_]\w*)`?\s+as\s*\(",
+    re.IGNORECASE,
+)
+# The FROM of EXTRACT(part FROM column) and similar functions, which is
+# followed by a column rather than a table.
+_FUNCTION_FROM_RE = re.compile(
+    r"\b(?:extract|trim|substring)\s*\([^()]*$", re.IGNORECASE
+)
+_READ_ONLY_RE = re.compile(r"^\s*(?:select|with)\b", re.IGNORECASE)
+_WITH_RE = re.compile(r"^\s*with\b", re.IGNORECASE)
+# Results of these functions change between executions, so queries using them
+# are never cached.
+_VOLATILE_RE = re.compile(
+    r"\b(?:current_timestamp|current_datetime|current_time|now|rand"
+    r"|generate_uuid|session_user)\b",
+    re.IGNORECASE,
+)
+_CURRENT_DATE_RE = re.compile(r"\bcurrent_date\b", re.IGNORECASE)
+
+
+def normalize_sql(query: str, default_dataset_id: Optional[str] = None) -> str:
+  """Normalizes a SQL query for use as a cache key.
+
+  Comments, redundant whitespace, backticks, a trailing semicolon and the
+  default dataset prefix are removed, and everything outside string literals
+  is lower-cased.
+
+  Args:
+    query: The SQL query.
+    default_dataset_id: The dataset prefix to strip from table names.
+
+  Returns:
+    The normalized query.
+  """
+  query = _COMMENT_RE.sub(" ", query)
+  parts = _STRING_LITERAL_RE.split(query)
+  for i in range(0, len(parts), 2):
+    part = parts[i].lower().replace("`", "")
+    if default_dataset_id:
+      part = re.sub(rf"\b{re.escape(default_dataset_id.lower())}\.", "", part)
+    parts[i] = _WHITESPACE_RE.sub(" ", part)
+  return "".join(parts).strip().rstrip(";").strip()
+
+
+def table_references(query: str) -> List[re.Match]:
+  """Finds the tables a query reads from.
+
+  Names after FROM or JOIN are tables, except in string literals, the names
+  of the query's CTEs, table functions such as UNNEST and the FROM of
+  `EXTRACT(part FROM column)`.
+
+  Args:
+    query: The SQL query.
+
+  Returns:
+    One match per reference, whose positions index into the query. Group 1
+    is the reference with any backticks and group 2 the table name.
+  """
+  # Literals are blanked out at the same length, so positions still index
+  # into the query.
+  masked = _STRING_LITERAL_RE.sub(lambda match: " " * len(match.group(0)), query)
+  ctes = set()
+  if _WITH_RE.match(masked):
+    ctes = {name.lower() for name in _CTE_NAME_RE.findall(masked)}
+  references = []
+  for match in _TABLE_REFERENCE_RE.finditer(masked):
+    if (
+        match.group(2).lower() in ctes
+        or masked[match.end():].lstrip().startswith("(")
+        or _FUNCTION_FROM_RE.search(masked, 0, match.start())
+    ):
+      continue
+    references.append(match)
+  return references
+
+
+def referenced_tables(
+    query: str, default_dataset_id: Optional[str] = None
+) -> List[str]:
+  """Returns the tables a query reads from, qualified with their dataset."""
+  tables = set()
+  for match in table_references(query):
+    name = match.group(2)
+    if "." not in name and default_dataset_id:
+      name = f"{default_dataset_id}.{name}"
+    tables.add(name)
+  return sorted(tables)
+
+
+@dataclasses.dataclass(frozen=True)
+class ResultCacheStats:
+  """Counters describing how the result cache has been used.
+
+  Attributes:
+    hits: Queries answered from memory.
+    misses: Cacheable queries that had to run.
+    bypasses: Queries that could not be cached.
+    evictions: Entries dropped to stay within the size limit.
+    size_bytes: The estimated size of all cached results.
+  """
+
+  hits: int = 0
+  misses: int = 0
+  bypasses: int = 0
+  evictions: int = 0
+  size_bytes: int = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class _Entry:
+  results: Union[List[Dict[str, Any]], "pyarrow.Table"]
+  size_bytes: int
+
+
+class QueryResultCache:
+  """Caches query results keyed by normalized SQL and table versions.
+
+  A key is the normalized query plus the `modified` timestamp of every table
+  it reads. The timestamps come from the schema catalog, so building a key
+  makes no BigQuery call while the catalog's entries are fresh. Writes by
+  other processes therefore show up within the catalog TTL. The app's own
+  inserts call `invalidate_table`, which takes effect at once.
+
+  Rows sent with streaming inserts do not move a table's `modified` time,
+  so queries over tables with a streaming buffer are not cached. BigQuery's
+  own query cache makes the same exception. Entries are evicted least
+  recently used first once their estimated size exceeds `max_bytes`.
+  """
+
+  def __init__(
+      self,
+      max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES,
+      max_entry_bytes: Optional[int] = None,
+      schema_catalog: Optional[SchemaCatalog] = None,
+  ):
+    """Initializes the cache.
+
+    Args:
+      max_bytes: The maximum estimated size of all cached results.
+      max_entry_bytes: Results larger than this are not cached. Defaults to a
+        quarter of `max_bytes`.
+      schema_catalog: The catalog table versions are read from. Defaults to
+        the process-wide catalog.
+    """
+    self._schema_catalog = schema_catalog
+    self._max_bytes = max_bytes
+    self._max_entry_bytes = (
+        max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+    )
+    self._entries: collections.OrderedDict[Hashable, _Entry] = (
+        collections.OrderedDict()
+    )
+    self._size_bytes = 0
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+    self._bypasses = 0
+    self._evictions = 0
+
+  @property
+  def stats(self) -> ResultCacheStats:
+    with self._lock:
+      return ResultCacheStats(
+          hits=self._hits,
+          misses=self._misses,
+          bypasses=self._bypasses,
+          evictions=self._evictions,
+          size_bytes=self._size_bytes,
+      )
+
+  def make_key(
+      self,
+      client: bigquery.Client,
+      query: str,
+      default_dataset_id: Optional[str] = None,
+      max_rows: Optional[int] = None,
+      result_format: str = "rows",
+  ) -> Optional[Hashable]:
+    """Builds the cache key of a query.
+
+    Args:
+      client: The BigQuery client used to read table modification times.
+      query: The SQL query, after dataset qualification.
+      default_dataset_id: The default dataset of the query.
+      max_rows: The row limit applied to the results.
+      result_format: How the results are represented, e.g. "rows" or "arrow".
+
+    Returns:
+      The cache key, or None if the query must not be cached.
+    """
+    if not _READ_ONLY_RE.match(query) or _VOLATILE_RE.search(
+        _STRING_LITERAL_RE.sub("''", query)
+    ):
+      self._record_bypass()
+      return None
+    catalog = self._schema_catalog or get_schema_catalog()
+    versions = []
+    try:
+      for table in referenced_tables(query, default_dataset_id):
+        parts = table.split(".")
+        if len(parts) < 2:
+          raise ValueError(f"Table {table} has no dataset")
+        entry = catalog.get_schema(lambda: client, parts[-2], parts[-1])
+        if entry.streaming_buffer:
+          _LOGGER.debug("Not caching query, %s has a streaming buffer", table)
+          self._record_bypass()
+          return None
+        versions.append((table, entry.modified))
+    except Exception as e:
+      _LOGGER.debug("Not caching query, table lookup failed: %s", e)
+      self._record_bypass()
+      return None
+    today = None
+    if _CURRENT_DATE_RE.search(query):
+      today = datetime.datetime.now(datetime.timezone.utc).date()
+    return (
+        normalize_sql(query, default_dataset_id),
+        max_rows,
+        result_format,
+        tuple(versions),
+        today,
+    )
+
+  def get(
+      self, key: Hashable
+  ) -> Optional[Union[List[Dict[str, Any]], "pyarrow.Table"]]:
+    """Returns the cached results for a key, or None on a miss."""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self._misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self._hits += 1
+      if isinstance(entry.results, list):
+        return list(entry.results)
+      # Arrow tables are immutable and can be shared as is.
+      return entry.results
+
+  def put(
+      self,
+      key: Hashable,
+      results: Union[List[Dict[str, Any]], "pyarrow.Table"],
+  ):
+    """Caches the results of a key, evicting old entries if needed."""
+    size_bytes = _estimate_size(results)
+    if size_bytes > self._max_entry_bytes:
+      return
+    with self._lock:
+      previous = self._entries.pop(key, None)
+      if previous is not None:
+        self._size_bytes -= previous.size_bytes
+      if isinstance(results, list):
+        results = list(results)
+      self._entries[key] = _Entry(results=results, size_bytes=size_bytes)
+      self._size_bytes += size_bytes
+      while self._size_bytes > self._max_bytes:
+        _, evicted = self._entries.popitem(last=False)
+        self._size_bytes -= evicted.size_bytes
+        self._evictions += 1
+
+  def invalidate_table(self, table: str):
+    """Drops the cached results of every query that reads a table.
+
+    Args:
+      table: The table, as "dataset.table" or "project.dataset.table".
+    """
+    suffix = ".".join(table.split(".")[-2:])
+    with self._lock:
+      for key in list(self._entries):
+        if any(
+            ".".join(name.split(".")[-2:]) == suffix for name, _ in key[3]
+        ):
+          self._size_bytes -= self._entries.pop(key).size_bytes
+
+  def clear(self):
+    """Drops every cached result."""
+    with self._lock:
+      self._entries.clear()
+      self._size_bytes = 0
+
+  def _record_bypass(self):
+    with self._lock:
+      self._bypasses += 1
+
+
+def _estimate_size(
+    results: Union[List[Dict[str, Any]], "pyarrow.Table"],
+) -> int:
+  if not isinstance(results, list):
+    return results.nbytes
+  size = sys.getsizeof(results)
+  for row in results:
+    size += sys.getsizeof(row)
+    for key, value in row.items():
+      size += sys.getsizeof(key) + sys.getsizeof(value)
+  return size
+
+
+_result_cache: Optional[QueryResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> QueryResultCache:
+  """Returns the process-wide query result cache.
+
+  The size limit is read from the BIGQUERY_RESULT_CACHE_MAX_BYTES environment
+  variable when the cache is first created.
+  """
+  global _result_cache
+  with _result_cache_lock:
+    if _result_cache is None:
+      _result_cache = QueryResultCache(
+          max_bytes=int(
+              os.environ.get(
+                  "BIGQUERY_RESULT_CACHE_MAX_BYTES",
+                  DEFAULT_RESULT_CACHE_MAX_BYTES,
+              )
+          )
+      )
+    return _result_cache
@@ -0,0 +1,229 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.cloud import bigquery
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SCHEMA_TTL_SECONDS = 300.0
+
+ClientFactory = Callable[[], bigquery.Client]
+
+
+@dataclasses.dataclass(frozen=True)
+class TableSchemaEntry:
+  """A cached table schema.
+
+  Attributes:
+    dataset_id: The ID of the dataset containing the table.
+    table_id: The ID of the table.
+    schema: The table schema, one dict per field with "name", "field_type" and
+      "mode" keys.
+    modified: The table's last modified time as reported by BigQuery.
+    loaded_at: The monotonic time at which the entry was loaded or last
+      revalidated.
+    streaming_buffer: Whether the table had rows in its streaming buffer,
+      which `modified` does not account for.
+  """
+
+  dataset_id: str
+  table_id: str
+  schema: List[Dict[str, Any]]
+  modified: Optional[datetime.datetime]
+  loaded_at: float
+  streaming_buffer: bool = False
+
+  @property
+  def fingerprint(self) -> str:
+    """A digest of the schema fields that changes only when the schema does."""
+    return hashlib.sha256(
+        json.dumps(self.schema, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+@dataclasses.dataclass(frozen=True)
+class SchemaCatalogStats:
+  """Counters describing how the schema catalog has been used.
+
+  Attributes:
+    hits: Lookups served from memory without contacting BigQuery.
+    misses: Lookups that had to load the table from BigQuery.
+    revalidations: Lookups whose entry had expired and was checked against the
+      table's modified timestamp.
+    refreshes: Revalidations that found a newer table and replaced the entry.
+  """
+
+  hits: int = 0
+  misses: int = 0
+  revalidations: int = 0
+  refreshes: int = 0
+
+
+class SchemaCatalog:
+  """Process-wide cache of BigQuery table schemas.
+
+  Entries are served from memory until they are older than the TTL. An expired
+  entry is revalidated with a metadata call and only replaced when the table's
+  `modified` timestamp has changed.
+  """
+
+  def __init__(
+      self,
+      ttl_seconds: Optional[float] = DEFAULT_SCHEMA_TTL_SECONDS,
+      clock: Callable[[], float] = time.monotonic,
+  ):
+    """Initializes the catalog.
+
+    Args:
+      ttl_seconds: How long an entry is served without revalidation. None means
+        entries never expire; 0 revalidates on every lookup.
+      clock: The monotonic clock used to age entries.
+    """
+    self._ttl_seconds = ttl_seconds
+    self._clock = clock
+    self._entries: Dict[Tuple[str, str], TableSchemaEntry] = {}
+    self._lock = threading.Lock()
+    self._hits = 0
+    self._misses = 0
+    self._revalidations = 0
+    self._refreshes = 0
+
+  @property
+  def stats(self) -> SchemaCatalogStats:
+    with self._lock:
+      return SchemaCatalogStats(
+          hits=self._hits,
+          misses=self._misses,
+          revalidations=self._revalidations,
+          refreshes=self._refreshes,
+      )
+
+  def get_schema(
+      self,
+      client_factory: ClientFactory,
+      dataset_id: str,
+      table_id: str,
+      ttl_seconds: Optional[float] = None,
+  ) -> TableSchemaEntry:
+    """Gets the schema of a table, loading it from BigQuery if needed.
+
+    Args:
+      client_factory: Returns the BigQuery client to use. Only called when the
+        table has to be loaded or revalidated.
+      dataset_id: The ID of the dataset containing the table.
+      table_id: The ID of the table.
+      ttl_seconds: Overrides the catalog TTL for this lookup.
+
+    Returns:
+      The cached schema entry.
+    """
+    key = (dataset_id, table_id)
+    ttl = self._ttl_seconds if ttl_seconds is None else ttl_seconds
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and not self._is_expired(entry, ttl):
+        self._hits += 1
+        return entry
+
+    table = self._fetch_table(client_factory(), dataset_id, table_id)
+    now = self._clock()
+    with self._lock:
+      current = self._entries.get(key)
+      if current is None:
+        self._misses += 1
+      else:
+        self._revalidations += 1
+      streaming_buffer = getattr(table, "streaming_buffer", None) is not None
+      if current is not None and current.modified == table.modified:
+        entry = dataclasses.replace(
+            current, loaded_at=now, streaming_buffer=streaming_buffer
+        )
+      else:
+        if current is not None:
+          self._refreshes += 1
+          _LOGGER.info(
+              "Table %s.%s was modified, reloading catalog entry.",
+              dataset_id,
+              table_id,
+          )
+        entry = TableSchemaEntry(
+            dataset_id=dataset_id,
+            table_id=table_id,
+            schema=[
+                {
+                    "name": field.name,
+                    "field_type": field.field_type,
+                    "mode": field.mode,
+                }
+                for field in table.schema
+            ],
+            modified=table.modified,
+            loaded_at=now,
+            streaming_buffer=streaming_buffer,
+        )
+      self._entries[key] = entry
+      return entry
+
+  def invalidate(
+      self, dataset_id: Optional[str] = None, table_id: Optional[str] = None
+  ):
+    """Drops cached entries.
+
+    Args:
+      dataset_id: Only drop entries of this dataset. If not set, all entries are
+        dropped.
+      table_id: Only drop the entry of this table.
+    """
+    with self._lock:
+      if dataset_id is None:
+        self._entries.clear()
+        return
+      for key in list(self._entries):
+        if key[0] == dataset_id and table_id in (None, key[1]):
+          del self._entries[key]
+
+  def _is_expired(self, entry: TableSchemaEntry, ttl: Optional[float]) -> bool:
+    if ttl is None:
+      return False
+    return self._clock() - entry.loaded_at >= ttl
+
+  def _fetch_table(
+      self, client: bigquery.Client, dataset_id: str, table_id: str
+  ) -> bigquery.Table:
+    table_ref = client.dataset(dataset_id).table(table_id)
+    return client.get_table(table_ref)
+
+
+_schema_catalog: Optional[SchemaCatalog] = None
+_schema_catalog_lock = threading.Lock()
+
+
+def get_schema_catalog() -> SchemaCatalog:
+  """Returns the process-wide schema catalog."""
+  global _schema_catalog
+  with _schema_catalog_lock:
+    if _schema_catalog is None:
+      _schema_catalog = SchemaCatalog()
+    return _schema_catalog
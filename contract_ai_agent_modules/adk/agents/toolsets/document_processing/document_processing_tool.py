@@ -1,9 +1,18 @@
-from typing import Dict
+from typing import Dict, List, Optional, Union
 from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
 from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
 from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContext
+from contract_ai_agent_modules.adk.agents.toolsets.document_processing.extraction_cache import ExtractionCache, make_cache_key
+from contract_ai_agent_modules.adk.agents.toolsets.document_processing import page_windows
+from contract_ai_agent_modules.adk.agents.toolsets.document_processing import text_layer
+from contract_ai_agent_modules.adk.utils import tracing
 from vertexai.generative_models import GenerativeModel, Part
+import asyncio
+import hashlib
 import json
+import logging
+
+_LOGGER = logging.getLogger(__name__)
 
 def process_document(file_path: str) -> Dict:
     """Processes a contract PDF to extract its data using Gemini.
@@ -36,6 +45,50 @@ def validate_and_coerce_data(data: dict, schema: dict) -> dict:
             # Add more type checks and coercions as needed (e.g., for DATE, TIMESTAMP)
     return coerced_data
 
+DEFAULT_EXTRACTION_MODEL = "gemini-2.5-flash"
+# Documents with at least this many pages are extracted in page windows.
+DEFAULT_WINDOWED_MIN_PAGES = 60
+DEFAULT_MAX_CONCURRENT_WINDOWS = 4
+DEFAULT_WINDOW_MAX_ATTEMPTS = 3
+
+EXTRACTION_PROMPT = """
+            You are an expert in legal contract analysis. Please analyze the provided PDF document and extract the following information, returning it as a single, minified JSON object. All extracted text should be in English.:
+            - contract_id
+            - contract_name
+            - contract_type
+            - service_detail
+            - start_date (in YYYY-MM-DD format)
+            - end_date (in YYYY-MM-DD format)
+            - contract_date (in YYYY-MM-DD format)
+            - rut_brand
+            - provider
+            - legal_representatives
+            - contract_manager
+            - financials (as a JSON string)
+            - exit_clause
+            - general_conditions
+            - company
+            - business_unit
+            - price (as a number)
+            """
+
+TEXT_LAYER_PREAMBLE = (
+    "The text layer of the contract PDF follows instead of the PDF itself. "
+    "Each page starts with a [Page N] marker."
+)
+
+def load_extraction_response(response_text: str) -> dict:
+    """Parses the JSON returned by the model."""
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text[7:-3].strip()
+
+    return json.loads(response_text)
+
+def parse_extraction_response(response_text: str, schema: dict) -> dict:
+    """Parses the JSON returned by the model and coerces it to the schema."""
+    return validate_and_coerce_data(load_extraction_response(response_text), schema)
+
 class DocumentProcessingTool(BaseTool):
     
     BIGQUERY_SCHEMA = {
@@ -59,56 +112,299 @@ class DocumentProcessingTool(BaseTool):
         "ocr_text_ref": "STRING",
     }
 
+    def __init__(
+        self,
+        func,
+        model=None,
+        model_name: str = DEFAULT_EXTRACTION_MODEL,
+        cache: Optional[ExtractionCache] = None,
+        force_reextract: bool = False,
+        windowed_min_pages: Optional[int] = DEFAULT_WINDOWED_MIN_PAGES,
+        window_pages: int = page_windows.DEFAULT_WINDOW_PAGES,
+        max_concurrent_windows: int = DEFAULT_MAX_CONCURRENT_WINDOWS,
+        window_max_attempts: int = DEFAULT_WINDOW_MAX_ATTEMPTS,
+        text_layer_min_coverage: Optional[float] = text_layer.DEFAULT_MIN_COVERAGE,
+        metrics: Optional[text_layer.TextLayerMetrics] = None,
+    ):
+        """Initializes the tool.
+
+        Args:
+            func: The function describing the tool.
+            model: The model used for extraction. Anything with a
+                `generate_content_async` method works, which lets callers pass a
+                stub. Defaults to a Gemini model created on first use.
+            model_name: The Gemini model to create when `model` is not given.
+            cache: Reuses extractions of PDFs seen before. Disabled if not set.
+            force_reextract: Whether extractions bypass cached results by
+                default. The cache is still updated with the new result.
+            windowed_min_pages: Documents with at least this many pages are
+                split into page windows that are extracted concurrently and
+                merged. None always sends the whole document.
+            window_pages: The number of pages per window.
+            max_concurrent_windows: The maximum number of windows extracted at a
+                time.
+            window_max_attempts: Attempts per window before the extraction fails.
+            text_layer_min_coverage: When at least this fraction of pages has a
+                text layer, the extracted text is sent instead of the PDF. Pages
+                without one are then sent empty, so the default requires every
+                page to have text. None always sends the PDF.
+            metrics: Where per-document metrics are recorded. Defaults to the
+                process-wide text layer metrics.
+        """
+        super().__init__(func)
+        self._model = model
+        self._model_name = model_name
+        self._cache = cache
+        self._force_reextract = force_reextract
+        self._windowed_min_pages = windowed_min_pages
+        self._window_pages = window_pages
+        self._max_concurrent_windows = max_concurrent_windows
+        self._window_max_attempts = window_max_attempts
+        self._text_layer_min_coverage = text_layer_min_coverage
+        self._metrics = metrics or text_layer.get_text_layer_metrics()
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    def _get_model(self):
+        if self._model is None:
+            self._model = GenerativeModel(self._model_name)
+        return self._model
+
+    async def extract(
+        self,
+        pdf_content: Optional[Union[bytes, bytearray, memoryview]] = None,
+        force_reextract: Optional[bool] = None,
+        gcs_uri: Optional[str] = None,
+    ) -> Dict:
+        """Extracts the contract data from a PDF.
+
+        Unlike calling the tool, errors are raised to the caller, so it can tell
+        transient model errors from documents that cannot be parsed.
+
+        Args:
+            pdf_content: The contents of the contract PDF. Any bytes-like object
+                works; a memoryview is hashed for the cache without being copied.
+            force_reextract: Ignore a cached extraction of the same PDF. Defaults
+                to the tool's setting.
+            gcs_uri: The gs:// URI of the uploaded PDF. When set, the model reads
+                the document from Cloud Storage instead of receiving its bytes
+                inline, and `pdf_content` is only used for the cache.
+
+        Returns:
+            The extracted contract data, coerced to the BigQuery schema.
+        """
+        if force_reextract is None:
+            force_reextract = self._force_reextract
+        if pdf_content is None and gcs_uri is None:
+            raise ValueError("Either pdf_content or gcs_uri is required.")
+        cache_key = None
+        if self._cache is not None and pdf_content is not None:
+            cache_key = make_cache_key(pdf_content, EXTRACTION_PROMPT, self._model_name, mode=self._cache_mode())
+            if not force_reextract:
+                with tracing.span("document.extraction_cache") as cache_span:
+                    # Entries are read from disk or Cloud Storage.
+                    cached_data = await asyncio.to_thread(self._cache.get, cache_key)
+                    cache_span.set(hit=cached_data is not None)
+                if cached_data is not None:
+                    return cached_data
+
+        layer = None
+        text_layer_seconds = 0.0
+        if pdf_content is not None and self._text_layer_min_coverage is not None:
+            with tracing.span("document.text_layer", pdf_bytes=len(pdf_content)) as layer_span:
+                layer = await asyncio.to_thread(self._read_text_layer, pdf_content)
+                if layer is not None:
+                    layer_span.set(pages=len(layer.pages), coverage=layer.coverage)
+            text_layer_seconds = layer_span.seconds
+
+        with tracing.span("document.model", model=self._model_name) as model_span:
+            prompt_tokens = None
+            windows = None
+            if layer is not None and layer.coverage >= self._text_layer_min_coverage:
+                mode = text_layer.MODE_TEXT
+                if self._windowed_min_pages and len(layer.pages) >= self._windowed_min_pages:
+                    windows = page_windows.split_text_into_windows(layer.pages, window_pages=self._window_pages)
+                if windows:
+                    sent_text = "\n".join(
+                        layer.to_prompt_text(window.first_page, window.last_page) for window in windows
+                    )
+                    validated_data = validate_and_coerce_data(
+                        await self._extract_windows(windows, force_reextract, layer), self.BIGQUERY_SCHEMA
+                    )
+                else:
+                    sent_text = layer.to_prompt_text()
+                    response = await self._get_model().generate_content_async(
+                        [TEXT_LAYER_PREAMBLE, sent_text, EXTRACTION_PROMPT]
+                    )
+                    prompt_tokens = _prompt_token_count(response)
+                    validated_data = parse_extraction_response(response.text, self.BIGQUERY_SCHEMA)
+                sent_bytes = len(sent_text.encode("utf-8"))
+                estimated_sent_tokens = text_layer.estimate_text_tokens(sent_text)
+            else:
+                mode = text_layer.MODE_PDF
+                if pdf_content is not None and self._windowed_min_pages:
+                    windows = await asyncio.to_thread(self._split_into_windows, pdf_content)
+                if windows:
+                    validated_data = validate_and_coerce_data(
+                        await self._extract_windows(windows, force_reextract), self.BIGQUERY_SCHEMA
+                    )
+                else:
+                    if gcs_uri:
+                        document_part = Part.from_uri(gcs_uri, mime_type="application/pdf")
+                    else:
+                        document_part = Part.from_data(
+                            data=bytes(pdf_content), mime_type="application/pdf"
+                        )
+                    response = await self._get_model().generate_content_async([document_part, EXTRACTION_PROMPT])
+                    prompt_tokens = _prompt_token_count(response)
+                    validated_data = parse_extraction_response(response.text, self.BIGQUERY_SCHEMA)
+            model_span.set(
+                mode=mode,
+                windows=len(windows) if windows else None,
+                prompt_tokens=prompt_tokens,
+            )
+        model_seconds = model_span.seconds
+
+        if layer is not None:
+            estimated_pdf_tokens = text_layer.estimate_pdf_tokens(layer)
+            self._metrics.record(
+                text_layer.DocumentMetrics(
+                    document_digest=hashlib.sha256(pdf_content).hexdigest(),
+                    mode=mode,
+                    pages=len(layer.pages),
+                    coverage=layer.coverage,
+                    pdf_bytes=len(pdf_content),
+                    sent_bytes=sent_bytes if mode == text_layer.MODE_TEXT else len(pdf_content),
+                    estimated_pdf_tokens=estimated_pdf_tokens,
+                    estimated_sent_tokens=(
+                        estimated_sent_tokens if mode == text_layer.MODE_TEXT else estimated_pdf_tokens
+                    ),
+                    prompt_tokens=prompt_tokens,
+                    text_layer_seconds=text_layer_seconds,
+                    model_seconds=model_seconds,
+                )
+            )
+        if cache_key is not None:
+            await asyncio.to_thread(self._cache.put, cache_key, validated_data)
+        return validated_data
+
+    def _cache_mode(self) -> Optional[str]:
+        """Returns the mode part of the cache key of whole documents.
+
+        Whether a document is sent as its text layer depends only on its
+        contents and the coverage threshold, so the threshold stands in for the
+        mode without reading the text layer before the cache lookup.
+        """
+        if self._text_layer_min_coverage is None:
+            return None
+        return f"{text_layer.MODE_TEXT}>={self._text_layer_min_coverage}"
+
+    def _read_text_layer(self, pdf_content) -> Optional[text_layer.TextLayer]:
+        """Returns the text layer of a PDF, or None if it cannot be read."""
+        try:
+            return text_layer.extract_text_layer(pdf_content)
+        except ImportError:
+            return None
+        except Exception as e:
+            _LOGGER.warning("Could not read the text layer of the PDF, sending the PDF: %s", e)
+            return None
+
+    def _split_into_windows(self, pdf_content) -> Optional[List[page_windows.PageWindow]]:
+        """Returns the page windows of a large document, or None to send it whole."""
+        try:
+            if page_windows.count_pages(pdf_content) < self._windowed_min_pages:
+                return None
+            return page_windows.split_into_windows(pdf_content, window_pages=self._window_pages)
+        except ImportError:
+            return None
+        except Exception as e:
+            _LOGGER.warning("Could not split the PDF into page windows, sending it whole: %s", e)
+            return None
+
+    async def _extract_windows(
+        self,
+        windows: List[page_windows.PageWindow],
+        force_reextract: bool,
+        layer: Optional[text_layer.TextLayer] = None,
+    ) -> Dict:
+        """Extracts the windows concurrently and merges their fields.
+
+        Each window is retried on its own, and its result is cached, so rerunning
+        a failed extraction only sends the windows that failed. Windows without
+        a PDF are sent as the text of their pages, read from `layer`.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrent_windows)
+
+        async def extract_window(window):
+            prompt = page_windows.window_prompt(EXTRACTION_PROMPT, window)
+            if window.data is not None:
+                document = window.data
+                contents = [Part.from_data(data=window.data, mime_type="application/pdf"), prompt]
+            else:
+                window_text = layer.to_prompt_text(window.first_page, window.last_page)
+                document = window_text.encode("utf-8")
+                contents = [TEXT_LAYER_PREAMBLE, window_text, prompt]
+            cache_key = None
+            if self._cache is not None:
+                cache_key = make_cache_key(document, prompt, self._model_name)
+                if not force_reextract:
+                    cached_data = await asyncio.to_thread(self._cache.get, cache_key)
+                    if cached_data is not None:
+                        return cached_data
+            async with semaphore:
+                for attempt in range(1, self._window_max_attempts + 1):
+                    try:
+                        response = await self._get_model().generate_content_async(contents)
+                        data = load_extraction_response(response.text)
+                        break
+                    except Exception as e:
+                        if attempt == self._window_max_attempts:
+                            raise RuntimeError(
+                                f"Extraction of pages {window.first_page}-{window.last_page} failed: {e}"
+                            ) from e
+                        _LOGGER.warning(
+                            "Extraction of pages %d-%d failed, retrying: %s", window.first_page, window.last_page, e
+                        )
+                        await asyncio.sleep(2 ** (attempt - 1))
+            if cache_key is not None:
+                await asyncio.to_thread(self._cache.put, cache_key, data)
+            return data
+
+        results = await asyncio.gather(*(extract_window(window) for window in windows))
+        return page_windows.merge_window_results(windows, results)
+
     async def _call(self, readonly_context: ReadonlyContext, **kwargs) -> ToolResult:
+        """Extracts a contract, with the timing spans of the call as the result's "trace" metadata."""
+        with tracing.trace(f"tool.{self.name}") as tool_trace:
+            result = await self._traced_call(**kwargs)
+        return result.with_metadata(trace=tool_trace.to_dict())
+
+    async def _traced_call(self, **kwargs) -> ToolResult:
         file_path = kwargs.get("file_path")
-        if not file_path:
-            return ToolResult.from_error("file_path is required.")
+        pdf_content = kwargs.get("pdf_content")
+        gcs_uri = kwargs.get("gcs_uri")
+        if not file_path and pdf_content is None and not gcs_uri:
+            return ToolResult.from_error("file_path, pdf_content or gcs_uri is required.")
 
         try:
-            # 1. Read the PDF content as bytes
-            with open(file_path, "rb") as f:
-                pdf_content = f.read()
+            # 1. Read the PDF content as bytes, unless the caller passed them
+            if pdf_content is None and file_path:
+                with tracing.span("document.read_file") as read_span:
+                    with open(file_path, "rb") as f:
+                        pdf_content = f.read()
+                    read_span.set(bytes=len(pdf_content))
 
             # 2. Use Gemini to process the PDF directly
-            model = GenerativeModel("gemini-2.5-flash")
-            
-            document_part = Part.from_data(
-                data=pdf_content, mime_type="application/pdf"
+            validated_data = await self.extract(
+                pdf_content, force_reextract=kwargs.get("force_reextract"), gcs_uri=gcs_uri
             )
-            
-            prompt = """
-            You are an expert in legal contract analysis. Please analyze the provided PDF document and extract the following information, returning it as a single, minified JSON object. All extracted text should be in English.:
-            - contract_id
-            - contract_name
-            - contract_type
-            - service_detail
-            - start_date (in YYYY-MM-DD format)
-            - end_date (in YYYY-MM-DD format)
-            - contract_date (in YYYY-MM-DD format)
-            - rut_brand
-            - provider
-            - legal_representatives
-            - contract_manager
-            - financials (as a JSON string)
-            - exit_clause
-            - general_conditions
-            - company
-            - business_unit
-            - price (as a number)
-            """
-            
-            response = await model.generate_content_async([document_part, prompt])
-            
-            # 3. Parse the JSON response
-            response_text = response.text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text[7:-3].strip()
-
-            extracted_data = json.loads(response_text)
-
-            # 4. Validate and coerce data
-            validated_data = validate_and_coerce_data(extracted_data, self.BIGQUERY_SCHEMA)
 
             return ToolResult.success(result=validated_data)
         except Exception as e:
-            return ToolResult.from_error(str(e))
\ No newline at end of file
+            return ToolResult.from_error(str(e))
+
+def _prompt_token_count(response) -> Optional[int]:
+    usage_metadata = getattr(response, "usage_metadata", None)
+    return getattr(usage_metadata, "prompt_token_count", None) or None
@@ -3,13 +3,14 @@ from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
 from contract_ai_agent_modules.adk.tools.base_toolset import BaseToolset
 from contract_ai_agent_modules.adk.agents.readonly_context import ReadonlyContext
 from contract_ai_agent_modules.adk.agents.toolsets.document_processing.document_processing_tool import DocumentProcessingTool, process_document
+from contract_ai_agent_modules.adk.agents.toolsets.document_processing.extraction_cache import get_extraction_cache
 
 class DocumentProcessingToolset(BaseToolset):
     def __init__(self):
         pass
 
     async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
-        return [DocumentProcessingTool(func=process_document)]
+        return [DocumentProcessingTool(func=process_document, cache=get_extraction_cache())]
 
     async def close(self):
         pass
\ No newline at end of file
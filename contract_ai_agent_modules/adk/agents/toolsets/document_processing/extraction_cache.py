@@ -0,0 +1,260 @@
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "contract-ai-agent", "extractions")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def make_cache_key(pdf_content: bytes, prompt: str, model_name: str, mode: Optional[str] = None) -> str:
+    """Builds the content address of an extraction.
+
+    Args:
+        pdf_content: The contents of the contract PDF.
+        prompt: The extraction prompt.
+        model_name: The name of the model doing the extraction.
+        mode: How the document is sent to the model, when it is not simply
+            the PDF, e.g. as its text layer.
+
+    Returns:
+        The SHA-256 of the PDF followed by a digest of the prompt, model and
+        mode, so changing any of them never reuses an old extraction.
+    """
+    document_digest = hashlib.sha256(pdf_content).hexdigest()
+    extraction = f"{model_name}\0{prompt}" if mode is None else f"{model_name}\0{prompt}\0{mode}"
+    extraction_digest = hashlib.sha256(extraction.encode("utf-8")).hexdigest()[:16]
+    return f"{document_digest}-{extraction_digest}"
+
+
+@dataclasses.dataclass(frozen=True)
+class ExtractionCacheStats:
+    """Counters describing how the extraction cache has been used.
+
+    Attributes:
+        hits: Lookups answered from the local disk.
+        remote_hits: Lookups answered from GCS after a local miss.
+        misses: Lookups that required a model call.
+        evictions: Entries removed from disk to stay within the size limit.
+        size_bytes: The size of the entries on the local disk.
+    """
+
+    hits: int = 0
+    remote_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size_bytes: int = 0
+
+
+class ExtractionCache:
+    """A content-addressed cache of validated contract extractions.
+
+    Entries are JSON files on local disk, optionally mirrored to a GCS bucket so
+    they are shared between instances. When the local entries exceed `max_bytes`
+    the least recently used ones are deleted; entries in GCS are never evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        gcs_bucket: Optional[str] = None,
+        gcs_prefix: str = "extraction-cache/",
+        storage_client=None,
+    ):
+        """Initializes the cache.
+
+        Args:
+            cache_dir: The directory holding the local entries.
+            max_bytes: The maximum size of the local entries.
+            gcs_bucket: The GCS bucket mirroring the entries, if any.
+            gcs_prefix: The object name prefix of the entries in the bucket.
+            storage_client: The GCS client. Created on first use if not given.
+        """
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._gcs_bucket = gcs_bucket
+        self._gcs_prefix = gcs_prefix
+        self._storage_client = storage_client
+        self._lock = threading.Lock()
+        self._size_bytes = None
+        self._hits = 0
+        self._remote_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> ExtractionCacheStats:
+        with self._lock:
+            return ExtractionCacheStats(
+                hits=self._hits,
+                remote_hits=self._remote_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size_bytes=self._size_bytes or 0,
+            )
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Returns the cached extraction of a key, or None on a miss."""
+        path = self._local_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # The modification time orders entries for eviction.
+            os.utime(path)
+            with self._lock:
+                self._hits += 1
+            return data
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            _LOGGER.warning("Ignoring unreadable extraction cache entry %s: %s", path, e)
+
+        data = self._download(key)
+        with self._lock:
+            if data is None:
+                self._misses += 1
+            else:
+                self._remote_hits += 1
+        if data is not None:
+            self._write_local(key, data)
+        return data
+
+    def put(self, key: str, data: Dict):
+        """Caches the extraction of a key locally and, if configured, in GCS."""
+        self._write_local(key, data)
+        self._upload(key, data)
+
+    def invalidate(self, key: str):
+        """Removes the local entry of a key."""
+        path = self._local_path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._size_bytes is not None:
+                self._size_bytes -= size
+
+    def clear(self):
+        """Removes every local entry."""
+        for path, _, _ in self._scan():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._size_bytes = 0
+
+    def _local_path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, key[:2], f"{key}.json")
+
+    def _write_local(self, key: str, data: Dict):
+        path = self._local_path(key)
+        payload = json.dumps(data).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            # Write to a temporary file first so readers never see a partial
+            # entry.
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError as e:
+            _LOGGER.warning("Could not write extraction cache entry %s: %s", path, e)
+            return
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._size_bytes += len(payload) - previous_size
+            needs_eviction = self._size_bytes > self._max_bytes
+        if needs_eviction:
+            self._evict()
+
+    def _evict(self):
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        with self._lock:
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self._max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                self._evictions += 1
+            self._size_bytes = total
+
+    def _scan(self):
+        """Yields the path, size and modification time of every local entry."""
+        if not os.path.isdir(self._cache_dir):
+            return
+        for root, _, files in os.walk(self._cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _bucket(self):
+        if self._storage_client is None:
+            from google.cloud import storage
+
+            self._storage_client = storage.Client()
+        return self._storage_client.bucket(self._gcs_bucket)
+
+    def _download(self, key: str) -> Optional[Dict]:
+        if not self._gcs_bucket:
+            return None
+        try:
+            blob = self._bucket().blob(f"{self._gcs_prefix}{key}.json")
+            if not blob.exists():
+                return None
+            return json.loads(blob.download_as_bytes())
+        except Exception as e:
+            _LOGGER.warning("Could not read extraction cache entry %s from GCS: %s", key, e)
+            return None
+
+    def _upload(self, key: str, data: Dict):
+        if not self._gcs_bucket:
+            return
+        try:
+            blob = self._bucket().blob(f"{self._gcs_prefix}{key}.json")
+            blob.upload_from_string(json.dumps(data), content_type="application/json")
+        except Exception as e:
+            _LOGGER.warning("Could not write extraction cache entry %s to GCS: %s", key, e)
+
+
+_extraction_cache: Optional[ExtractionCache] = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Returns the process-wide extraction cache.
+
+    It is configured from the EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES
+    and EXTRACTION_CACHE_GCS_BUCKET environment variables when first created.
+    """
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache(
+                cache_dir=os.path.expanduser(os.environ.get("EXTRACTION_CACHE_DIR", DEFAULT_CACHE_DIR)),
+                max_bytes=int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                gcs_bucket=os.environ.get("EXTRACTION_CACHE_GCS_BUCKET") or None,
+            )
+        return _extraction_cache
@@ -0,0 +1,227 @@
+import dataclasses
+import io
+import re
+from typing import Dict, List, Optional, Sequence
+
+ROLE_COVER = "cover"
+ROLE_BODY = "body"
+ROLE_SIGNATURE = "signature"
+ROLE_ANNEX = "annex"
+
+DEFAULT_WINDOW_PAGES = 20
+DEFAULT_WINDOW_OVERLAP_PAGES = 1
+
+# A page starting with one of these headings opens an annex, and every page
+# after it belongs to the annexes.
+_ANNEX_HEADING_RE = re.compile(r"^\s*(annex|anexo|appendix|ap[eé]ndice|schedule|exhibit)\b", re.IGNORECASE)
+_SIGNATURE_RE = re.compile(
+    r"in witness whereof|signed by|signature|firma|p\.p\.|en se[nñ]al de conformidad",
+    re.IGNORECASE,
+)
+
+# The roles whose windows are trusted first for each field. Fields not listed
+# use DEFAULT_PRECEDENCE.
+FIELD_PRECEDENCE: Dict[str, Sequence[str]] = {
+    "contract_id": (ROLE_COVER, ROLE_BODY, ROLE_SIGNATURE, ROLE_ANNEX),
+    "contract_name": (ROLE_COVER, ROLE_BODY, ROLE_SIGNATURE, ROLE_ANNEX),
+    "contract_type": (ROLE_COVER, ROLE_BODY, ROLE_ANNEX, ROLE_SIGNATURE),
+    "rut_brand": (ROLE_COVER, ROLE_SIGNATURE, ROLE_BODY, ROLE_ANNEX),
+    "provider": (ROLE_COVER, ROLE_SIGNATURE, ROLE_BODY, ROLE_ANNEX),
+    "company": (ROLE_COVER, ROLE_SIGNATURE, ROLE_BODY, ROLE_ANNEX),
+    "business_unit": (ROLE_COVER, ROLE_BODY, ROLE_SIGNATURE, ROLE_ANNEX),
+    "start_date": (ROLE_SIGNATURE, ROLE_BODY, ROLE_COVER, ROLE_ANNEX),
+    "end_date": (ROLE_SIGNATURE, ROLE_BODY, ROLE_COVER, ROLE_ANNEX),
+    "contract_date": (ROLE_SIGNATURE, ROLE_COVER, ROLE_BODY, ROLE_ANNEX),
+    "legal_representatives": (ROLE_SIGNATURE, ROLE_COVER, ROLE_BODY, ROLE_ANNEX),
+    "financials": (ROLE_ANNEX, ROLE_BODY, ROLE_COVER, ROLE_SIGNATURE),
+    "price": (ROLE_ANNEX, ROLE_BODY, ROLE_COVER, ROLE_SIGNATURE),
+}
+DEFAULT_PRECEDENCE = (ROLE_BODY, ROLE_COVER, ROLE_ANNEX, ROLE_SIGNATURE)
+
+
+@dataclasses.dataclass(frozen=True)
+class PageWindow:
+    """A run of consecutive pages of a contract, extracted on its own.
+
+    Attributes:
+        index: The position of the window in the document.
+        first_page: The first page of the window, starting at 1.
+        last_page: The last page of the window, inclusive.
+        total_pages: The number of pages of the whole document.
+        role: Which part of the contract the window covers: "cover", "body",
+            "signature" or "annex".
+        data: The window as a standalone PDF, or None for a window of the
+            text layer.
+    """
+
+    index: int
+    first_page: int
+    last_page: int
+    total_pages: int
+    role: str
+    data: Optional[bytes] = None
+
+
+def count_pages(pdf_content) -> int:
+    """Returns the number of pages of a PDF."""
+    from pypdf import PdfReader
+
+    return len(PdfReader(io.BytesIO(pdf_content)).pages)
+
+
+def split_into_windows(
+    pdf_content,
+    window_pages: int = DEFAULT_WINDOW_PAGES,
+    overlap_pages: int = DEFAULT_WINDOW_OVERLAP_PAGES,
+) -> List[PageWindow]:
+    """Splits a PDF into windows of consecutive pages.
+
+    Consecutive windows share `overlap_pages` pages, so a clause cut by a window
+    boundary is seen whole by one of them. The first page opening an annex
+    always starts a new window. Each window gets a role from its position and
+    text: the first window is the cover, windows from the first annex on are
+    annexes, and the last window before the annexes is the signature window if
+    it mentions a signature.
+
+    Args:
+        pdf_content: The contents of the PDF.
+        window_pages: The number of pages per window.
+        overlap_pages: The number of pages shared by consecutive windows.
+
+    Returns:
+        The windows, in page order.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_content))
+    page_texts = [_page_text(page) for page in reader.pages]
+    windows = []
+    for window in split_text_into_windows(page_texts, window_pages, overlap_pages):
+        writer = PdfWriter()
+        for number in range(window.first_page - 1, window.last_page):
+            writer.add_page(reader.pages[number])
+        output = io.BytesIO()
+        writer.write(output)
+        windows.append(dataclasses.replace(window, data=output.getvalue()))
+    return windows
+
+
+def split_text_into_windows(
+    page_texts: Sequence[str],
+    window_pages: int = DEFAULT_WINDOW_PAGES,
+    overlap_pages: int = DEFAULT_WINDOW_OVERLAP_PAGES,
+) -> List[PageWindow]:
+    """Splits a document given as the text of its pages into windows.
+
+    The windows and their roles are the same as those of `split_into_windows`,
+    but they carry no PDF: the caller sends the text of their pages.
+
+    Args:
+        page_texts: The text of each page.
+        window_pages: The number of pages per window.
+        overlap_pages: The number of pages shared by consecutive windows.
+
+    Returns:
+        The windows, in page order.
+    """
+    total_pages = len(page_texts)
+    step = max(window_pages - overlap_pages, 1)
+    annex_start = next(
+        (number for number, text in enumerate(page_texts) if number > 0 and _ANNEX_HEADING_RE.match(text)),
+        None,
+    )
+
+    segments = [(0, total_pages)]
+    if annex_start is not None:
+        segments = [(0, annex_start), (annex_start, total_pages)]
+    ranges = []
+    roles = []
+    for segment_start, segment_end in segments:
+        for first in range(segment_start, segment_end, step):
+            last = min(first + window_pages, segment_end) - 1
+            ranges.append((first, last))
+            roles.append(ROLE_ANNEX if segment_start == annex_start else ROLE_BODY)
+            if last == segment_end - 1:
+                break
+    if len(ranges) > 1:
+        roles[0] = ROLE_COVER
+    body_indexes = [i for i, role in enumerate(roles) if role != ROLE_ANNEX]
+    if len(body_indexes) > 1:
+        last_body = body_indexes[-1]
+        first, last = ranges[last_body]
+        if any(_SIGNATURE_RE.search(text) for text in page_texts[first:last + 1]):
+            roles[last_body] = ROLE_SIGNATURE
+
+    return [
+        PageWindow(
+            index=index,
+            first_page=first + 1,
+            last_page=last + 1,
+            total_pages=total_pages,
+            role=role,
+        )
+        for index, ((first, last), role) in enumerate(zip(ranges, roles))
+    ]
+
+
+def window_prompt(prompt: str, window: PageWindow) -> str:
+    """Adapts the extraction prompt to a window of the document."""
+    source = "PDF" if window.data is not None else "text"
+    return (
+        f"{prompt}\n"
+        f"The {source} holds pages {window.first_page} to {window.last_page} of a "
+        f"{window.total_pages}-page contract. Extract only what these pages "
+        f"state and use null for fields they do not contain."
+    )
+
+
+def merge_window_results(
+    windows: Sequence[PageWindow],
+    results: Sequence[Dict],
+    precedence: Optional[Dict[str, Sequence[str]]] = None,
+) -> Dict:
+    """Merges the fields extracted from each window into one result.
+
+    For every field, windows are ranked by the precedence of their role and then
+    by page order, and the first non-empty value wins.
+
+    Args:
+        windows: The windows, in page order.
+        results: The fields extracted from each window.
+        precedence: Overrides FIELD_PRECEDENCE.
+
+    Returns:
+        The merged fields.
+    """
+    precedence = precedence or FIELD_PRECEDENCE
+    fields = []
+    for result in results:
+        fields.extend(field for field in result if field not in fields)
+
+    merged = {}
+    for field in fields:
+        order = precedence.get(field, DEFAULT_PRECEDENCE)
+        ranked = sorted(
+            zip(windows, results),
+            key=lambda item: (_rank(order, item[0].role), item[0].index),
+        )
+        merged[field] = next(
+            (result[field] for _, result in ranked if not _is_empty(result.get(field))),
+            None,
+        )
+    return merged
+
+
+def _rank(order: Sequence[str], role: str) -> int:
+    return order.index(role) if role in order else len(order)
+
+
+def _is_empty(value) -> bool:
+    return value is None or (isinstance(value, str) and value.strip().lower() in ("", "null", "none", "n/a"))
+
+
+def _page_text(page) -> str:
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
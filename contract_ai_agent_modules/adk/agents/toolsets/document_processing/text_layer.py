@@ -0,0 +1,178 @@
+import collections
+import dataclasses
+import io
+import re
+import threading
+from typing import Deque, Dict, List, Optional
+
+# Pages without a text layer would reach the model as empty pages, so by
+# default a document is only sent as text when every page has one.
+DEFAULT_MIN_COVERAGE = 1.0
+# A page with fewer characters than this is treated as having no text layer,
+# e.g. a scanned page with a stray OCR artifact.
+DEFAULT_MIN_PAGE_CHARS = 40
+DEFAULT_METRICS_MAX_ENTRIES = 1000
+
+# Gemini bills each PDF page as an image of this many tokens, and text at about
+# this many characters per token.
+PDF_TOKENS_PER_PAGE = 258
+CHARS_PER_TOKEN = 4
+
+MODE_TEXT = "text"
+MODE_PDF = "pdf"
+
+_WHITESPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+@dataclasses.dataclass(frozen=True)
+class TextLayer:
+    """The text layer of a PDF.
+
+    Attributes:
+        pages: The text of each page, with whitespace collapsed.
+        min_page_chars: The minimum number of characters of a page with text.
+    """
+
+    pages: List[str]
+    min_page_chars: int = DEFAULT_MIN_PAGE_CHARS
+
+    @property
+    def coverage(self) -> float:
+        """The fraction of pages that have a text layer."""
+        if not self.pages:
+            return 0.0
+        return sum(len(page) >= self.min_page_chars for page in self.pages) / len(self.pages)
+
+    def to_prompt_text(self, first_page: int = 1, last_page: Optional[int] = None) -> str:
+        """Returns the text of a range of pages, each preceded by a page marker.
+
+        Args:
+            first_page: The first page, starting at 1.
+            last_page: The last page, inclusive. Defaults to the last page.
+        """
+        pages = self.pages[first_page - 1:last_page]
+        return "\n".join(f"[Page {number}]\n{text}" for number, text in enumerate(pages, start=first_page))
+
+
+def extract_text_layer(pdf_content, min_page_chars: int = DEFAULT_MIN_PAGE_CHARS) -> TextLayer:
+    """Extracts the text layer of a PDF locally.
+
+    Args:
+        pdf_content: The contents of the PDF.
+        min_page_chars: The minimum number of characters of a page with text.
+
+    Returns:
+        The text layer.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(pdf_content))
+    pages = []
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ""
+        except Exception:
+            text = ""
+        text = _WHITESPACE_RE.sub(" ", text)
+        pages.append(_BLANK_LINES_RE.sub("\n", text).strip())
+    return TextLayer(pages=pages, min_page_chars=min_page_chars)
+
+
+@dataclasses.dataclass(frozen=True)
+class DocumentMetrics:
+    """How a document was sent to the model and what it saved.
+
+    Attributes:
+        document_digest: The SHA-256 of the PDF.
+        mode: "text" if the text layer was sent, "pdf" if the PDF was.
+        pages: The number of pages.
+        coverage: The fraction of pages with a text layer.
+        pdf_bytes: The size of the PDF.
+        sent_bytes: The size of what was sent to the model.
+        estimated_pdf_tokens: The estimated prompt tokens of the PDF.
+        estimated_sent_tokens: The estimated prompt tokens of what was sent.
+        prompt_tokens: The prompt tokens reported by the model, if any.
+        text_layer_seconds: The time spent extracting the text layer.
+        model_seconds: The time spent waiting for the model.
+    """
+
+    document_digest: str
+    mode: str
+    pages: int
+    coverage: float
+    pdf_bytes: int
+    sent_bytes: int
+    estimated_pdf_tokens: int
+    estimated_sent_tokens: int
+    prompt_tokens: Optional[int]
+    text_layer_seconds: float
+    model_seconds: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.pdf_bytes - self.sent_bytes
+
+    @property
+    def estimated_tokens_saved(self) -> int:
+        return self.estimated_pdf_tokens - self.estimated_sent_tokens
+
+
+def estimate_pdf_tokens(text_layer: TextLayer) -> int:
+    """Estimates the prompt tokens of sending a PDF with this text layer."""
+    text_chars = sum(len(page) for page in text_layer.pages)
+    return len(text_layer.pages) * PDF_TOKENS_PER_PAGE + text_chars // CHARS_PER_TOKEN
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimates the prompt tokens of a text."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+class TextLayerMetrics:
+    """Keeps the metrics of the most recently extracted documents."""
+
+    def __init__(self, max_entries: int = DEFAULT_METRICS_MAX_ENTRIES):
+        self._entries: Deque[DocumentMetrics] = collections.deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(self, metrics: DocumentMetrics):
+        with self._lock:
+            self._entries.append(metrics)
+
+    def recent(self) -> List[DocumentMetrics]:
+        """Returns the kept metrics, oldest first."""
+        with self._lock:
+            return list(self._entries)
+
+    def summary(self) -> Dict[str, float]:
+        """Returns totals and averages over the kept documents."""
+        entries = self.recent()
+        text_entries = [entry for entry in entries if entry.mode == MODE_TEXT]
+        return {
+            "documents": len(entries),
+            "text_documents": len(text_entries),
+            "bytes_saved": sum(entry.bytes_saved for entry in entries),
+            "estimated_tokens_saved": sum(entry.estimated_tokens_saved for entry in entries),
+            "mean_model_seconds_text": _mean(entry.model_seconds for entry in text_entries),
+            "mean_model_seconds_pdf": _mean(entry.model_seconds for entry in entries if entry.mode == MODE_PDF),
+            "mean_text_layer_seconds": _mean(entry.text_layer_seconds for entry in entries),
+        }
+
+
+def _mean(values) -> float:
+    values = list(values)
+    return sum(values) / len(values) if values else 0.0
+
+
+_text_layer_metrics: Optional[TextLayerMetrics] = None
+_text_layer_metrics_lock = threading.Lock()
+
+
+def get_text_layer_metrics() -> TextLayerMetrics:
+    """Returns the process-wide text layer metrics."""
+    global _text_layer_metrics
+    with _text_layer_metrics_lock:
+        if _text_layer_metrics is None:
+            _text_layer_metrics = TextLayerMetrics()
+        return _text_layer_metrics
@@ -30,6 +30,7 @@ class BaseTool(abc.ABC):
     self._name = func.__name__
     self._description = inspect.getdoc(func)
     self._parameters = inspect.signature(func).parameters
+    self._function_declaration = None
 
   @property
   def name(self) -> str:
@@ -44,7 +45,16 @@ class BaseTool(abc.ABC):
     return self._parameters
 
   def to_function_declaration(self) -> "Tool":
-    """Converts the tool to a Vertex AI Tool."""
+    """Converts the tool to a Vertex AI Tool.
+
+    The declaration only depends on the wrapped function, so it is built once
+    and reused on later calls.
+    """
+    if self._function_declaration is None:
+      self._function_declaration = self._build_function_declaration()
+    return self._function_declaration
+
+  def _build_function_declaration(self) -> "Tool":
     from vertexai.generative_models import FunctionDeclaration, Tool
 
     parameters = {
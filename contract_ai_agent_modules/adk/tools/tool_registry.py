@@ -0,0 +1,72 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import threading
+import types
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from contract_ai_agent_modules.adk.tools.base_tool import BaseTool
+
+
+class ToolRegistry:
+  """An immutable, name-indexed collection of tools.
+
+  Function declarations for the model are built on first use and reused for
+  the lifetime of the registry.
+  """
+
+  def __init__(self, tools: Iterable[BaseTool]):
+    self._tools: Tuple[BaseTool, ...] = tuple(tools)
+    self._by_name: Mapping[str, BaseTool] = types.MappingProxyType(
+        {tool.name: tool for tool in self._tools}
+    )
+    self._declarations: Optional[Tuple["Tool", ...]] = None
+    self._lock = threading.Lock()
+
+  @property
+  def tools(self) -> Tuple[BaseTool, ...]:
+    return self._tools
+
+  @property
+  def names(self) -> Tuple[str, ...]:
+    return tuple(self._by_name)
+
+  def get(self, name: str) -> Optional[BaseTool]:
+    """Returns the tool with the given name, or None if it is not registered."""
+    return self._by_name.get(name)
+
+  def select(self, predicate: Callable[[BaseTool], bool]) -> ToolRegistry:
+    """Returns a new registry with the tools matching the predicate."""
+    return ToolRegistry(tool for tool in self._tools if predicate(tool))
+
+  def function_declarations(self) -> List["Tool"]:
+    """Returns the Vertex AI tool declarations of every registered tool."""
+    if self._declarations is None:
+      with self._lock:
+        if self._declarations is None:
+          self._declarations = tuple(
+              tool.to_function_declaration() for tool in self._tools
+          )
+    return list(self._declarations)
+
+  def __contains__(self, name: object) -> bool:
+    return name in self._by_name
+
+  def __iter__(self) -> Iterator[BaseTool]:
+    return iter(self._tools)
+
+  def __len__(self) -> int:
+    return len(self._tools)
@@ -25,10 +25,13 @@ class ToolResult:
   Attributes:
     result: The result of the tool.
     error: The error message if the tool failed.
+    metadata: Optional facts about how the result was produced, such as the
+      timing spans of its stages under "trace".
   """
 
   result: Optional[Dict[str, Any]] = None
   error: Optional[str] = None
+  metadata: Optional[Dict[str, Any]] = None
 
   @classmethod
   def success(cls, result: Dict[str, Any]) -> ToolResult:
@@ -38,6 +41,12 @@ class ToolResult:
   def from_error(cls, error: str) -> ToolResult:
     return cls(error=error)
 
+  def with_metadata(self, **metadata) -> ToolResult:
+    """Returns a copy of the result with more metadata."""
+    return dataclasses.replace(
+        self, metadata={**(self.metadata or {}), **metadata}
+    )
+
   @property
   def is_successful(self) -> bool:
     return self.error is None
\ No newline at end of file
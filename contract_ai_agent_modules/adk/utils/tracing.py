@@ -0,0 +1,351 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-stage timing spans, grouped in traces and exported as metrics.
+
+A span times one stage, such as a model call or a BigQuery job, and carries
+sizes as attributes: tokens, bytes processed, rows. Spans are recorded into
+the trace active in the current context, so a tool called by the agent adds
+its spans to the agent's trace without either passing it around. Every span
+also feeds the process-wide `SpanMetrics`, which renders Prometheus text, and
+every finished root trace is handed to the registered exporters.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import dataclasses
+import http.server
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the Prometheus histogram buckets of span
+# durations.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "contract_ai_agent"
+# The span attributes that are sizes, summed per stage into counters.
+SIZE_ATTRIBUTES = (
+    "rows",
+    "bytes",
+    "bytes_processed",
+    "bytes_billed",
+    "pdf_bytes",
+    "pages",
+    "prompt_tokens",
+    "output_tokens",
+    "cached_tokens",
+)
+
+TraceExporter = Callable[["Trace"], None]
+
+
+@dataclasses.dataclass
+class Span:
+  """A timed stage.
+
+  Attributes:
+    name: The stage, e.g. "bigquery.job".
+    started: The `time.perf_counter()` at which the stage started.
+    seconds: The duration of the stage.
+    attributes: Sizes and other facts about the stage. The sizes of
+      `SIZE_ATTRIBUTES` are summed into the metrics.
+  """
+
+  name: str
+  started: float
+  seconds: float = 0.0
+  attributes: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+  def set(self, **attributes):
+    """Records attributes of the span. None values are ignored."""
+    self.attributes.update(
+        (key, value) for key, value in attributes.items() if value is not None
+    )
+
+
+class Trace:
+  """The spans of one request, such as a chat answer.
+
+  A trace started while another is active is its child: its spans are also
+  recorded in the parent, and only root traces are exported.
+  """
+
+  def __init__(self, name: str, parent: Optional[Trace] = None):
+    self.name = name
+    self.parent = parent
+    self.started = time.perf_counter()
+    self.seconds: Optional[float] = None
+    self._spans: List[Span] = []
+    self._lock = threading.Lock()
+
+  @property
+  def spans(self) -> List[Span]:
+    with self._lock:
+      return list(self._spans)
+
+  def add(self, span: Span):
+    with self._lock:
+      self._spans.append(span)
+    if self.parent is not None:
+      self.parent.add(span)
+
+  def record(self, span: Span):
+    """Adds a span timed by the caller and feeds it to the metrics."""
+    self.add(span)
+    get_span_metrics().observe(span)
+
+  @contextlib.contextmanager
+  def span(self, name: str, **attributes) -> Iterator[Span]:
+    """Times a stage of this trace."""
+    span = Span(name=name, started=time.perf_counter())
+    span.set(**attributes)
+    try:
+      yield span
+    except BaseException as e:
+      span.set(error=type(e).__name__)
+      raise
+    finally:
+      span.seconds = time.perf_counter() - span.started
+      self.record(span)
+
+  def finish(self):
+    """Ends the trace and exports it if it is a root trace."""
+    if self.seconds is not None:
+      return
+    self.seconds = time.perf_counter() - self.started
+    if self.parent is None:
+      for exporter in list(_exporters):
+        try:
+          exporter(self)
+        except Exception as e:
+          _LOGGER.warning("Trace exporter failed: %s", e)
+
+  def to_dict(self) -> Dict[str, Any]:
+    """Returns the trace with span offsets relative to its start."""
+    return {
+        "name": self.name,
+        "seconds": (
+            self.seconds
+            if self.seconds is not None
+            else time.perf_counter() - self.started
+        ),
+        "spans": [
+            {
+                "name": span.name,
+                "offset_seconds": span.started - self.started,
+                "seconds": span.seconds,
+                **span.attributes,
+            }
+            for span in self.spans
+        ],
+    }
+
+  def totals(self) -> Dict[str, float]:
+    """Returns the total seconds of each span name."""
+    totals: Dict[str, float] = {}
+    for span in self.spans:
+      totals[span.name] = totals.get(span.name, 0.0) + span.seconds
+    return totals
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "contract_ai_agent_trace", default=None
+)
+
+
+def current_trace() -> Optional[Trace]:
+  """Returns the trace active in the current context, if any."""
+  return _current_trace.get()
+
+
+@contextlib.contextmanager
+def activate(active_trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+  """Makes a trace the active one for the block.
+
+  Async generators must not hold this across a `yield`: each step may run in
+  a different context.
+  """
+  token = _current_trace.set(active_trace)
+  try:
+    yield active_trace
+  finally:
+    _current_trace.reset(token)
+
+
+@contextlib.contextmanager
+def trace(name: str) -> Iterator[Trace]:
+  """Starts a trace, child of the active one, for the block."""
+  new_trace = Trace(name, parent=current_trace())
+  try:
+    with activate(new_trace):
+      yield new_trace
+  finally:
+    new_trace.finish()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+  """Times a stage of the active trace, or only feeds the metrics if none is."""
+  active_trace = current_trace()
+  if active_trace is not None:
+    with active_trace.span(name, **attributes) as active_span:
+      yield active_span
+    return
+  orphan = Span(name=name, started=time.perf_counter())
+  orphan.set(**attributes)
+  try:
+    yield orphan
+  except BaseException as e:
+    orphan.set(error=type(e).__name__)
+    raise
+  finally:
+    orphan.seconds = time.perf_counter() - orphan.started
+    get_span_metrics().observe(orphan)
+
+
+class SpanMetrics:
+  """Aggregates spans into Prometheus histograms and counters.
+
+  Each span name gets a duration histogram, a count of spans that failed,
+  and a counter per size attribute, e.g. the total rows or bytes processed.
+  """
+
+  def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+    self._buckets = tuple(sorted(buckets))
+    self._histograms: Dict[str, List[float]] = {}
+    self._sums: Dict[str, float] = {}
+    self._counts: Dict[str, int] = {}
+    self._errors: Dict[str, int] = {}
+    self._attribute_totals: Dict[Tuple[str, str], float] = {}
+    self._lock = threading.Lock()
+
+  def observe(self, observed: Span):
+    with self._lock:
+      histogram = self._histograms.setdefault(observed.name, [0] * len(self._buckets))
+      for i, bound in enumerate(self._buckets):
+        if observed.seconds <= bound:
+          histogram[i] += 1
+      self._sums[observed.name] = self._sums.get(observed.name, 0.0) + observed.seconds
+      self._counts[observed.name] = self._counts.get(observed.name, 0) + 1
+      if "error" in observed.attributes:
+        self._errors[observed.name] = self._errors.get(observed.name, 0) + 1
+      for key in SIZE_ATTRIBUTES:
+        value = observed.attributes.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+          total_key = (observed.name, key)
+          self._attribute_totals[total_key] = self._attribute_totals.get(total_key, 0.0) + value
+
+  def to_prometheus_text(self) -> str:
+    """Renders the metrics in the Prometheus text exposition format."""
+    seconds = f"{METRIC_PREFIX}_span_seconds"
+    errors = f"{METRIC_PREFIX}_span_errors_total"
+    lines = [
+        f"# HELP {seconds} Duration of each instrumented stage.",
+        f"# TYPE {seconds} histogram",
+    ]
+    with self._lock:
+      for name in sorted(self._histograms):
+        label = f'span="{_escape(name)}"'
+        for bound, count in zip(self._buckets, self._histograms[name]):
+          lines.append(f'{seconds}_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f'{seconds}_bucket{{{label},le="+Inf"}} {self._counts[name]}')
+        lines.append(f"{seconds}_sum{{{label}}} {self._sums[name]}")
+        lines.append(f"{seconds}_count{{{label}}} {self._counts[name]}")
+      lines.append(f"# HELP {errors} Instrumented stages that raised.")
+      lines.append(f"# TYPE {errors} counter")
+      for name in sorted(self._errors):
+        lines.append(f'{errors}{{span="{_escape(name)}"}} {self._errors[name]}')
+      attribute = f"{METRIC_PREFIX}_span_attribute_total"
+      lines.append(f"# HELP {attribute} Sum of a size, such as rows or bytes, over the spans of a stage.")
+      lines.append(f"# TYPE {attribute} counter")
+      for (name, key), total in sorted(self._attribute_totals.items()):
+        lines.append(f'{attribute}{{span="{_escape(name)}",attribute="{_escape(key)}"}} {total}')
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+  return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_span_metrics: Optional[SpanMetrics] = None
+_span_metrics_lock = threading.Lock()
+_exporters: List[TraceExporter] = []
+
+
+def get_span_metrics() -> SpanMetrics:
+  """Returns the process-wide span metrics."""
+  global _span_metrics
+  with _span_metrics_lock:
+    if _span_metrics is None:
+      _span_metrics = SpanMetrics()
+    return _span_metrics
+
+
+def add_trace_exporter(exporter: TraceExporter):
+  """Registers a function called with every finished root trace."""
+  if exporter not in _exporters:
+    _exporters.append(exporter)
+
+
+def remove_trace_exporter(exporter: TraceExporter):
+  if exporter in _exporters:
+    _exporters.remove(exporter)
+
+
+def log_trace_exporter(finished_trace: Trace):
+  """Logs a finished trace as one JSON line."""
+  _LOGGER.info("trace %s", json.dumps(finished_trace.to_dict(), default=str))
+
+
+_metrics_server: Optional[http.server.ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> http.server.ThreadingHTTPServer:
+  """Serves the span metrics as Prometheus text on /metrics.
+
+  The server runs on a daemon thread and is started once per process; later
+  calls return it.
+  """
+  global _metrics_server
+  with _metrics_server_lock:
+    if _metrics_server is None:
+
+      class MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+        def do_GET(self):
+          if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+          body = get_span_metrics().to_prometheus_text().encode("utf-8")
+          self.send_response(200)
+          self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+          self.send_header("Content-Length", str(len(body)))
+          self.end_headers()
+          self.wfile.write(body)
+
+        def log_message(self, format, *args):
+          pass
+
+      _metrics_server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+      threading.Thread(
+          target=_metrics_server.serve_forever, name="metrics-server", daemon=True
+      ).start()
+    return _metrics_server
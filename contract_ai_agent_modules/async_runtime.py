@@ -0,0 +1,164 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the long-lived asyncio runtime of the application."""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_SHUTDOWN_TIMEOUT_SECONDS = 5.0
+
+
+class AsyncRuntime:
+    """An asyncio event loop running for the life of the process on its own thread.
+
+    Streamlit runs the script synchronously, once per interaction, so each
+    `asyncio.run` used to create and close a loop. Async resources bound to a
+    loop, like the agent's clients, sessions and semaphores, could then not be
+    reused by the next request. Coroutines submitted here all run on the same
+    loop, from any thread and any session.
+    """
+
+    def __init__(self, name: str = "contract-ai-agent-async"):
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The event loop, started on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._start()
+            return self._loop
+
+    def submit(self, coroutine: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """Schedules a coroutine on the loop and returns a future of its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Runs a coroutine on the loop and waits for its result.
+
+        Args:
+            coroutine: The coroutine to run.
+            timeout: The maximum number of seconds to wait. On timeout, the
+                coroutine is cancelled and `TimeoutError` is raised.
+
+        Returns:
+            The result of the coroutine.
+        """
+        self._check_not_on_loop()
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Coroutine did not finish within {timeout} seconds")
+
+    def iterate(self, iterator: AsyncIterator[T], timeout: Optional[float] = None) -> Iterator[T]:
+        """Consumes an async iterator on the loop, yielding its items to the caller.
+
+        Each item is handed back to the calling thread as soon as it arrives,
+        so the caller can render it before the next one is fetched. If the
+        caller stops early, the iterator is closed on the loop.
+
+        Args:
+            iterator: The async iterator.
+            timeout: The maximum number of seconds to wait for each item.
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(iterator.__anext__(), timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None and not self._on_loop():
+                self.run(aclose(), timeout)
+
+    def shutdown(self, timeout: float = DEFAULT_SHUTDOWN_TIMEOUT_SECONDS):
+        """Cancels pending tasks, stops the loop and joins its thread.
+
+        The runtime starts again if it is used afterwards.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        if loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_cancel_pending_tasks(), loop).result(timeout)
+            except Exception:
+                pass
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(loop, ready), name=self._name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+                loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                loop.close()
+
+    def _on_loop(self) -> bool:
+        return self._thread is not None and self._thread is threading.current_thread()
+
+    def _check_not_on_loop(self):
+        if self._on_loop():
+            raise RuntimeError("Cannot wait for the async runtime from its own loop; await the coroutine instead")
+
+
+async def _cancel_pending_tasks():
+    current = asyncio.current_task()
+    tasks = [task for task in asyncio.all_tasks() if task is not current]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+_async_runtime: Optional[AsyncRuntime] = None
+_async_runtime_lock = threading.Lock()
+
+
+def get_async_runtime() -> AsyncRuntime:
+    """Returns the process-wide async runtime, shut down on process exit."""
+    global _async_runtime
+    with _async_runtime_lock:
+        if _async_runtime is None:
+            _async_runtime = AsyncRuntime()
+            atexit.register(_async_runtime.shutdown)
+        return _async_runtime
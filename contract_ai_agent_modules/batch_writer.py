@@ -0,0 +1,419 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the buffered batch writer for BigQuery inserts."""
+
+import atexit
+import dataclasses
+import io
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from google.cloud import bigquery
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_ROWS = 500
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_LATENCY_SECONDS = 5.0
+DEFAULT_LOAD_JOB_MIN_ROWS = 1000
+DEFAULT_LOAD_JOB_MIN_BYTES = 4 * 1024 * 1024
+DEFAULT_MAX_ROW_ATTEMPTS = 3
+
+# Rows sent per streaming insert request, well below the API limits.
+STREAMING_CHUNK_ROWS = 500
+
+METHOD_STREAMING = "streaming"
+METHOD_LOAD_JOB = "load_job"
+
+_LOAD_COMMITTED = "committed"
+_LOAD_FAILED = "failed"
+_LOAD_UNKNOWN = "unknown"
+
+
+@dataclasses.dataclass(frozen=True)
+class RowError:
+    """A row that could not be written.
+
+    Attributes:
+        table_id: The table the row was written to.
+        row_id: The ID of the row, also used as its streaming insert ID.
+        row: The row.
+        errors: The errors reported for the last attempt.
+    """
+
+    table_id: str
+    row_id: str
+    row: Dict[str, Any]
+    errors: List[Any]
+
+
+@dataclasses.dataclass(frozen=True)
+class FlushResult:
+    """The outcome of writing one batch of a table.
+
+    Attributes:
+        table_id: The table the batch was written to.
+        method: How the batch was written, "streaming" or "load_job".
+        row_ids: The IDs of the rows that were written.
+        errors: The rows that could not be written.
+        seconds: How long the write took.
+    """
+
+    table_id: str
+    method: str
+    row_ids: List[str]
+    errors: List[RowError]
+    seconds: float
+
+
+@dataclasses.dataclass(frozen=True)
+class _BufferedRow:
+    row: Dict[str, Any]
+    row_id: str
+    size_bytes: int
+
+
+class _TableBuffer:
+
+    def __init__(self):
+        self.rows: List[_BufferedRow] = []
+        self.size_bytes = 0
+        self.oldest_at: Optional[float] = None
+
+
+class BufferedBatchWriter:
+    """Accumulates rows per table and writes them to BigQuery in batches.
+
+    A table's buffer is flushed when it holds `max_rows` rows or `max_bytes`
+    bytes of JSON, or when its oldest row has waited `max_latency_seconds`.
+    Large batches are written with a load job from newline-delimited JSON, which
+    is free and not subject to streaming quotas. Smaller batches, and batches
+    whose load job finished with an error, use streaming inserts. A load job
+    whose outcome cannot be determined is reported rather than streamed, so its
+    rows are never written twice. A streaming request that raises is retried
+    whole with backoff. Invalid rows are reported as `RowError`s at once. Rows
+    stopped because another row of their request was invalid are sent again
+    together, and rows that failed transiently on their own are retried one by
+    one with backoff; rows that still fail are reported too. Every row has an
+    insert ID, so retries do not duplicate rows.
+
+    Buffered rows are written on `close()`, which also runs at interpreter exit,
+    so no rows are lost on shutdown.
+    """
+
+    def __init__(
+        self,
+        client: bigquery.Client,
+        dataset_id: str,
+        max_rows: int = DEFAULT_MAX_ROWS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_latency_seconds: Optional[float] = DEFAULT_MAX_LATENCY_SECONDS,
+        load_job_min_rows: int = DEFAULT_LOAD_JOB_MIN_ROWS,
+        load_job_min_bytes: int = DEFAULT_LOAD_JOB_MIN_BYTES,
+        max_row_attempts: int = DEFAULT_MAX_ROW_ATTEMPTS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initializes the writer.
+
+        Args:
+            client: The BigQuery client.
+            dataset_id: The dataset containing the tables.
+            max_rows: Flush a table once it buffers this many rows.
+            max_bytes: Flush a table once its buffered rows reach this size.
+            max_latency_seconds: Flush a table once its oldest row has waited
+                this long. A background thread enforces it between writes. None
+                disables time-based flushing.
+            load_job_min_rows: Write batches of at least this many rows with a
+                load job.
+            load_job_min_bytes: Write batches of at least this size with a load
+                job.
+            max_row_attempts: Attempts per streaming request, and per row, before
+                its rows are reported as failed.
+            clock: The monotonic clock used to age buffered rows.
+        """
+        self._client = client
+        self._dataset_id = dataset_id
+        self._max_rows = max_rows
+        self._max_bytes = max_bytes
+        self._max_latency_seconds = max_latency_seconds
+        self._load_job_min_rows = load_job_min_rows
+        self._load_job_min_bytes = load_job_min_bytes
+        self._max_row_attempts = max_row_attempts
+        self._clock = clock
+        self._buffers: Dict[str, _TableBuffer] = {}
+        self._errors: List[RowError] = []
+        self._listeners: List[Callable[[FlushResult], None]] = []
+        self._lock = threading.Lock()
+        # Serializes writes, so close() waits for a background flush in flight.
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._stop = threading.Event()
+        self._flusher = None
+        if max_latency_seconds:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="bigquery-batch-writer", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    @property
+    def errors(self) -> List[RowError]:
+        """The rows that could not be written so far."""
+        with self._lock:
+            return list(self._errors)
+
+    def add_listener(self, listener: Callable[[FlushResult], None]):
+        """Registers a function called with the result of every flush."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[FlushResult], None]):
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def add(self, table_id: str, row: Dict[str, Any], row_id: Optional[str] = None) -> List[FlushResult]:
+        """Buffers a row, flushing the table if it is full.
+
+        Args:
+            table_id: The table to write the row to.
+            row: The row.
+            row_id: The ID of the row. A stable ID, e.g. derived from the source
+                document, also deduplicates rows across runs. Defaults to a
+                random ID.
+
+        Returns:
+            The results of the flushes triggered by the row, if any.
+        """
+        return self.add_rows(table_id, [row], [row_id] if row_id else None)
+
+    def add_rows(
+        self, table_id: str, rows: List[Dict[str, Any]], row_ids: Optional[List[Optional[str]]] = None
+    ) -> List[FlushResult]:
+        """Buffers rows, flushing the table if it is full.
+
+        The limits are checked after all rows were added, so a large list is
+        written as a single batch.
+        """
+        if self._closed:
+            raise RuntimeError("The batch writer is closed.")
+        with self._lock:
+            buffer = self._buffers.setdefault(table_id, _TableBuffer())
+            if buffer.oldest_at is None:
+                buffer.oldest_at = self._clock()
+            for i, row in enumerate(rows):
+                row_id = (row_ids[i] if row_ids else None) or uuid.uuid4().hex
+                size_bytes = len(json.dumps(row, default=str))
+                buffer.rows.append(_BufferedRow(row=row, row_id=row_id, size_bytes=size_bytes))
+                buffer.size_bytes += size_bytes
+            full = len(buffer.rows) >= self._max_rows or buffer.size_bytes >= self._max_bytes
+        if full:
+            return self.flush(table_id)
+        return []
+
+    def flush(self, table_id: Optional[str] = None) -> List[FlushResult]:
+        """Writes the buffered rows of a table, or of every table if not set."""
+        with self._write_lock:
+            with self._lock:
+                table_ids = [table_id] if table_id else list(self._buffers)
+                batches = [(table, self._buffers.pop(table, None)) for table in table_ids]
+            return [self._write(table, buffer.rows) for table, buffer in batches if buffer and buffer.rows]
+
+    def close(self) -> List[FlushResult]:
+        """Stops the background flusher and writes every buffered row."""
+        if self._closed:
+            return []
+        self._closed = True
+        atexit.unregister(self.close)
+        self._stop.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        return self.flush()
+
+    def __enter__(self) -> "BufferedBatchWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _flush_periodically(self):
+        interval = max(self._max_latency_seconds / 2, 0.05)
+        while not self._stop.wait(interval):
+            now = self._clock()
+            with self._lock:
+                stale = [
+                    table_id
+                    for table_id, buffer in self._buffers.items()
+                    if buffer.oldest_at is not None and now - buffer.oldest_at >= self._max_latency_seconds
+                ]
+            for table_id in stale:
+                try:
+                    self.flush(table_id)
+                except Exception as e:
+                    _LOGGER.error("Background flush of %s failed: %s", table_id, e)
+
+    def _write(self, table_id: str, rows: List[_BufferedRow]) -> FlushResult:
+        started = time.perf_counter()
+        table = f"{self._client.project}.{self._dataset_id}.{table_id}"
+        size_bytes = sum(row.size_bytes for row in rows)
+        method = METHOD_STREAMING
+        row_errors = None
+        if len(rows) >= self._load_job_min_rows or size_bytes >= self._load_job_min_bytes:
+            job = None
+            try:
+                job = self._start_load(table, rows)
+                job.result()
+                method = METHOD_LOAD_JOB
+                row_errors = []
+            except Exception as e:
+                # Streaming insert IDs do not deduplicate against a load job, so
+                # the rows are only streamed once the job is known to have failed.
+                state = self._load_state(job)
+                if state == _LOAD_COMMITTED:
+                    method = METHOD_LOAD_JOB
+                    row_errors = []
+                elif state == _LOAD_FAILED:
+                    _LOGGER.warning("Load job into %s failed, falling back to streaming inserts: %s", table, e)
+                else:
+                    method = METHOD_LOAD_JOB
+                    _LOGGER.error("Load job into %s did not finish, its rows are not written again: %s", table, e)
+                    row_errors = [
+                        RowError(
+                            table_id=table_id,
+                            row_id=row.row_id,
+                            row=row.row,
+                            errors=[f"Load job {getattr(job, 'job_id', None)} did not finish: {e}"],
+                        )
+                        for row in rows
+                    ]
+        if row_errors is None:
+            row_errors = self._stream(table_id, table, rows)
+
+        failed_ids = {error.row_id for error in row_errors}
+        result = FlushResult(
+            table_id=table_id,
+            method=method,
+            row_ids=[row.row_id for row in rows if row.row_id not in failed_ids],
+            errors=row_errors,
+            seconds=time.perf_counter() - started,
+        )
+        with self._lock:
+            self._errors.extend(row_errors)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(result)
+        return result
+
+    def _start_load(self, table: str, rows: List[_BufferedRow]):
+        payload = "\n".join(json.dumps(row.row, default=str) for row in rows).encode("utf-8")
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        return self._client.load_table_from_file(io.BytesIO(payload), table, job_config=job_config)
+
+    def _load_state(self, job) -> str:
+        """Returns whether a load job that raised committed, failed or is unknown."""
+        if job is None:
+            # The upload itself failed, so no job was created.
+            return _LOAD_FAILED
+        try:
+            job.reload()
+            if job.state != "DONE":
+                # e.g. polling timed out while the job was still running.
+                job.result()
+        except Exception as e:
+            if getattr(job, "state", None) != "DONE":
+                _LOGGER.warning("Could not get the state of load job %s: %s", getattr(job, "job_id", None), e)
+                return _LOAD_UNKNOWN
+        if job.state != "DONE":
+            return _LOAD_UNKNOWN
+        return _LOAD_FAILED if job.error_result else _LOAD_COMMITTED
+
+    def _stream(self, table_id: str, table: str, rows: List[_BufferedRow]) -> List[RowError]:
+        row_errors = []
+        transient = []
+        stopped = []
+        pending = rows
+        for _ in range(self._max_row_attempts):
+            stopped = []
+            for start in range(0, len(pending), STREAMING_CHUNK_ROWS):
+                chunk = pending[start:start + STREAMING_CHUNK_ROWS]
+                try:
+                    errors = self._insert_chunk(table, chunk)
+                except Exception as e:
+                    row_errors.extend(
+                        RowError(table_id=table_id, row_id=row.row_id, row=row.row, errors=[str(e)]) for row in chunk
+                    )
+                    continue
+                for error in errors:
+                    row = chunk[error["index"]]
+                    reasons = {item.get("reason") for item in error.get("errors", [])}
+                    if "invalid" in reasons:
+                        # Retrying cannot fix the row itself.
+                        row_errors.append(
+                            RowError(table_id=table_id, row_id=row.row_id, row=row.row, errors=error.get("errors", []))
+                        )
+                    elif reasons == {"stopped"}:
+                        # Rejected only because another row of the request was
+                        # invalid, so it is sent again at once.
+                        stopped.append((row, error["errors"]))
+                    else:
+                        transient.append((row, error.get("errors", [])))
+            pending = [row for row, _ in stopped]
+            if not pending:
+                break
+        row_errors.extend(
+            RowError(table_id=table_id, row_id=row.row_id, row=row.row, errors=errors) for row, errors in stopped
+        )
+
+        # Rows that failed on their own are retried one by one with exponential
+        # backoff.
+        for row, errors in transient:
+            for attempt in range(1, self._max_row_attempts):
+                time.sleep(_backoff_seconds(attempt))
+                try:
+                    retry_errors = self._client.insert_rows_json(table, [row.row], row_ids=[row.row_id])
+                except Exception as e:
+                    errors = [str(e)]
+                    continue
+                if not retry_errors:
+                    errors = None
+                    break
+                errors = retry_errors[0].get("errors", [])
+            if errors is not None:
+                row_errors.append(RowError(table_id=table_id, row_id=row.row_id, row=row.row, errors=errors))
+        return row_errors
+
+    def _insert_chunk(self, table: str, chunk: List[_BufferedRow]) -> List[Dict[str, Any]]:
+        """Streams a chunk, retrying the whole request with backoff when it raises.
+
+        The insert IDs make a retried request idempotent.
+        """
+        for attempt in range(1, self._max_row_attempts + 1):
+            try:
+                return self._client.insert_rows_json(
+                    table, [row.row for row in chunk], row_ids=[row.row_id for row in chunk]
+                )
+            except Exception as e:
+                if attempt == self._max_row_attempts:
+                    raise
+                _LOGGER.warning("Streaming insert into %s failed, retrying: %s", table, e)
+                time.sleep(_backoff_seconds(attempt))
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return min(0.5 * 2 ** (attempt - 1), 8.0)
@@ -14,30 +14,251 @@
 
 """This file contains the BigQuery client for the application."""
 
+import dataclasses
+import datetime
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
 from google.cloud import bigquery
 import pandas as pd
+import pyarrow as pa
 import re
 
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.client_pool import get_client_pool
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.result_cache import get_result_cache
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.schema_catalog import get_schema_catalog
+from contract_ai_agent_modules.adk.utils import tracing
+from contract_ai_agent_modules.batch_writer import BufferedBatchWriter
+import contract_ai_agent_modules.queries as queries
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CONTRACTS_PAGE_SIZE = 50
+
+# Called with the dataset, the table and the rows of every successful insert.
+InsertListener = Callable[[str, str, List[Dict[str, Any]]], None]
+
+
+@dataclasses.dataclass
+class ContractsPage:
+    """A page of the contracts list.
+
+    Attributes:
+        rows: The contracts of the page.
+        next_cursor: The cursor of the next page, or None if this is the last.
+    """
+
+    rows: pd.DataFrame
+    next_cursor: Optional[Tuple[Any, ...]] = None
+
 class BigQueryClient:
     """A client for interacting with BigQuery."""
 
-    def __init__(self, project_id: str, dataset_id: str):
-        """Initializes the BigQuery client."""
-        self.client = bigquery.Client(project=project_id)
+    def __init__(self, project_id: str, dataset_id: str, location: Optional[str] = None):
+        """Initializes the BigQuery client from the shared client pool."""
+        self.client = get_client_pool().get_client(project_id, location)
         self.dataset_id = dataset_id
 
     def query_to_dataframe(self, query: str) -> pd.DataFrame:
         """Executes a query and returns the results as a Pandas DataFrame."""
         try:
-            query_job = self.client.query(query)
-            return query_job.to_dataframe()
+            return self._run_query("bigquery_client.query", query)
         except Exception as e:
             print(f"Error executing query: {e}")
             return pd.DataFrame()
 
+    def query_to_arrow(self, query: str) -> pa.Table:
+        """Executes a query and returns the results as a PyArrow Table.
+
+        Results are downloaded with the BigQuery Storage Read API when it is
+        installed, and can be handed to `st.dataframe` without building a
+        DataFrame first.
+        """
+        try:
+            return self._run_query("bigquery_client.query", query, arrow=True)
+        except Exception as e:
+            print(f"Error executing query: {e}")
+            return pa.table({})
+
+    def list_contracts(
+        self,
+        search_term: str = "",
+        company: Optional[str] = None,
+        business_unit: Optional[str] = None,
+        page_size: int = DEFAULT_CONTRACTS_PAGE_SIZE,
+        order_by: str = "contract_id",
+        cursor: Optional[Tuple[Any, ...]] = None,
+    ) -> ContractsPage:
+        """Returns one page of the contracts matching a search and filters.
+
+        Only the summary columns of `queries.CONTRACT_SUMMARY_COLUMNS` are
+        read. Filtering runs in BigQuery and the filters are sent as query
+        parameters. Pages are keyset-paginated: each page starts after the sort
+        key of the last row of the previous one, so fetching a page costs the
+        same however deep it is and rows inserted meanwhile are not skipped.
+
+        Args:
+            search_term: Matched, case-insensitively and literally, against
+                the listed columns. Empty matches all contracts.
+            company: Only list contracts of this company. None lists all.
+            business_unit: Only list contracts of this business unit. None
+                lists all.
+            page_size: The maximum number of contracts of the page.
+            order_by: "contract_id", ascending, or "start_date", newest first.
+            cursor: The `next_cursor` of the previous page, or None for the
+                first page.
+
+        Returns:
+            The page.
+        """
+        if order_by not in queries.CONTRACTS_PAGE_ORDERINGS:
+            raise ValueError(f"Unknown contracts ordering: {order_by}")
+        search_term = search_term.strip()
+        query = queries.get_contracts_page_query(
+            order_by=order_by,
+            search=bool(search_term),
+            company=company is not None,
+            business_unit=business_unit is not None,
+            after=cursor is not None,
+        )
+        # One more row than the page tells whether there is a next page.
+        parameters = [bigquery.ScalarQueryParameter("page_size", "INT64", page_size + 1)]
+        if search_term:
+            parameters.append(bigquery.ScalarQueryParameter("search_term", "STRING", search_term))
+        if company is not None:
+            parameters.append(bigquery.ScalarQueryParameter("company", "STRING", company))
+        if business_unit is not None:
+            parameters.append(bigquery.ScalarQueryParameter("business_unit", "STRING", business_unit))
+        _, keys = queries.CONTRACTS_PAGE_ORDERINGS[order_by]
+        if cursor is not None:
+            for i, ((_, _, parameter_type), value) in enumerate(zip(keys, cursor)):
+                parameters.append(bigquery.ScalarQueryParameter(f"after_{i}", parameter_type, value))
+
+        try:
+            job_config = bigquery.QueryJobConfig(query_parameters=parameters)
+            rows = self._run_query("bigquery_client.list_contracts", query, job_config)
+        except Exception as e:
+            print(f"Error executing query: {e}")
+            return ContractsPage(rows=pd.DataFrame())
+
+        if len(rows) <= page_size:
+            return ContractsPage(rows=rows)
+        rows = rows.iloc[:page_size]
+        last = rows.iloc[-1]
+        next_cursor = tuple(_cursor_value(last[column], parameter_type) for _, column, parameter_type in keys)
+        return ContractsPage(rows=rows, next_cursor=next_cursor)
+
+    def get_contract_details(self, contract_ids: List[str]) -> Dict[str, dict]:
+        """Returns the long text and JSON columns of some contracts.
+
+        Args:
+            contract_ids: The contracts to read.
+
+        Returns:
+            The columns of `queries.CONTRACT_DETAIL_COLUMNS` by contract_id.
+            Contracts that do not exist are missing.
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ArrayQueryParameter("contract_ids", "STRING", list(contract_ids))]
+        )
+        try:
+            details_df = self._run_query(
+                "bigquery_client.contract_details", queries.CONTRACT_DETAILS_QUERY, job_config
+            )
+        except Exception as e:
+            print(f"Error executing query: {e}")
+            return {}
+        return {row.pop("contract_id"): row for row in details_df.to_dict(orient="records")}
+
+    def _run_query(
+        self,
+        span_name: str,
+        query: str,
+        job_config: Optional[bigquery.QueryJobConfig] = None,
+        arrow: bool = False,
+    ):
+        """Runs a query and downloads its results, as a span of the active trace.
+
+        The span records the rows returned and the bytes the job processed.
+        """
+        with tracing.span(span_name) as span:
+            query_job = self.client.query(query, job_config=job_config)
+            if arrow:
+                results = query_job.to_arrow(create_bqstorage_client=True)
+                span.set(rows=results.num_rows)
+            else:
+                results = query_job.to_dataframe()
+                span.set(rows=len(results))
+            span.set(bytes_processed=query_job.total_bytes_processed)
+        return results
+
+    def dry_run_bytes(self, query: str, query_parameters: Optional[list] = None) -> int:
+        """Returns the bytes a query would process, without running it."""
+        job_config = bigquery.QueryJobConfig(
+            dry_run=True, use_query_cache=False, query_parameters=query_parameters or []
+        )
+        return self.client.query(query, job_config=job_config).total_bytes_processed
+
+    def contract_filter_options(self) -> Dict[str, List[str]]:
+        """Returns the distinct companies and business units of the contracts.
+
+        The query reads only these two columns, so it is cheap enough to run
+        on demand and cache.
+        """
+        options_df = self.query_to_dataframe(queries.CONTRACT_FILTER_OPTIONS_QUERY)
+        options = {}
+        for column in ("company", "business_unit"):
+            values = options_df[column].dropna().unique() if column in options_df else []
+            options[column] = sorted(values)
+        return options
+
     def insert_row(self, table_id: str, row: dict):
         """Inserts a row into the specified table."""
         table_ref = self.client.dataset(self.dataset_id).table(table_id)
         errors = self.client.insert_rows_json(table_ref, [row])
         if errors:
-            raise Exception(f"Errors inserting row: {errors}")
\ No newline at end of file
+            raise Exception(f"Errors inserting row: {errors}")
+        # Streaming inserts do not change the table's modified time, so cached
+        # query results and the catalog's view of the table are dropped here.
+        get_result_cache().invalidate_table(f"{self.dataset_id}.{table_id}")
+        get_schema_catalog().invalidate(self.dataset_id, table_id)
+        for listener in list(_insert_listeners):
+            try:
+                listener(self.dataset_id, table_id, [row])
+            except Exception as e:
+                _LOGGER.warning("Insert listener failed: %s", e)
+
+    def batch_writer(self, **kwargs) -> BufferedBatchWriter:
+        """Returns a buffered writer for inserting many rows into this dataset.
+
+        Keyword arguments are passed to `BufferedBatchWriter`.
+        """
+        return BufferedBatchWriter(self.client, self.dataset_id, **kwargs)
+
+
+_insert_listeners: List[InsertListener] = []
+
+
+def add_insert_listener(listener: InsertListener):
+    """Registers a function called after every row inserted with `insert_row`.
+
+    Listeners are shared by every `BigQueryClient`, since the app creates one
+    per rerun.
+    """
+    if listener not in _insert_listeners:
+        _insert_listeners.append(listener)
+
+
+def remove_insert_listener(listener: InsertListener):
+    if listener in _insert_listeners:
+        _insert_listeners.remove(listener)
+
+
+def _cursor_value(value, parameter_type: str):
+    """Converts a value of the last row of a page to a cursor parameter."""
+    if parameter_type == "DATE":
+        if value is None or pd.isna(value):
+            # Matches the IFNULL of the ordering.
+            return datetime.date.min
+        return pd.Timestamp(value).date()
+    return value
@@ -0,0 +1,444 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the bulk import of contract PDFs into BigQuery.
+
+Contracts are read from a directory or a manifest, extracted with the
+`DocumentProcessingTool` with a bounded number of documents in flight, and
+written to BigQuery in batches by a `BufferedBatchWriter`. Every document's outcome is appended to a
+journal, so an interrupted import can be resumed without extracting the
+documents that were already imported.
+
+Usage:
+    python -m contract_ai_agent_modules.bulk_import /path/to/contracts \\
+        --project-id my-project --journal import_journal.jsonl
+"""
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+import datetime
+import functools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from google.api_core import exceptions as api_exceptions
+
+from contract_ai_agent_modules.batch_writer import BufferedBatchWriter, FlushResult
+from contract_ai_agent_modules.gcs_uploads import DEFAULT_BUCKET_NAME, upload_contract
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_ATTEMPTS = 5
+
+STATUS_IMPORTED = "imported"
+STATUS_FAILED = "failed"
+
+# Errors worth retrying: quota exhaustion, overloaded or unavailable backends
+# and timeouts. Anything else, e.g. a response that is not valid JSON, fails
+# the document straight away.
+TRANSIENT_ERRORS = (
+    api_exceptions.TooManyRequests,
+    api_exceptions.InternalServerError,
+    api_exceptions.BadGateway,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.GatewayTimeout,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.Aborted,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+def discover_documents(source: str) -> List[str]:
+    """Lists the contract PDFs to import.
+
+    Args:
+        source: A directory, searched recursively for PDF files, or a manifest
+            file with one PDF path per line. Blank lines and lines starting with
+            "#" are ignored, and relative paths are resolved against the
+            manifest's directory.
+
+    Returns:
+        The absolute paths of the documents, in a stable order.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+        return sorted(os.path.abspath(path) for path in paths)
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(os.path.abspath(os.path.join(base_dir, line)))
+    return paths
+
+
+class ImportJournal:
+    """An append-only JSONL record of each document's import outcome.
+
+    Only the latest entry of a document counts, so a document that failed and
+    was imported on a later run is considered imported.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def imported_paths(self) -> Set[str]:
+        """Returns the documents whose latest entry says they were imported."""
+        latest = {}
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted run.
+                    continue
+                latest[entry["path"]] = entry["status"]
+        return {path for path, status in latest.items() if status == STATUS_IMPORTED}
+
+    def record(self, path: str, status: str, **fields: Any):
+        """Appends the outcome of a document to the journal."""
+        entry = {
+            "path": path,
+            "status": status,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            **fields,
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+
+
+class LocalTable:
+    """A stand-in for `bigquery.Client` that appends written rows to a JSONL file.
+
+    It implements the calls `BufferedBatchWriter` makes, so imports can be tried
+    out without writing to BigQuery.
+    """
+
+    project = "local"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def insert_rows_json(self, table: str, json_rows: list, row_ids: Optional[list] = None) -> list:
+        self._append(table, json_rows)
+        return []
+
+    def load_table_from_file(self, file_obj, table: str, job_config=None):
+        self._append(table, [json.loads(line) for line in file_obj.read().splitlines() if line])
+        return _CompletedJob()
+
+    def _append(self, table: str, rows: list):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({"table": table, **row}, default=str) + "\n")
+
+
+class _CompletedJob:
+
+    def result(self):
+        return self
+
+
+@dataclasses.dataclass
+class ImportReport:
+    """The outcome of a bulk import.
+
+    Attributes:
+        total: The number of documents in the source.
+        imported: Documents written to the table in this run.
+        failed: Documents that could not be extracted or written.
+        skipped: Documents already imported by a previous run.
+        retries: Extraction attempts retried after a transient error.
+        elapsed_seconds: The wall-clock duration of the run.
+        stage_seconds: The total time spent in each stage, summed over
+            documents. Because documents are processed concurrently, the sum
+            can exceed the elapsed time.
+        stage_counts: How many times each stage ran.
+    """
+
+    total: int = 0
+    imported: int = 0
+    failed: int = 0
+    skipped: int = 0
+    retries: int = 0
+    elapsed_seconds: float = 0.0
+    stage_seconds: Dict[str, float] = dataclasses.field(default_factory=lambda: collections.defaultdict(float))
+    stage_counts: Dict[str, int] = dataclasses.field(default_factory=lambda: collections.defaultdict(int))
+
+    @property
+    def documents_per_minute(self) -> float:
+        """The number of documents imported per minute of wall-clock time."""
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.imported * 60.0 / self.elapsed_seconds
+
+    def add_stage_time(self, stage: str, seconds: float):
+        self.stage_seconds[stage] += seconds
+        self.stage_counts[stage] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the report as a JSON-serializable dictionary."""
+        return {
+            "total": self.total,
+            "imported": self.imported,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "documents_per_minute": round(self.documents_per_minute, 2),
+            "stages": {
+                stage: {
+                    "total_seconds": round(seconds, 3),
+                    "mean_seconds": round(seconds / self.stage_counts[stage], 3),
+                    "count": self.stage_counts[stage],
+                }
+                for stage, seconds in self.stage_seconds.items()
+            },
+        }
+
+
+class BulkImporter:
+    """Extracts contract PDFs concurrently and writes them in batches.
+
+    At most `concurrency` documents are read and extracted at a time. Transient
+    model errors are retried with exponential backoff and jitter. Extracted rows
+    go to a `BufferedBatchWriter`, and a document is journaled as imported only
+    once the batch holding its row was written.
+    """
+
+    def __init__(
+        self,
+        extractor,
+        writer: BufferedBatchWriter,
+        journal: Optional[ImportJournal] = None,
+        table_id: str = "contracts",
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        upload: Optional[Callable[[bytes, str], str]] = None,
+    ):
+        """Initializes the importer.
+
+        Args:
+            extractor: Has an async `extract(pdf_content)` method returning the
+                row of a contract, like `DocumentProcessingTool`.
+            writer: Writes the extracted rows. Its row IDs are the document
+                paths, so a retried write never duplicates a contract.
+            journal: Records outcomes and is used to skip imported documents.
+            table_id: The table the rows are written to.
+            concurrency: The maximum number of documents extracted at a time.
+            max_attempts: The maximum number of extraction attempts per document.
+            initial_backoff: The delay before the first retry, in seconds.
+            max_backoff: The maximum delay between retries, in seconds.
+            sleep: The coroutine used to wait between retries.
+            upload: Uploads a PDF under an object name and returns its gs://
+                URI, like `gcs_uploads.upload_contract`. The URI is stored as
+                the contract's ocr_text_ref. Without it, ocr_text_ref is left
+                empty unless the model returned a gs:// URI.
+        """
+        self._extractor = extractor
+        self._writer = writer
+        self._journal = journal
+        self._table_id = table_id
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._sleep = sleep
+        self._upload = upload
+        # Flush results arrive on the writer's background thread too.
+        self._lock = threading.Lock()
+
+    async def run(self, paths: Iterable[str]) -> ImportReport:
+        """Imports the given documents.
+
+        Args:
+            paths: The paths of the contract PDFs.
+
+        Returns:
+            The import report.
+        """
+        paths = list(paths)
+        report = ImportReport(total=len(paths))
+        done = self._journal.imported_paths() if self._journal else set()
+        pending_paths = [path for path in paths if path not in done]
+        report.skipped = len(paths) - len(pending_paths)
+
+        semaphore = asyncio.Semaphore(self._concurrency)
+        contract_ids = {}
+
+        def on_flush(result: FlushResult):
+            if result.table_id != self._table_id:
+                return
+            with self._lock:
+                report.add_stage_time("write", result.seconds)
+                report.imported += len(result.row_ids)
+                report.failed += len(result.errors)
+                for path in result.row_ids:
+                    self._record(path, STATUS_IMPORTED, contract_id=contract_ids.pop(path, None))
+                for error in result.errors:
+                    contract_ids.pop(error.row_id, None)
+                    self._record(error.row_id, STATUS_FAILED, stage="write", error=str(error.errors))
+
+        async def process(path: str):
+            async with semaphore:
+                row = await self._extract_document(path, report)
+            if row is None:
+                return
+            contract_ids[path] = row.get("contract_id")
+            await asyncio.to_thread(self._writer.add, self._table_id, row, path)
+
+        self._writer.add_listener(on_flush)
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(process(path) for path in pending_paths))
+            await asyncio.to_thread(self._writer.flush, self._table_id)
+        finally:
+            self._writer.remove_listener(on_flush)
+        report.elapsed_seconds = time.perf_counter() - started
+        return report
+
+    async def _extract_document(self, path: str, report: ImportReport) -> Optional[Dict[str, Any]]:
+        try:
+            stage_started = time.perf_counter()
+            pdf_content = await asyncio.to_thread(_read_file, path)
+            report.add_stage_time("read", time.perf_counter() - stage_started)
+
+            stage_started = time.perf_counter()
+            row = await self._extract_with_retry(pdf_content, report)
+            report.add_stage_time("extract", time.perf_counter() - stage_started)
+        except Exception as e:
+            with self._lock:
+                report.failed += 1
+                self._record(path, STATUS_FAILED, stage="extract", error=str(e))
+            return None
+
+        # The Contracts page links ocr_text_ref as a Cloud Storage object.
+        if not str(row.get("ocr_text_ref") or "").startswith("gs://"):
+            row["ocr_text_ref"] = None
+            if self._upload is not None:
+                try:
+                    stage_started = time.perf_counter()
+                    row["ocr_text_ref"] = await asyncio.to_thread(self._upload, pdf_content, os.path.basename(path))
+                    report.add_stage_time("upload", time.perf_counter() - stage_started)
+                except Exception as e:
+                    with self._lock:
+                        report.failed += 1
+                        self._record(path, STATUS_FAILED, stage="upload", error=str(e))
+                    return None
+        return row
+
+    async def _extract_with_retry(self, pdf_content: bytes, report: ImportReport) -> Dict[str, Any]:
+        attempt = 1
+        while True:
+            try:
+                return await self._extractor.extract(pdf_content)
+            except TRANSIENT_ERRORS:
+                if attempt >= self._max_attempts:
+                    raise
+                delay = min(self._max_backoff, self._initial_backoff * 2 ** (attempt - 1))
+                await self._sleep(delay * random.uniform(0.5, 1.0))
+                report.retries += 1
+                attempt += 1
+
+    def _record(self, path: str, status: str, **fields: Any):
+        if self._journal:
+            self._journal.record(path, status, **fields)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="A directory of contract PDFs or a manifest with one path per line.")
+    parser.add_argument("--project-id", default=os.environ.get("GOOGLE_CLOUD_PROJECT"))
+    parser.add_argument("--location", default=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"))
+    parser.add_argument("--dataset-id", default="contract_data")
+    parser.add_argument("--table-id", default="contracts")
+    parser.add_argument("--journal", default="import_journal.jsonl", help="The progress journal used to resume imports.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per write. Batches of 1000 rows or more use a load job.")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    parser.add_argument("--model", default=None, help="The Gemini model used for extraction.")
+    parser.add_argument("--force-reextract", action="store_true", help="Ignore cached extractions of previously seen PDFs.")
+    parser.add_argument("--local-table", default=None, help="Write rows to this JSONL file instead of BigQuery.")
+    parser.add_argument("--bucket", default=DEFAULT_BUCKET_NAME, help="The Cloud Storage bucket the PDFs are uploaded to.")
+    args = parser.parse_args()
+
+    import vertexai
+
+    from contract_ai_agent_modules.adk.agents.toolsets.bigquery.client_pool import get_client_pool
+    from contract_ai_agent_modules.adk.agents.toolsets.document_processing.document_processing_tool import (
+        DEFAULT_EXTRACTION_MODEL,
+        DocumentProcessingTool,
+        process_document,
+    )
+    from contract_ai_agent_modules.adk.agents.toolsets.document_processing.extraction_cache import get_extraction_cache
+    from contract_ai_agent_modules.bigquery_client import BigQueryClient
+
+    vertexai.init(project=args.project_id, location=args.location)
+    extractor = DocumentProcessingTool(
+        func=process_document,
+        model_name=args.model or DEFAULT_EXTRACTION_MODEL,
+        cache=get_extraction_cache(),
+        force_reextract=args.force_reextract,
+    )
+    upload = None
+    if args.local_table:
+        writer = BufferedBatchWriter(LocalTable(args.local_table), args.dataset_id, max_rows=args.batch_size)
+    else:
+        upload = functools.partial(upload_contract, bucket_name=args.bucket)
+        bigquery_client = BigQueryClient(project_id=args.project_id, dataset_id=args.dataset_id, location=args.location)
+        writer = bigquery_client.batch_writer(max_rows=args.batch_size)
+
+    importer = BulkImporter(
+        extractor,
+        writer,
+        journal=ImportJournal(args.journal),
+        table_id=args.table_id,
+        concurrency=args.concurrency,
+        max_attempts=args.max_attempts,
+        upload=upload,
+    )
+    try:
+        report = asyncio.run(importer.run(discover_documents(args.source)))
+    finally:
+        writer.close()
+        get_client_pool().close_all()
+    print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
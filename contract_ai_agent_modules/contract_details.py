@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the lookup service of contract details."""
+
+import collections
+import threading
+import time
+from typing import Optional
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 600
+
+
+class ContractDetailService:
+    """Looks up the long text and JSON columns of contracts by contract_id.
+
+    The contracts list only reads the summary columns. The details of a
+    contract are read when it is selected, since BigQuery scans the detail
+    columns of the whole table for every lookup, and are kept in a hash index
+    on contract_id, an LRU with a TTL, so opening it again is a dictionary
+    lookup.
+    """
+
+    def __init__(self, bigquery_client, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """Initializes the service.
+
+        Args:
+            bigquery_client: The `BigQueryClient` the details are read with.
+            max_entries: The number of contracts kept.
+            ttl_seconds: How long the details of a contract are kept.
+        """
+        self._bigquery_client = bigquery_client
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, contract_id: str) -> Optional[dict]:
+        """Returns the detail columns of a contract, or None if it does not exist."""
+        with self._lock:
+            details = self._lookup(contract_id, time.monotonic())
+            if details is not None:
+                self.hits += 1
+                return details
+            self.misses += 1
+        return self._fetch([contract_id]).get(contract_id)
+
+    def invalidate(self, contract_id: Optional[str] = None):
+        """Drops the details of a contract, or of every contract if None."""
+        with self._lock:
+            if contract_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(contract_id, None)
+
+    def _lookup(self, contract_id: str, now: float) -> Optional[dict]:
+        entry = self._entries.get(contract_id)
+        if entry is None or now - entry[0] >= self._ttl_seconds:
+            return None
+        self._entries.move_to_end(contract_id)
+        return entry[1]
+
+    def _fetch(self, contract_ids) -> dict:
+        now = time.monotonic()
+        details_by_id = self._bigquery_client.get_contract_details(contract_ids)
+        with self._lock:
+            for contract_id, details in details_by_id.items():
+                self._entries[contract_id] = (now, details)
+                self._entries.move_to_end(contract_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return details_by_id
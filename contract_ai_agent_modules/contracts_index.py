@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the search index of the Contracts page."""
+
+import collections
+import threading
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_CACHED_RESULTS = 64
+
+# Separates the columns in the search text, so a term never matches across two
+# adjacent values.
+_COLUMN_SEPARATOR = "\x1f"
+
+
+class ContractsSearchIndex:
+    """A prebuilt, read-only index for searching and filtering contracts.
+
+    Every text column of a row is lowercased and joined into one Arrow-backed
+    search string when the index is built, so a search is a single vectorized
+    substring match instead of re-stringifying every cell. Company and business
+    unit filters are boolean masks combined with the search mask, and the frame
+    is only sliced once, for the final result. The row positions of recent
+    filters are kept in a small LRU.
+    """
+
+    def __init__(self, contracts_df: pd.DataFrame, max_cached_results: int = DEFAULT_MAX_CACHED_RESULTS):
+        """Builds the index.
+
+        Args:
+            contracts_df: The contracts. It must not be modified afterwards.
+            max_cached_results: The number of recent filter results kept.
+        """
+        self._df = contracts_df
+        self._max_cached_results = max_cached_results
+        self._results: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        text_columns = contracts_df.select_dtypes(include=["object", "string"]).columns
+        values = [contracts_df[column].fillna("").astype(str).str.lower() for column in text_columns]
+        if values:
+            search_text = values[0].str.cat(values[1:], sep=_COLUMN_SEPARATOR) if len(values) > 1 else values[0]
+        else:
+            search_text = pd.Series("", index=contracts_df.index)
+        self._search_text = search_text.astype("string[pyarrow]")
+
+        self._companies = self._column_values("company")
+        self._business_units = self._column_values("business_unit")
+        self.company_options = _options(self._companies)
+        self.business_unit_options = _options(self._business_units)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The indexed contracts."""
+        return self._df
+
+    @property
+    def empty(self) -> bool:
+        return self._df.empty
+
+    def filter(
+        self,
+        search_term: str = "",
+        company: Optional[str] = None,
+        business_unit: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Returns the contracts matching a search and filters.
+
+        Args:
+            search_term: Matched, case-insensitively and literally, against every
+                text column.
+            company: Only keep contracts of this company. None keeps all.
+            business_unit: Only keep contracts of this business unit. None keeps
+                all.
+
+        Returns:
+            The matching contracts, in their original order.
+        """
+        return self._df.iloc[self.positions(search_term, company, business_unit)]
+
+    def positions(
+        self,
+        search_term: str = "",
+        company: Optional[str] = None,
+        business_unit: Optional[str] = None,
+    ) -> np.ndarray:
+        """Returns the row positions of the contracts matching a search and filters."""
+        key = (search_term.strip().lower(), company, business_unit)
+        with self._lock:
+            positions = self._results.get(key)
+            if positions is not None:
+                self._results.move_to_end(key)
+                return positions
+
+        mask = np.ones(len(self._df), dtype=bool)
+        if key[0]:
+            mask &= self._search_text.str.contains(key[0], regex=False).to_numpy(dtype=bool, na_value=False)
+        if company is not None and self._companies is not None:
+            mask &= self._companies == company
+        if business_unit is not None and self._business_units is not None:
+            mask &= self._business_units == business_unit
+        positions = np.flatnonzero(mask)
+        positions.setflags(write=False)
+
+        with self._lock:
+            self._results[key] = positions
+            while len(self._results) > self._max_cached_results:
+                self._results.popitem(last=False)
+        return positions
+
+    def _column_values(self, column: str) -> Optional[np.ndarray]:
+        if column not in self._df.columns:
+            return None
+        return self._df[column].to_numpy(dtype=object)
+
+
+def _options(values: Optional[np.ndarray]) -> List[str]:
+    if values is None:
+        return []
+    return sorted(value for value in pd.unique(values) if value is not None and not pd.isna(value))
@@ -0,0 +1,223 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the incrementally maintained dashboard KPIs."""
+
+import dataclasses
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from contract_ai_agent_modules import bigquery_client as bigquery_client_module
+from contract_ai_agent_modules.adk.utils import tracing
+import contract_ai_agent_modules.queries as queries
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_RECONCILE_SECONDS = 900
+RECENT_CONTRACTS_LIMIT = 10
+
+
+@dataclasses.dataclass(frozen=True)
+class DashboardSnapshot:
+    """The dashboard KPIs at one point in time.
+
+    Attributes:
+        contract_count: The number of contracts.
+        total_penalties: The sum of the penalty amounts.
+        recent_contracts: The contracts with the latest start dates, newest
+            first, with the columns of `queries.RECENT_CONTRACTS_QUERY`.
+        reconciled_at: When the KPIs were last recomputed from BigQuery, or
+            None if they never were.
+    """
+
+    contract_count: int
+    total_penalties: float
+    recent_contracts: List[Dict[str, Any]]
+    reconciled_at: Optional[datetime.datetime]
+
+    def recent_contracts_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.recent_contracts, columns=queries.RECENT_CONTRACTS_COLUMNS)
+
+
+class DashboardKpis:
+    """Keeps the dashboard KPIs up to date without scanning the tables per view.
+
+    The contract count, the total penalties and the most recent contracts are
+    computed once with the dashboard queries. After that, every row written
+    through `BigQueryClient.insert_row` to the dataset updates them in place:
+    the count and the sum are incremented, and the recent contracts are a
+    bounded min-heap keyed on start_date, so an insert costs O(log 10).
+
+    Rows written any other way, such as by a bulk import or by another
+    instance, are only picked up by reconciliation, which recomputes the KPIs
+    from BigQuery every `reconcile_seconds` and logs the drift it corrected.
+    Inserts made while a reconciliation's queries run are assumed to be
+    included in its results.
+    """
+
+    def __init__(self, bigquery_client, recent_limit: int = RECENT_CONTRACTS_LIMIT):
+        """Initializes the KPIs and starts following inserts.
+
+        Args:
+            bigquery_client: The `BigQueryClient` the KPIs are computed with.
+                Inserts into its dataset update them.
+            recent_limit: The number of recent contracts kept.
+        """
+        self._bigquery_client = bigquery_client
+        self._recent_limit = recent_limit
+        self._contract_count = 0
+        self._total_penalties = 0.0
+        # (sort key, sequence, row) entries; the smallest key is the first to
+        # be evicted. The sequence keeps rows from being compared on equal keys.
+        self._recent: List[tuple] = []
+        self._sequence = itertools.count()
+        self._reconciled_at: Optional[datetime.datetime] = None
+        self._lock = threading.Lock()
+        # Serializes reconciliations, so the first snapshot runs the queries once.
+        self._reconcile_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reconciler: Optional[threading.Thread] = None
+        self.last_drift: Dict[str, float] = {}
+        bigquery_client_module.add_insert_listener(self.record_insert)
+
+    def snapshot(self) -> DashboardSnapshot:
+        """Returns the current KPIs, computing them first if they never were."""
+        if self._reconciled_at is None:
+            with self._reconcile_lock:
+                if self._reconciled_at is None:
+                    self._reconcile()
+        with self._lock:
+            recent = [row for _, _, row in sorted(self._recent, reverse=True)]
+            return DashboardSnapshot(
+                contract_count=self._contract_count,
+                total_penalties=self._total_penalties,
+                recent_contracts=recent,
+                reconciled_at=self._reconciled_at,
+            )
+
+    def record_insert(self, dataset_id: str, table_id: str, rows: List[Dict[str, Any]]):
+        """Applies rows written to a table of the dataset to the KPIs."""
+        if dataset_id != self._bigquery_client.dataset_id:
+            return
+        with self._lock:
+            if table_id == "contracts":
+                self._contract_count += len(rows)
+                for row in rows:
+                    self._push_recent(row)
+            elif table_id == "penalties":
+                self._total_penalties += sum(_to_float(row.get("penalty_amount")) for row in rows)
+
+    def reconcile(self):
+        """Recomputes the KPIs from BigQuery, correcting any drift.
+
+        If a query fails, the KPIs are left as they were.
+        """
+        with self._reconcile_lock:
+            self._reconcile()
+
+    def start(self, reconcile_seconds: float = DEFAULT_RECONCILE_SECONDS):
+        """Starts reconciling every `reconcile_seconds` on a background thread."""
+        if self._reconciler is not None or not reconcile_seconds:
+            return
+        self._reconciler = threading.Thread(
+            target=self._reconcile_periodically, args=(reconcile_seconds,), name="dashboard-kpis", daemon=True
+        )
+        self._reconciler.start()
+
+    def close(self):
+        """Stops reconciling and following inserts."""
+        bigquery_client_module.remove_insert_listener(self.record_insert)
+        self._stop.set()
+        if self._reconciler is not None and self._reconciler is not threading.current_thread():
+            self._reconciler.join()
+
+    def _reconcile_periodically(self, reconcile_seconds: float):
+        while not self._stop.wait(reconcile_seconds):
+            try:
+                self.reconcile()
+            except Exception as e:
+                _LOGGER.warning("Dashboard KPI reconciliation failed: %s", e)
+
+    def _reconcile(self):
+        with tracing.span("dashboard.reconcile") as span:
+            count_df = self._bigquery_client.query_to_dataframe(queries.CONTRACT_COUNT_QUERY)
+            penalties_df = self._bigquery_client.query_to_dataframe(queries.TOTAL_PENALTY_AMOUNTS_QUERY)
+            recent_df = self._bigquery_client.query_to_dataframe(queries.RECENT_CONTRACTS_QUERY)
+            # query_to_dataframe returns an empty frame when a query fails.
+            if "contract_count" not in count_df or "total_penalties" not in penalties_df or recent_df.columns.empty:
+                span.set(error="QueryFailed")
+                _LOGGER.warning("Dashboard KPI reconciliation skipped: a query failed")
+                return
+            contract_count = int(count_df["contract_count"].iloc[0])
+            total_penalties = _to_float(penalties_df["total_penalties"].iloc[0])
+            with self._lock:
+                if self._reconciled_at is not None:
+                    self.last_drift = {
+                        "contract_count": contract_count - self._contract_count,
+                        "total_penalties": total_penalties - self._total_penalties,
+                    }
+                    span.set(**{f"{key}_drift": value for key, value in self.last_drift.items()})
+                    if any(self.last_drift.values()):
+                        _LOGGER.info("Dashboard KPIs corrected by reconciliation: %s", self.last_drift)
+                self._contract_count = contract_count
+                self._total_penalties = total_penalties
+                self._recent = []
+                for row in recent_df.to_dict(orient="records"):
+                    self._push_recent(row)
+                self._reconciled_at = datetime.datetime.now(datetime.timezone.utc)
+
+    def _push_recent(self, row: Dict[str, Any]):
+        """Adds a contract to the recent contracts heap. Call with the lock held."""
+        start_date = _to_date(row.get("start_date"))
+        # Like ORDER BY start_date DESC, contracts without a start date sort last.
+        key = (start_date is not None, start_date or datetime.date.min, str(row.get("contract_id") or ""))
+        # Inserted rows carry the date as a string and reconciled ones as a date
+        # or timestamp, so the parsed date is stored to keep the column uniform.
+        recent_row = {column: row.get(column) for column in queries.RECENT_CONTRACTS_COLUMNS}
+        recent_row["start_date"] = start_date
+        entry = (key, next(self._sequence), recent_row)
+        if len(self._recent) < self._recent_limit:
+            heapq.heappush(self._recent, entry)
+        elif key > self._recent[0][0]:
+            heapq.heapreplace(self._recent, entry)
+
+
+def _to_date(value) -> Optional[datetime.date]:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return pd.Timestamp(value).date()
+
+
+def _to_float(value) -> float:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,64 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the export of BigQuery tables to Parquet snapshots.
+
+The snapshots are what the local query backend loads, so the app and the
+agent can run against a copy of the contract data without BigQuery. Run it
+again to refresh them; each table's file is replaced only once it has been
+written completely.
+
+Usage:
+    python -m contract_ai_agent_modules.export_snapshots \\
+        --project-id my-project --output-dir snapshots
+"""
+
+import argparse
+import json
+import os
+
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.local_client import SNAPSHOT_TABLES, export_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project-id", default=os.environ.get("GOOGLE_CLOUD_PROJECT"))
+    parser.add_argument("--location", default=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"))
+    parser.add_argument("--dataset-id", default="contract_data")
+    parser.add_argument(
+        "--output-dir",
+        default=os.environ.get("LOCAL_SNAPSHOT_DIR", "snapshots"),
+        help="The directory the local backend loads snapshots from.",
+    )
+    parser.add_argument("--tables", nargs="+", default=list(SNAPSHOT_TABLES), help="The tables to export.")
+    args = parser.parse_args()
+
+    from google.cloud import bigquery
+
+    client = bigquery.Client(project=args.project_id, location=args.location)
+    try:
+        manifest = export_snapshots(
+            client,
+            args.dataset_id,
+            args.output_dir,
+            tables=args.tables,
+            on_table=lambda table_id, rows: print(f"Exported {table_id}: {rows} rows"),
+        )
+    finally:
+        client.close()
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
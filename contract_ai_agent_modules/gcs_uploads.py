@@ -0,0 +1,118 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This file contains the upload of contract PDFs to Cloud Storage."""
+
+import io
+import threading
+from typing import BinaryIO, Optional, Union
+
+from google.cloud import storage
+
+DEFAULT_BUCKET_NAME = "contract_pdfs"
+# Resumable uploads send the file in chunks of this size, so at most one chunk
+# is held in memory at a time. It must be a multiple of 256 KiB.
+DEFAULT_CHUNK_SIZE = 2 * 1024 * 1024
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+_storage_client: Optional[storage.Client] = None
+_storage_client_lock = threading.Lock()
+
+
+def get_storage_client() -> storage.Client:
+    """Returns the process-wide Cloud Storage client."""
+    global _storage_client
+    with _storage_client_lock:
+        if _storage_client is None:
+            _storage_client = storage.Client()
+        return _storage_client
+
+
+class BufferReader(io.RawIOBase):
+    """A read-only, seekable file over a bytes-like object that does not copy it.
+
+    `io.BytesIO` copies a memoryview passed to it; this reader only copies the
+    slices that are read.
+    """
+
+    def __init__(self, buffer: BytesLike):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._position + size, len(self._view))
+        data = self._view[self._position:end].tobytes()
+        self._position = end
+        return data
+
+    def readinto(self, target) -> int:
+        end = min(self._position + len(target), len(self._view))
+        size = end - self._position
+        target[:size] = self._view[self._position:end]
+        self._position = end
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+def upload_contract(
+    source: Union[BytesLike, BinaryIO],
+    object_name: str,
+    bucket_name: str = DEFAULT_BUCKET_NAME,
+    content_type: str = "application/pdf",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    client: Optional[storage.Client] = None,
+) -> str:
+    """Uploads a contract to Cloud Storage with a resumable, chunked upload.
+
+    Args:
+        source: The contents of the contract, either bytes-like, e.g. the
+            memoryview of a Streamlit upload, or a seekable binary file.
+        object_name: The name of the object in the bucket.
+        bucket_name: The bucket to upload to.
+        content_type: The content type of the object.
+        chunk_size: The size of each uploaded chunk.
+        client: The storage client. Defaults to the shared client.
+
+    Returns:
+        The gs:// URI of the uploaded object.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BufferReader(source)
+
+    bucket = (client or get_storage_client()).bucket(bucket_name)
+    blob = bucket.blob(object_name, chunk_size=chunk_size)
+    # Without a size, the client always uses a resumable upload. With one, files
+    # up to 8 MiB would be sent in a single request read fully into memory.
+    blob.upload_from_file(source, content_type=content_type)
+    return f"gs://{bucket_name}/{object_name}"
@@ -19,14 +19,95 @@ CONTRACT_COUNT_QUERY = "SELECT COUNT(contract_id) AS contract_count FROM `contra
 
 TOTAL_PENALTY_AMOUNTS_QUERY = "SELECT SUM(penalty_amount) as total_penalties FROM `contract_data.penalties`"
 
-RECENT_CONTRACTS_QUERY = "SELECT contract_id, contract_name, contract_type, business_unit, provider FROM `contract_data.contracts` ORDER BY start_date DESC LIMIT 10"
+# start_date is read so inserted contracts can be merged into the list.
+RECENT_CONTRACTS_COLUMNS = ["contract_id", "contract_name", "contract_type", "business_unit", "provider", "start_date"]
+
+RECENT_CONTRACTS_QUERY = f"SELECT {', '.join(RECENT_CONTRACTS_COLUMNS)} FROM `contract_data.contracts` ORDER BY start_date DESC, contract_id DESC LIMIT 10"
 
 # Alerts Queries
 ALERTS_QUERY = "SELECT * FROM `contract_data.alerts`"
 
 # Contracts Queries
-CONTRACTS_QUERY = "SELECT * FROM `contract_data.contracts`"
+# The columns shown in the contracts list, which its search box also matches.
+# The long text and JSON columns are only read when a contract is opened.
+CONTRACT_SUMMARY_COLUMNS = [
+    "contract_id",
+    "contract_name",
+    "contract_type",
+    "provider",
+    "rut_brand",
+    "company",
+    "business_unit",
+    "start_date",
+    "end_date",
+    "contract_date",
+    "price",
+    "contract_manager",
+    "legal_representatives",
+    "ocr_text_ref",
+]
+CONTRACT_DETAIL_COLUMNS = [
+    "service_detail",
+    "financials",
+    "exit_clause",
+    "general_conditions",
+]
+
+CONTRACTS_QUERY = f"SELECT {', '.join(CONTRACT_SUMMARY_COLUMNS)} FROM `contract_data.contracts`"
+
+CONTRACT_DETAILS_QUERY = (
+    f"SELECT contract_id, {', '.join(CONTRACT_DETAIL_COLUMNS)} FROM `contract_data.contracts` "
+    "WHERE contract_id IN UNNEST(@contract_ids)"
+)
+
+CONTRACT_FILTER_OPTIONS_QUERY = "SELECT DISTINCT company, business_unit FROM `contract_data.contracts`"
+
+# The keyset orderings of the contracts list. Each has a direction and the sort
+# keys compared as a tuple, as (expression, column, parameter type). NULL start
+# dates sort as the earliest date so they can be compared against a cursor.
+CONTRACTS_PAGE_ORDERINGS = {
+    "contract_id": ("ASC", [("contract_id", "contract_id", "STRING")]),
+    "start_date": (
+        "DESC",
+        [
+            ("IFNULL(start_date, DATE '0001-01-01')", "start_date", "DATE"),
+            ("contract_id", "contract_id", "STRING"),
+        ],
+    ),
+}
+
+
+def get_contracts_page_query(
+    order_by: str = "contract_id",
+    search: bool = False,
+    company: bool = False,
+    business_unit: bool = False,
+    after: bool = False,
+) -> str:
+    """Returns the query for one page of the contracts list.
 
-def get_contract_details_query(contract_id: str) -> str:
-    """Returns the query to get the details of a specific contract."""
-    return f"SELECT * FROM `contract_data.contracts` WHERE contract_id = '{contract_id}'"
\ No newline at end of file
+    The filters and the keyset cursor are query parameters: @search_term,
+    @company, @business_unit, @after_0, @after_1... and @page_size. Only the
+    filters that are set are included, so an unfiltered page is a plain ordered
+    scan.
+    """
+    direction, keys = CONTRACTS_PAGE_ORDERINGS[order_by]
+    conditions = []
+    if search:
+        # Searches the listed columns, case-insensitively and literally.
+        conditions.append(f"CONTAINS_SUBSTR(({', '.join(CONTRACT_SUMMARY_COLUMNS)}), @search_term)")
+    if company:
+        conditions.append("company = @company")
+    if business_unit:
+        conditions.append("business_unit = @business_unit")
+    if after:
+        comparison = ">" if direction == "ASC" else "<"
+        alternatives = []
+        for i, (expression, _, _) in enumerate(keys):
+            equal = [f"{keys[j][0]} = @after_{j}" for j in range(i)]
+            alternatives.append(" AND ".join(equal + [f"{expression} {comparison} @after_{i}"]))
+        conditions.append("(" + " OR ".join(f"({alternative})" for alternative in alternatives) + ")")
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = ", ".join(f"{expression} {direction}" for expression, _, _ in keys)
+    columns = ", ".join(CONTRACT_SUMMARY_COLUMNS)
+    return f"SELECT {columns} FROM `contract_data.contracts`{where} ORDER BY {order} LIMIT @page_size"
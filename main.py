@@ -1,22 +1,28 @@
 import streamlit as st
-import asyncio
 import sys
 import os
 import logging
 import json
-from google.cloud import storage
 import importlib.resources as pkg_resources
 import io
-import tempfile
 from cairosvg import svg2png
 from PIL import Image
 
+from contract_ai_agent_modules.adk.agents.main_agent.agent_events import EVENT_DONE, EVENT_TEXT, EVENT_TOOL_CALL
 from contract_ai_agent_modules.adk.agents.main_agent.main_agent import ContractAgent
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.bigquery_credentials import BigQueryCredentialsConfig
 from contract_ai_agent_modules.adk.agents.toolsets.bigquery.config import BigQueryToolConfig
+from contract_ai_agent_modules.adk.tools.tool_result import ToolResult
+from contract_ai_agent_modules.adk.utils import tracing
+from contract_ai_agent_modules.async_runtime import get_async_runtime
 from contract_ai_agent_modules.bigquery_client import BigQueryClient
+from contract_ai_agent_modules.contract_details import ContractDetailService
+from contract_ai_agent_modules.contracts_index import ContractsSearchIndex
+from contract_ai_agent_modules.dashboard_kpis import DashboardKpis
+from contract_ai_agent_modules.gcs_uploads import upload_contract
 import contract_ai_agent_modules.queries as queries
 import pandas as pd
+import pyarrow as pa
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,6 +38,11 @@ translations = {
         "error_loading_sidebar_image": "Error loading sidebar image:",
         "go_to": "Go to",
         "language": "Language",
+        "dashboard": "Dashboard",
+        "total_contracts": "Total Contracts",
+        "total_penalties": "Total Penalties",
+        "recent_contracts": "Recent Contracts",
+        "kpis_reconciled_at": "Recomputed from BigQuery at",
         "contracts": "Contracts",
         "analyze_new_contract": "Analyze new Contract",
         "agent_interaction": "Agent Interaction",
@@ -46,8 +57,12 @@ translations = {
         "all": "All",
         "filter_by_business_unit": "Filter by Business Unit",
         "select_row_to_view_details": "Select a row to view contract details.",
+        "previous_page": "Previous",
+        "next_page": "Next",
+        "page": "Page",
         "choose_pdf_file": "Choose a PDF file",
         "process_contract": "Process Contract",
+        "force_reextraction": "Extract again even if this file was processed before",
         "processing_contract": "Processing contract...",
         "file_uploaded_to": "File uploaded to",
         "extracting_data": "Extracting data from the contract...",
@@ -64,6 +79,10 @@ translations = {
         "unknown_error": "Unknown error",
         "unexpected_error_occurred": "An unexpected error occurred:",
         "please_enter_question": "Please enter a question.",
+        "running_tool": "Running",
+        "first_token": "First token",
+        "total_latency": "Total",
+        "parallel_tools_saved": "Saved by parallel tools",
         "view_pdf": "View PDF",
         "database_schema": "Database Schema",
     },
@@ -74,6 +93,11 @@ translations = {
         "error_loading_sidebar_image": "Error al cargar la imagen de la barra lateral:",
         "go_to": "Ir a",
         "language": "Idioma",
+        "dashboard": "Panel",
+        "total_contracts": "Total de Contratos",
+        "total_penalties": "Total de Penalidades",
+        "recent_contracts": "Contratos Recientes",
+        "kpis_reconciled_at": "Recalculado desde BigQuery el",
         "contracts": "Contratos",
         "analyze_new_contract": "Analizar nuevo Contrato",
         "agent_interaction": "Interacción del Agente",
@@ -88,8 +112,12 @@ translations = {
         "all": "Todos",
         "filter_by_business_unit": "Filtrar por Unidad de Negocio",
         "select_row_to_view_details": "Seleccione una fila para ver los detalles del contrato.",
+        "previous_page": "Anterior",
+        "next_page": "Siguiente",
+        "page": "Página",
         "choose_pdf_file": "Elegir un archivo PDF",
         "process_contract": "Procesar Contrato",
+        "force_reextraction": "Extraer de nuevo aunque este archivo ya haya sido procesado",
         "processing_contract": "Procesando contrato...",
         "file_uploaded_to": "Archivo subido a",
         "extracting_data": "Extrayendo datos del contrato...",
@@ -106,6 +134,10 @@ translations = {
         "unknown_error": "Error desconocido",
         "unexpected_error_occurred": "Ocurrió un error inesperado:",
         "please_enter_question": "Por favor, ingrese una pregunta.",
+        "running_tool": "Ejecutando",
+        "first_token": "Primer token",
+        "total_latency": "Total",
+        "parallel_tools_saved": "Ahorrado con herramientas en paralelo",
         "view_pdf": "Ver PDF",
         "database_schema": "Esquema de la Base de Datos",
     }
@@ -162,15 +194,41 @@ bigquery_project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
 bigquery_location = os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1")
 bigquery_dataset_id = "contract_data"
 bigquery_max_rows = int(os.environ.get("BIGQUERY_MAX_ROWS", 100))
-
-bigquery_client = BigQueryClient(project_id=bigquery_project_id, dataset_id=bigquery_dataset_id)
+bigquery_arrow_results = os.environ.get("BIGQUERY_ARROW_RESULTS", "false").lower() == "true"
+# "server" filters and paginates the contracts list in BigQuery; "memory" loads
+# the whole table into a shared in-process search index, for small datasets.
+contracts_listing_mode = os.environ.get("CONTRACTS_LISTING_MODE", "server").lower()
+contracts_page_size = int(os.environ.get("CONTRACTS_PAGE_SIZE", 50))
+agent_max_steps = int(os.environ.get("AGENT_MAX_STEPS", 5))
+# Per-stage timings of every answer: logged as JSON with TRACE_LOG=true, and
+# served as Prometheus metrics on /metrics when METRICS_PORT is set
+trace_log = os.environ.get("TRACE_LOG", "false").lower() == "true"
+metrics_port = os.environ.get("METRICS_PORT")
+# The dashboard KPIs follow the app's inserts and are recomputed from BigQuery
+# this often, to pick up rows written elsewhere
+dashboard_reconcile_seconds = int(os.environ.get("DASHBOARD_RECONCILE_SECONDS", 900))
+
+bigquery_client = BigQueryClient(project_id=bigquery_project_id, dataset_id=bigquery_dataset_id, location=bigquery_location)
 
 bigquery_credentials = BigQueryCredentialsConfig(project_id=bigquery_project_id, location=bigquery_location)
-bigquery_tool_config = BigQueryToolConfig(max_rows=bigquery_max_rows, default_dataset_id=bigquery_dataset_id, default_table_id="contracts") # Limit results for display
-agent = ContractAgent(
-    bigquery_credentials_config=bigquery_credentials,
-    bigquery_tool_config=bigquery_tool_config
-)
+bigquery_tool_config = BigQueryToolConfig(max_rows=bigquery_max_rows, default_dataset_id=bigquery_dataset_id, default_table_id="contracts", arrow_results=bigquery_arrow_results) # Limit results for display
+
+@st.cache_resource # One agent, and its clients and caches, for every rerun and session
+def get_agent():
+    return ContractAgent(
+        bigquery_credentials_config=bigquery_credentials,
+        bigquery_tool_config=bigquery_tool_config,
+        max_steps=agent_max_steps
+    )
+
+agent = get_agent()
+if trace_log:
+    tracing.add_trace_exporter(tracing.log_trace_exporter)
+if metrics_port:
+    tracing.start_metrics_server(int(metrics_port))
+# Every coroutine runs on one long-lived event loop, so the agent's async
+# resources are reused across requests instead of dying with a loop each time
+async_runtime = get_async_runtime()
 
 # Sidebar for navigation
 # Load the image from package resources and convert SVG to PNG if necessary
@@ -188,7 +246,7 @@ except FileNotFoundError:
 except Exception as e:
     st.sidebar.error(f"{_('error_loading_sidebar_image')} {e}")
 
-page = st.sidebar.radio(_("go_to"), [_("contracts"), _("analyze_new_contract"), _("agent_interaction")])
+page = st.sidebar.radio(_("go_to"), [_("contracts"), _("dashboard"), _("analyze_new_contract"), _("agent_interaction")])
 
 # Language selection at the bottom of the sidebar
 st.sidebar.markdown("---") # Add a separator
@@ -202,6 +260,10 @@ st.sidebar.selectbox(
 
 def format_agent_response(result):
     """Formats the agent's response for display in the Streamlit UI."""
+    with tracing.span("ui.format_response"):
+        return _format_agent_response(result)
+
+def _format_agent_response(result):
     if isinstance(result, dict):
         if 'results' in result and isinstance(result['results'], list):
             # Format SQL query results into a Markdown table
@@ -227,14 +289,127 @@ def format_agent_response(result):
     # Fallback for any other data types
     return str(result)
 
-def display_contract_details(contract_id):
+def run_agent_query(prompt, placeholder):
+    """Runs a chat question, rendering the answer as it streams in.
+
+    The model's text is rendered chunk by chunk, then SQL results page by page.
+    The query and the row stream run on the async runtime; the events and pages
+    are handed back to this thread, which owns the Streamlit script context, to
+    render.
+
+    Returns:
+        The result, the latency and the trace of the answer. The trace is still
+        open so that formatting the answer is recorded in it; the caller
+        finishes it.
+    """
+    streamed_text = ""
+    response = latency = answer_trace = None
+    for event in async_runtime.iterate(agent.stream_query(prompt, stream_results=True)):
+        if event.kind == EVENT_TEXT:
+            streamed_text += event.text
+            placeholder.markdown(streamed_text + "▌")
+        elif event.kind == EVENT_TOOL_CALL:
+            placeholder.markdown(f"_{_('running_tool')} `{event.tool_name}`_")
+        elif event.kind == EVENT_DONE:
+            response, latency, answer_trace = event.result, event.latency, event.trace
+    # The rows are fetched while they are rendered, within the answer's trace
+    try:
+        with tracing.activate(answer_trace):
+            return render_result_stream(response, placeholder), latency, answer_trace
+    except Exception:
+        if answer_trace is not None:
+            answer_trace.finish()
+        raise
+
+def format_latency(latency):
+    """Formats the time to first token and total latency of an answer."""
+    parts = [f"{_('total_latency')} {latency.total_seconds:.2f}s"]
+    if latency.first_token_seconds is not None:
+        parts.insert(0, f"{_('first_token')} {latency.first_token_seconds:.2f}s")
+    saved_seconds = sum(step.saved_seconds for step in latency.steps)
+    if saved_seconds > 0:
+        parts.append(f"{_('parallel_tools_saved')} {saved_seconds:.2f}s")
+    return " · ".join(parts)
+
+def render_result_stream(response, placeholder):
+    """Renders streamed SQL results page by page, returning the full result.
+
+    The returned result keeps the metadata of the response, such as its trace.
+    """
+    if not response.is_successful or "row_stream" not in response.result:
+        return response
+    if bigquery_tool_config.arrow_results:
+        # Arrow batches go straight to st.dataframe without per-row dicts.
+        batches = render_pages(
+            placeholder,
+            async_runtime.iterate(response.result["row_stream"].record_batches()),
+            pa.Table.from_batches,
+        )
+        table = pa.Table.from_batches(batches) if batches else pa.table({})
+        return ToolResult.success({"arrow_table": table}).with_metadata(**(response.metadata or {}))
+    pages = render_pages(
+        placeholder,
+        async_runtime.iterate(response.result["row_stream"].pages()),
+        lambda pages: pd.DataFrame([row for page in pages for row in page]),
+    )
+    rows = [row for page in pages for row in page]
+    return ToolResult.success({"results": rows}).with_metadata(**(response.metadata or {}))
+
+def render_pages(placeholder, pages, to_frame):
+    """Renders pages of results into a placeholder as they arrive.
+
+    The first page is rendered as a dataframe and later pages are appended to
+    it with add_rows, so earlier rows are not converted again. Streamlit
+    releases without add_rows re-render the rows only each time their number
+    has doubled, and once at the end, which keeps the total work linear.
+
+    Args:
+        placeholder: The placeholder the table is rendered in.
+        pages: The pages of results.
+        to_frame: Turns a list of pages into something st.dataframe renders.
+
+    Returns:
+        The pages, in order.
+    """
+    received = []
+    table = None
+    row_count = rendered_rows = 0
+    for page in pages:
+        received.append(page)
+        row_count += len(page)
+        if table is not None and hasattr(table, "add_rows"):
+            table.add_rows(to_frame([page]))
+            rendered_rows = row_count
+        elif table is None or row_count >= 2 * rendered_rows:
+            table = placeholder.dataframe(to_frame(received), hide_index=True)
+            rendered_rows = row_count
+    if rendered_rows < row_count:
+        placeholder.dataframe(to_frame(received), hide_index=True)
+    return received
+
+@st.cache_resource
+def get_contract_detail_service():
+    return ContractDetailService(bigquery_client)
+
+@st.cache_resource # One set of KPIs, kept up to date by inserts, for every rerun and session
+def get_dashboard_kpis():
+    kpis = DashboardKpis(bigquery_client)
+    kpis.start(dashboard_reconcile_seconds)
+    return kpis
+
+def display_kpi_card(title, value):
+    st.markdown(f'<div class="kpi-card"><h3>{title}</h3><p>{value}</p></div>', unsafe_allow_html=True)
+
+def display_contract_details(contract_summary):
+    contract_id = contract_summary["contract_id"]
     st.subheader(f"{_('contract_details')} {contract_id}")
-    contract_details_df = bigquery_client.query_to_dataframe(queries.get_contract_details_query(contract_id))
-    if not contract_details_df.empty:
-        details = contract_details_df.to_dict(orient='records')[0]
+    # The list only holds the summary columns; the long text ones are read on selection
+    contract_details = get_contract_detail_service().get(contract_id)
+    if contract_details is not None:
+        details = {**contract_summary, **contract_details}
         for key, value in details.items():
             if key == "ocr_text_ref":
-                if value:
+                if isinstance(value, str) and value.startswith("gs://"):
                     gcs_uri = value
                     bucket_name = gcs_uri.split('/')[2]
                     file_path = '/'.join(gcs_uri.split('/')[3:])
@@ -272,28 +447,51 @@ def display_extracted_data(data):
             else:
                 st.markdown(f"**{key.replace('_', ' ').title()}:** {value}")
 
-def upload_to_gcs(uploaded_file):
-    """Uploads a file to a GCS bucket."""
-    bucket_name = "contract_pdfs"
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(uploaded_file.name)
-
-    blob.upload_from_file(uploaded_file)
-
-    return f"gs://{bucket_name}/{uploaded_file.name}"
-
-if page == _("contracts"):
+def upload_to_gcs(file_name, pdf_content):
+    """Uploads a file to a GCS bucket with the shared storage client."""
+    return upload_contract(pdf_content, file_name)
+
+if page == _("dashboard"):
+    st.header(_("dashboard"))
+    snapshot = get_dashboard_kpis().snapshot()
+    col1, col2 = st.columns(2)
+    with col1:
+        display_kpi_card(_("total_contracts"), f"{snapshot.contract_count:,}")
+    with col2:
+        display_kpi_card(_("total_penalties"), f"{snapshot.total_penalties:,.2f}")
+    st.markdown(f'<h3 class="recent-contracts">{_("recent_contracts")}</h3>', unsafe_allow_html=True)
+    st.dataframe(snapshot.recent_contracts_frame(), hide_index=True)
+    if snapshot.reconciled_at is not None:
+        st.caption(f"{_('kpis_reconciled_at')} {snapshot.reconciled_at:%Y-%m-%d %H:%M} UTC")
+
+elif page == _("contracts"):
     st.header(_("contracts"))
     st.write(_("this_section_lists_contracts"))
     
-    @st.cache_data(ttl=3600) # Cache data for 1 hour
-    def get_contracts_data():
-        return bigquery_client.query_to_dataframe(queries.CONTRACTS_QUERY)
+    @st.cache_resource(ttl=3600) # Build the search index once per hour, shared by all sessions
+    def get_contracts_index():
+        return ContractsSearchIndex(bigquery_client.query_to_dataframe(queries.CONTRACTS_QUERY))
+
+    @st.cache_data(ttl=3600) # The distinct companies and business units change rarely
+    def get_contract_filter_options():
+        return bigquery_client.contract_filter_options()
+
+    @st.cache_data(ttl=300) # Selecting a row reruns the page, so reuse the fetched page
+    def get_contracts_page(search_term, company, business_unit, cursor):
+        return bigquery_client.list_contracts(search_term, company=company, business_unit=business_unit, page_size=contracts_page_size, cursor=cursor)
+
+    if contracts_listing_mode == "memory":
+        contracts_index = get_contracts_index()
+        has_contracts = not contracts_index.empty
+        company_options = contracts_index.company_options
+        bu_options = contracts_index.business_unit_options
+    else:
+        filter_options = get_contract_filter_options()
+        company_options = filter_options["company"]
+        bu_options = filter_options["business_unit"]
+        has_contracts = not get_contracts_page("", None, None, None).rows.empty
 
-    contracts_df = get_contracts_data()
-    
-    if contracts_df.empty:
+    if not has_contracts:
         st.info(_("no_contract_data_available"))
     else:
         # --- Search and Filter ---
@@ -310,7 +508,6 @@ if page == _("contracts"):
             search_term = st.text_input(_("search_by_attribute"), value=st.session_state.search_term, key="search_input")
             st.session_state.search_term = search_term # Update session state on change
         with col2:
-            company_options = sorted([c for c in pd.Series(contracts_df["company"]).unique() if c is not None])
             # Ensure 'All' is always the first option and translated
             company_options_display = [_("all")] + company_options
             # Find the current index of the selected company filter
@@ -322,7 +519,6 @@ if page == _("contracts"):
             company_filter = st.selectbox(_("filter_by_company"), company_options_display, index=default_company_index, key="company_filter_select")
             st.session_state.company_filter = company_filter # Update session state on change
         with col3:
-            bu_options = sorted([bu for bu in pd.Series(contracts_df["business_unit"]).unique() if bu is not None])
             # Ensure 'All' is always the first option and translated
             bu_options_display = [_("all")] + bu_options
             # Find the current index of the selected business unit filter
@@ -335,16 +531,22 @@ if page == _("contracts"):
             st.session_state.bu_filter = bu_filter # Update session state on change
 
         # --- Apply Filters ---
-        filtered_df = contracts_df.copy()
-        if search_term:
-            search_cols = filtered_df.select_dtypes(include=['object', 'string']).columns
-            filtered_df = filtered_df[
-                filtered_df[search_cols].apply(lambda row: row.astype(str).str.contains(search_term, case=False, na=False).any(), axis=1)
-            ]
-        if company_filter != _("all"): # Use translated 'all'
-            filtered_df = filtered_df[filtered_df["company"] == company_filter]
-        if bu_filter != _("all"): # Use translated 'all'
-            filtered_df = filtered_df[filtered_df["business_unit"] == bu_filter]
+        company = None if company_filter == _("all") else company_filter # Use translated 'all'
+        business_unit = None if bu_filter == _("all") else bu_filter
+        if contracts_listing_mode == "memory":
+            filtered_df = contracts_index.filter(search_term, company=company, business_unit=business_unit)
+            page_cursors = [None]
+            next_cursor = None
+        else:
+            # The cursors of the pages visited so far; changing a filter starts over.
+            filters_key = (search_term.strip(), company, business_unit)
+            if st.session_state.get("contracts_filters_key") != filters_key:
+                st.session_state.contracts_filters_key = filters_key
+                st.session_state.contracts_page_cursors = [None]
+            page_cursors = st.session_state.contracts_page_cursors
+            contracts_page = get_contracts_page(search_term.strip(), company, business_unit, page_cursors[-1])
+            filtered_df = contracts_page.rows
+            next_cursor = contracts_page.next_cursor
 
         # --- Display Table and Handle Selection ---
         st.write(_("select_row_to_view_details"))
@@ -356,16 +558,25 @@ if page == _("contracts"):
             filtered_df_display,
             on_select="rerun",
             selection_mode="single-row",
-            key="contracts_table",
+            key=f"contracts_table_{len(page_cursors)}", # A new page starts without a selection
             hide_index=True
         )
 
+        if len(page_cursors) > 1 or next_cursor is not None:
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                st.button(_("previous_page"), disabled=len(page_cursors) == 1, on_click=page_cursors.pop)
+            with page_col:
+                st.write(f"{_('page')} {len(page_cursors)}")
+            with next_col:
+                st.button(_("next_page"), disabled=next_cursor is None, on_click=page_cursors.append, args=(next_cursor,))
+
         # --- Display Details in a Container ---
         if selection.selection.rows:
             selected_row_index = selection.selection.rows[0]
-            selected_contract_id = filtered_df_display.iloc[selected_row_index]["contract_id"]
+            selected_contract = filtered_df_display.iloc[selected_row_index].to_dict()
             with st.container(border=True):
-                display_contract_details(selected_contract_id)
+                display_contract_details(selected_contract)
 
 elif page == _("analyze_new_contract"):
     st.header(_("analyze_new_contract"))
@@ -373,21 +584,19 @@ elif page == _("analyze_new_contract"):
     uploaded_file = st.file_uploader(_("choose_pdf_file"), type="pdf")
     
     if uploaded_file is not None:
+        force_reextract = st.checkbox(_("force_reextraction"))
         if st.button(_("process_contract")):
             with st.spinner(_("processing_contract")):
                 try:
-                    # 1. Upload to GCS
-                    gcs_uri = upload_to_gcs(uploaded_file)
+                    # 1. Upload to GCS. The upload is a BytesIO over the received
+                    # bytes, which getvalue() returns without copying them.
+                    pdf_content = memoryview(uploaded_file.getvalue())
+                    gcs_uri = upload_to_gcs(uploaded_file.name, pdf_content)
                     st.success(f"{_('file_uploaded_to')} {gcs_uri}")
 
-                    # 2. Save to a temporary local file
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                        temp_file.write(uploaded_file.getvalue())
-                        temp_file_path = temp_file.name
-
-                    # 3. Process with MCP
+                    # 2. Process with Gemini, which reads the PDF from GCS
                     st.info(_("extracting_data"))
-                    result = asyncio.run(agent.add_new_contract(temp_file_path))
+                    result = async_runtime.run(agent.add_new_contract(pdf_content=pdf_content, gcs_uri=gcs_uri, force_reextract=force_reextract))
                     if result.is_successful:
                         extracted_data = result.result
                         # Add the GCS URI to the extracted data
@@ -407,10 +616,6 @@ elif page == _("analyze_new_contract"):
 
                 except Exception as e:
                     st.error(f"{_('an_error_occurred')} {e}")
-                finally:
-                    # Clean up the temporary file
-                    if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                        os.remove(temp_file_path)
 
 
 elif page == _("agent_interaction"):
@@ -424,7 +629,12 @@ elif page == _("agent_interaction"):
     # Display chat messages from history on app rerun
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
-            st.markdown(message["content"], unsafe_allow_html=True)
+            if message.get("table") is not None:
+                st.dataframe(message["table"], hide_index=True)
+            else:
+                st.markdown(message["content"], unsafe_allow_html=True)
+            if message.get("latency") is not None:
+                st.caption(format_latency(message["latency"]))
 
     # Accept user input
     if prompt := st.chat_input(_("ask_question_about_contracts")):
@@ -439,22 +649,35 @@ elif page == _("agent_interaction"):
             with st.spinner("Thinking..."): # Add spinner here
                 message_placeholder = st.empty()
                 full_response = ""
+                result_table = None
+                latency = answer_trace = None
                 try:
-                    # Run the async process_query in a synchronous Streamlit context
-                    response = asyncio.run(agent.process_query(prompt))
-                    if hasattr(response, 'is_successful'):
-                        if response.is_successful:
-                            formatted_response = format_agent_response(response.result)
-                            full_response = formatted_response
+                    # Stream the answer from the shared event loop
+                    response, latency, answer_trace = run_agent_query(prompt, message_placeholder)
+                    with tracing.activate(answer_trace):
+                        if hasattr(response, 'is_successful'):
+                            if response.is_successful and "arrow_table" in response.result:
+                                result_table = response.result["arrow_table"]
+                            elif response.is_successful:
+                                formatted_response = format_agent_response(response.result)
+                                full_response = formatted_response
+                            else:
+                                full_response = f"{_('agent_error')} {response.error if isinstance(response.error, str) else _('unknown_error')}"
                         else:
-                            full_response = f"{_('agent_error')} {response.error if isinstance(response.error, str) else _('unknown_error')}"
-                    else:
-                        # Handle direct string responses
-                        formatted_response = format_agent_response(response)
-                        full_response = formatted_response
+                            # Handle direct string responses
+                            formatted_response = format_agent_response(response)
+                            full_response = formatted_response
                 except Exception as e:
                     full_response = f"{_('unexpected_error_occurred')} {e}"
+                finally:
+                    if answer_trace is not None:
+                        answer_trace.finish()
                 
-                message_placeholder.markdown(full_response, unsafe_allow_html=True)
+                if result_table is not None:
+                    message_placeholder.dataframe(result_table, hide_index=True)
+                else:
+                    message_placeholder.markdown(full_response, unsafe_allow_html=True)
+                if latency is not None:
+                    st.caption(format_latency(latency))
             # Add assistant response to chat history
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
+            st.session_state.messages.append({"role": "assistant", "content": full_response, "table": result_table, "latency": latency})
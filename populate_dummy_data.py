@@ -2,12 +2,14 @@ import datetime
 import json
 from google.cloud import bigquery
 
+from contract_ai_agent_modules.adk.agents.toolsets.bigquery.client_pool import get_client_pool
+from contract_ai_agent_modules.batch_writer import BufferedBatchWriter
+
 def populate_dummy_data(project_id, dataset_id):
     """
     Populates the BigQuery tables with dummy data.
     """
-    client = bigquery.Client(project=project_id)
-    dataset_ref = client.dataset(dataset_id)
+    client = get_client_pool().get_client(project_id)
 
     # Dummy data for the 'contracts' table
     contracts_data = [
@@ -101,19 +103,23 @@ def populate_dummy_data(project_id, dataset_id):
         "alerts": alerts_data,
     }
 
-    for table_id, data in tables_data.items():
-        table_ref = dataset_ref.table(table_id)
-        try:
-            errors = client.insert_rows_json(table_ref, data)
-            if errors == []:
-                print(f"Successfully inserted {len(data)} rows into {table_id}.")
-            else:
-                print(f"Errors occurred while inserting rows into {table_id}: {errors}")
-        except Exception as e:
-            print(f"Error inserting data into table {table_id}: {e}")
+    with BufferedBatchWriter(client, dataset_id, max_latency_seconds=None) as writer:
+        for table_id, data in tables_data.items():
+            try:
+                results = writer.add_rows(table_id, data) + writer.flush(table_id)
+                errors = [error for flush_result in results for error in flush_result.errors]
+                if errors == []:
+                    print(f"Successfully inserted {len(data)} rows into {table_id}.")
+                else:
+                    print(f"Errors occurred while inserting rows into {table_id}: {[error.errors for error in errors]}")
+            except Exception as e:
+                print(f"Error inserting data into table {table_id}: {e}")
 
 if __name__ == "__main__":
     project_id = "walmart-chile-458918"
     dataset_id = "contract_data"
-    populate_dummy_data(project_id, dataset_id)
+    try:
+        populate_dummy_data(project_id, dataset_id)
+    finally:
+        get_client_pool().close_all()
     print("Dummy data population script finished.")
\ No newline at end of file